@@ -1,12 +1,2780 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
-from collections import Counter
+from tkinter import ttk, scrolledtext, messagebox, filedialog
+import tkinter.font as tkfont
+import argparse
+import asyncio
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from array import array
+import hashlib
+import heapq
+import hmac
+import ipaddress
+import mmap
+import multiprocessing
 import random
 import json
+import math
 import os
+import queue
 import re
+import signal
+import socket
+import sqlite3
+import struct
+import sys
 import threading
 import time
+import unicodedata
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+class SubstitutionKey(Mapping):
+    """不可变的单表代换密钥（明文字母 -> 密文字母）
+
+    正向和反向映射各存为26字节的数组，交换两个映射时同步更新两个方向，
+    加密/解密用的 str.translate 表在首次使用时生成并缓存。
+    对外表现为只读字典，json.dump(key.to_dict()) 与现有的 .key 文件格式一致。
+    """
+    __slots__ = ('_forward', '_inverse', '_encrypt_table', '_decrypt_table', '_encrypt_bytes_table')
+
+    def __init__(self, forward=None):
+        if forward is None:
+            forward = bytes(range(26))
+        forward = bytes(forward)
+        if len(forward) != 26 or set(forward) != set(range(26)):
+            raise ValueError("密钥必须是26个字母的一个置换")
+        inverse = bytearray(26)
+        for plain, ciph in enumerate(forward):
+            inverse[ciph] = plain
+        self._init(forward, bytes(inverse))
+
+    def _init(self, forward, inverse):
+        self._forward = forward
+        self._inverse = inverse
+        self._encrypt_table = None
+        self._decrypt_table = None
+        self._encrypt_bytes_table = None
+
+    @classmethod
+    def _from_arrays(cls, forward, inverse):
+        """直接由已知一致的正反向数组构造，跳过校验"""
+        key = cls.__new__(cls)
+        key._init(forward, inverse)
+        return key
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """由 {'a': 'q', ...} 形式的字典（如 .key 文件内容）构造密钥"""
+        if len(mapping) != 26:
+            raise ValueError("密钥不完整")
+        forward = bytearray(26)
+        for plain, ciph in mapping.items():
+            if not (isinstance(plain, str) and isinstance(ciph, str)) or len(plain) != 1 or len(ciph) != 1:
+                raise ValueError(f"无效的密钥对: {plain}-{ciph}")
+            plain = plain.lower()
+            ciph = ciph.lower()
+            if plain not in LETTERS or ciph not in LETTERS:
+                raise ValueError(f"无效的密钥对: {plain}-{ciph}")
+            forward[ord(plain) - 97] = ord(ciph) - 97
+        if len({plain.lower() for plain in mapping}) != 26 or len(set(forward)) != 26:
+            raise ValueError("密钥包含重复的映射")
+        return cls(forward)
+
+    def to_dict(self):
+        """转换为可直接 json.dump 的普通字典"""
+        return {LETTERS[i]: LETTERS[c] for i, c in enumerate(self._forward)}
+
+    @property
+    def forward(self):
+        """明文 -> 密文 的26字节数组"""
+        return self._forward
+
+    @property
+    def inverse(self):
+        """密文 -> 明文 的26字节数组"""
+        return self._inverse
+
+    def plain_for(self, ciph):
+        """返回密文字母对应的明文字母"""
+        return LETTERS[self._inverse[ord(ciph) - 97]]
+
+    def swapped(self, a, b):
+        """返回交换明文字母 a、b 的映射后的新密钥，正反向映射同步更新"""
+        i = ord(a) - 97
+        j = ord(b) - 97
+        forward = bytearray(self._forward)
+        inverse = bytearray(self._inverse)
+        ci, cj = forward[i], forward[j]
+        forward[i], forward[j] = cj, ci
+        inverse[ci], inverse[cj] = j, i
+        return self._from_arrays(bytes(forward), bytes(inverse))
+
+    @property
+    def encrypt_table(self):
+        """加密用的 str.translate 表（保留大小写）"""
+        if self._encrypt_table is None:
+            table = {}
+            for i, c in enumerate(self._forward):
+                table[97 + i] = 97 + c
+                table[65 + i] = 65 + c
+            self._encrypt_table = table
+        return self._encrypt_table
+
+    @property
+    def decrypt_table(self):
+        """解密用的 str.translate 表（保留大小写）"""
+        if self._decrypt_table is None:
+            table = {}
+            for c, p in enumerate(self._inverse):
+                table[97 + c] = 97 + p
+                table[65 + c] = 65 + p
+            self._decrypt_table = table
+        return self._decrypt_table
+
+    def encrypt(self, text):
+        return text.translate(self.encrypt_table)
+
+    def encrypt_bytes(self, data):
+        """加密 UTF-8（或任何 ASCII 兼容编码）的字节串
+
+        多字节字符的各字节都不在 ASCII 范围内，逐字节替换字母与按字符加密的结果相同，
+        bytes.translate 比按字典的 str.translate 快得多，适合批量加密。
+        """
+        if self._encrypt_bytes_table is None:
+            table = bytearray(range(256))
+            for i, c in enumerate(self._forward):
+                table[97 + i] = 97 + c
+                table[65 + i] = 65 + c
+            self._encrypt_bytes_table = bytes(table)
+        return data.translate(self._encrypt_bytes_table)
+
+    def decrypt(self, text):
+        return text.translate(self.decrypt_table)
+
+    def __getitem__(self, letter):
+        if not isinstance(letter, str) or len(letter) != 1 or letter not in LETTERS:
+            raise KeyError(letter)
+        return LETTERS[self._forward[ord(letter) - 97]]
+
+    def __iter__(self):
+        return iter(LETTERS)
+
+    def __len__(self):
+        return 26
+
+    def __eq__(self, other):
+        if isinstance(other, SubstitutionKey):
+            return self._forward == other._forward
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(self._forward)
+
+    def __reduce__(self):
+        return (SubstitutionKey, (self._forward,))
+
+    def __repr__(self):
+        return f"SubstitutionKey('{self._forward.translate(_INDEX_TO_LETTER).decode()}')"
+
+
+# 0..25 -> 'a'..'z' 的 bytes.translate 表
+_INDEX_TO_LETTER = bytes(range(97, 123)) + bytes(230)
+
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]+\b')
+
+# 英语字母频率（百分比）
+ENGLISH_FREQ = {'e': 12.70, 't': 9.06, 'a': 8.17, 'o': 7.51, 'i': 6.97, 'n': 6.75,
+                's': 6.33, 'h': 6.09, 'r': 5.99, 'd': 4.25, 'l': 4.03, 'c': 2.78,
+                'u': 2.76, 'm': 2.41, 'w': 2.36, 'f': 2.23, 'g': 2.02, 'y': 1.97,
+                'p': 1.93, 'b': 1.29, 'v': 0.98, 'k': 0.77, 'j': 0.15, 'x': 0.15,
+                'q': 0.10, 'z': 0.07}
+
+
+LL_MARGIN = 0.05  # 同一语言不同题材的文本之间每字母对数似然的典型差异
+
+# 编译后的语言模型文件：文件头、JSON 元数据、字母/双字母/四字母对数概率表（float32）、换行分隔的词表
+MODEL_MAGIC = b"MSLM"
+MODEL_VERSION = 1
+MODEL_HEADER = struct.Struct('<4sIII')  # 魔数、版本、元数据字节数、词表字节数
+MODEL_TABLE_SIZES = (26, 26 ** 2, 26 ** 4)
+MODEL_DIR = "models"  # 已安装的语言模型（*.lm）所在目录
+
+
+def fold_to_letters(text):
+    """转为小写并去掉重音等附加符号，使其他拉丁字母语言的文本落在 a-z 上"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class LanguageModel:
+    """语言模型：字母、双字母、四字母的对数概率表和词表
+
+    从编译后的模型文件打开时整个文件用 mmap 只读映射，各表以 memoryview 直接读取，
+    不复制到进程内存，多个工作进程打开同一模型时共享操作系统的页缓存。
+    metadata 保存破译意见使用的常见双字母组合、单字母单词、前缀和后缀。
+    """
+
+    def __init__(self, name, unigram, bigram=None, quadgram=None, words=(), metadata=None):
+        self.name = name
+        self.unigram = unigram  # 26 个字母的自然对数概率
+        self.bigram = bigram  # 下标为 a*26+b
+        self.quadgram = quadgram  # 下标为 ((a*26+b)*26+c)*26+d
+        self.words = frozenset(words)
+        self.metadata = dict(metadata or {})
+        self.path = None
+        self._mmap = None
+        
+        # 字母频率（百分比）及按频率排列的字母顺序
+        probabilities = [math.exp(log_p) for log_p in unigram]
+        total = sum(probabilities)
+        self.frequencies = {LETTERS[i]: p / total * 100 for i, p in enumerate(probabilities)}
+        self.frequency_order = "".join(sorted(LETTERS, key=lambda letter: -self.frequencies[letter]))
+        
+        # 该语言文本每字母对数似然的期望值、标准差以及随机字母文本的水平
+        log_p = [math.log(p / total) for p in probabilities]
+        self.expected_ll = sum(p / total * lp for p, lp in zip(probabilities, log_p))
+        variance = sum(p / total * lp ** 2 for p, lp in zip(probabilities, log_p)) - self.expected_ll ** 2
+        self.ll_std = math.sqrt(max(0.0, variance))
+        self.random_ll = sum(log_p) / 26
+        self.log_p = log_p
+        self.expected_ioc = sum((p / total) ** 2 for p in probabilities)  # 该语言文本的重合指数
+
+    @property
+    def has_ngrams(self):
+        """是否有双字母或四字母表；内置英语模型只有字母表，不能用于 n 元语法评分"""
+        return self.bigram is not None or self.quadgram is not None
+
+    def ngram_table(self):
+        """评分用的最高阶 n 元语法表，返回 (n, 表)；没有双字母和四字母表时退回字母表"""
+        if self.quadgram is not None:
+            return 4, self.quadgram
+        if self.bigram is not None:
+            return 2, self.bigram
+        return 1, self.log_p
+
+    @property
+    def label(self):
+        """界面中显示的语言名称"""
+        return self.metadata.get('label', self.name)
+
+    @property
+    def common_bigrams(self):
+        return self.metadata.get('common_bigrams', [])
+
+    @property
+    def one_letter_words(self):
+        return self.metadata.get('one_letter_words', [])
+
+    @property
+    def prefixes(self):
+        return self.metadata.get('prefixes', [])
+
+    @property
+    def suffixes(self):
+        return self.metadata.get('suffixes', [])
+
+    def fit(self, text):
+        """文本与该语言字母分布的吻合度：0 为随机字母的水平，1 为该长度文本的期望水平"""
+        counts = Counter(c for c in text.lower() if c in LETTERS)
+        n = sum(counts.values())
+        if not n:
+            return 0.0
+        ll = sum(self.log_p[ord(c) - 97] * count for c, count in counts.items()) / n
+        # 允许低于期望值两个标准差（标准差随文本长度按 1/sqrt(n) 缩小），再加上不同文本之间的固有差异
+        target = self.expected_ll - 2 * self.ll_std / math.sqrt(n) - LL_MARGIN
+        return max(0.0, min(1.0, (ll - self.random_ll) / (target - self.random_ll)))
+
+    @classmethod
+    def from_frequencies(cls, name, freq, words=(), metadata=None):
+        """由字母频率表构造只有字母表的模型（内置英语模型）"""
+        total = sum(freq.values())
+        unigram = [math.log(freq[letter] / total) for letter in LETTERS]
+        return cls(name, unigram, words=words, metadata=metadata)
+
+    @classmethod
+    def build(cls, name, texts, words=(), label=None):
+        """从语料统计各表，返回内存中的模型；语料中出现两次以上的单词和 words 一起作为词表
+
+        各表按每段语料去掉空格和标点后的字母流统计，与 n 元语法评分看到的文本一致，
+        跨越单词边界的组合也计入；常见双字母组合等破译意见仍按单词内部统计。
+        """
+        unigram_counts = [0] * MODEL_TABLE_SIZES[0]
+        bigram_counts = [0] * MODEL_TABLE_SIZES[1]
+        quadgram_counts = [0] * MODEL_TABLE_SIZES[2]
+        word_counts = Counter()
+        for text in texts:
+            folded = fold_to_letters(text)
+            word_counts.update(WORD_PATTERN.findall(folded))
+            codes = letter_array(folded).translate(_LETTER_TO_INDEX)
+            for code, count in Counter(codes).items():
+                unigram_counts[code] += count
+            for gram, count in Counter(codes[i:i + 2] for i in range(len(codes) - 1)).items():
+                bigram_counts[gram[0] * 26 + gram[1]] += count
+            for gram, count in Counter(codes[i:i + 4] for i in range(len(codes) - 3)).items():
+                quadgram_counts[((gram[0] * 26 + gram[1]) * 26 + gram[2]) * 26 + gram[3]] += count
+        if not sum(unigram_counts):
+            raise ValueError("语料中没有字母")
+        
+        word_bigrams = Counter()
+        for word, count in word_counts.items():
+            for i in range(len(word) - 1):
+                word_bigrams[word[i:i + 2]] += count
+        
+        def log_probabilities(counts):
+            # 未出现的组合给一个很小的伪计数，避免对数为负无穷
+            total = sum(counts) + 0.01 * len(counts)
+            return array('f', (math.log((count + 0.01) / total) for count in counts))
+        
+        def most_common_affixes(part, limit):
+            affixes = Counter()
+            for word, count in word_counts.items():
+                if len(word) >= 5:
+                    for length in (2, 3):
+                        affixes[part(word, length)] += count
+            return [affix for affix, _ in affixes.most_common(limit)]
+        
+        metadata = {
+            'label': label or name,
+            'common_bigrams': [bigram for bigram, _ in word_bigrams.most_common(5)],
+            'one_letter_words': [word for word, _ in Counter({w: c for w, c in word_counts.items() if len(w) == 1}).most_common(2)],
+            'prefixes': most_common_affixes(lambda word, length: word[:length], 9),
+            'suffixes': most_common_affixes(lambda word, length: word[-length:], 10),
+        }
+        vocabulary = {word for word, count in word_counts.items() if count >= 2}
+        vocabulary.update(fold_to_letters(word.strip()) for word in words if word.strip())
+        return cls(
+            name,
+            log_probabilities(unigram_counts),
+            log_probabilities(bigram_counts),
+            log_probabilities(quadgram_counts),
+            vocabulary,
+            metadata
+        )
+
+    def save(self, path):
+        """写入编译后的模型文件（先写临时文件再替换）"""
+        if self.bigram is None or self.quadgram is None:
+            raise ValueError("只有包含双字母和四字母表的模型才能保存")
+        metadata = json.dumps(dict(self.metadata, name=self.name), ensure_ascii=False).encode('utf-8')
+        metadata += b" " * ((-(MODEL_HEADER.size + len(metadata))) % 4)  # 使各表按4字节对齐
+        words = "\n".join(sorted(self.words)).encode('utf-8')
+        
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(MODEL_HEADER.pack(MODEL_MAGIC, MODEL_VERSION, len(metadata), len(words)))
+            file.write(metadata)
+            for table in (self.unigram, self.bigram, self.quadgram):
+                table = array('f', table)
+                if sys.byteorder != 'little':
+                    table.byteswap()
+                file.write(table.tobytes())
+            file.write(words)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path):
+        """用 mmap 打开编译后的模型文件"""
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, metadata_size, words_size = MODEL_HEADER.unpack_from(mapped, 0)
+        except struct.error:
+            magic = version = None
+        if magic != MODEL_MAGIC or version != MODEL_VERSION:
+            mapped.close()
+            raise ValueError(f"不是有效的语言模型文件: {path}")
+        
+        offset = MODEL_HEADER.size
+        metadata = json.loads(mapped[offset:offset + metadata_size].decode('utf-8'))
+        offset += metadata_size
+        view = memoryview(mapped)
+        tables = []
+        for size in MODEL_TABLE_SIZES:
+            table = view[offset:offset + size * 4]
+            if sys.byteorder == 'little':
+                tables.append(table.cast('f'))
+            else:
+                table = array('f', table.tobytes())
+                table.byteswap()
+                tables.append(table)
+            offset += size * 4
+        words = mapped[offset:offset + words_size].decode('utf-8').split("\n") if words_size else []
+        
+        model = cls(metadata.pop('name'), *tables, words=words, metadata=metadata)
+        model.path = path
+        model._mmap = mapped
+        return model
+
+
+ENGLISH_MODEL = LanguageModel.from_frequencies('english', ENGLISH_FREQ, metadata={
+    'label': "英语",
+    'common_bigrams': ['th', 'he', 'in', 'er', 'an'],
+    'one_letter_words': ['a', 'i'],
+    'prefixes': ['un', 're', 'in', 'im', 'dis', 'pre', 'post', 'anti', 'pro'],
+    'suffixes': ['ing', 'ed', 'es', 's', 'er', 'est', 'ly', 'tion', 'ation', 'ment'],
+    'english_rules': True,  # 启用 q-u、x 前字母、ee 之间字母等英语专用规则
+})
+
+# 本进程中已加载的语言模型，每个模型只加载一次
+_loaded_models = {}
+
+AUTO_MODEL = 'auto'  # 表示由试探破译自动选择语言模型
+
+
+def available_models(model_dir=MODEL_DIR):
+    """已安装的语言模型：名称 -> 模型文件路径（内置英语模型的路径为 None）"""
+    models = {'english': None}
+    if os.path.isdir(model_dir):
+        for file_name in sorted(os.listdir(model_dir)):
+            if file_name.endswith(".lm"):
+                models[file_name[:-3]] = os.path.join(model_dir, file_name)
+    return models
+
+
+def get_language_model(name='english', model_dir=MODEL_DIR):
+    """按名称取得语言模型；同名的模型文件优先于内置英语模型"""
+    model = _loaded_models.get(name)
+    if model is None:
+        path = available_models(model_dir).get(name, False)
+        if path is False:
+            raise ValueError(f"未找到语言模型: {name}")
+        model = LanguageModel.open(path) if path else ENGLISH_MODEL
+        _loaded_models[name] = model
+    return model
+
+
+def letter_frequencies(text):
+    """统计文本中各字母（不区分大小写）的出现次数"""
+    return Counter(c.lower() for c in text if c.isalpha())
+
+
+def read_dictionary(path):
+    """读取词典文件，每行一个单词"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return {line.strip().lower() for line in file if line.strip()}
+
+
+def dictionary_fingerprint(dictionary):
+    """词典内容的 SHA-256，与单词的顺序无关"""
+    return hashlib.sha256("\n".join(sorted(dictionary)).encode('utf-8')).hexdigest()
+
+
+def count_dictionary_matches(key, ciphertext, dictionary):
+    """统计用密钥解密后命中词典的单词数"""
+    words = WORD_PATTERN.findall(key.decrypt(ciphertext).lower())
+    return sum(1 for word in words if word in dictionary)
+
+
+def pool_cipher_words(ciphertexts):
+    """统计一段或多段密文中不同的密文单词及其出现次数
+
+    返回 (不同密文单词以空格连接的字符串, 对应的出现次数列表)。
+    同一密钥下密文单词相同则明文单词相同，评分时只需解密每个不同的单词一次，
+    每次评分的工作量取决于密文的词汇量而不是文本长度。
+    """
+    counts = Counter()
+    for text in ciphertexts:
+        counts.update(WORD_PATTERN.findall(text.lower()))
+    return " ".join(counts), list(counts.values())
+
+
+def count_pooled_matches(key, pooled_words, dictionary):
+    """按合并后的单词计数表统计命中词典的单词数"""
+    words, counts = pooled_words
+    return sum(count for word, count in zip(key.decrypt(words).split(" "), counts) if word in dictionary)
+
+
+class WordScorer:
+    """增量的词典匹配评分器，得分与 count_pooled_matches 相同
+
+    pooled_words 为 pool_cipher_words 的结果，每个不同的密文单词只评分一次，按出现次数加权。
+    相邻两次评分的密钥通常只差一次交换，只有含被交换字母的单词的解密结果会变。
+    评分器记住上一次评分时每个密文单词的得分，只重新解密映射有变化的密文字母所在的单词并查词典。
+    """
+
+    def __init__(self, pooled_words, dictionary):
+        words, counts = pooled_words
+        self.words = words.split(" ") if words else []
+        self.counts = counts
+        self.dictionary = dictionary
+        letter_words = [[] for _ in range(26)]
+        for i, word in enumerate(self.words):
+            for c in set(word):
+                letter_words[ord(c) - 97].append(i)
+        self.letter_words = [frozenset(ids) for ids in letter_words]  # 密文字母 -> 含该字母的单词
+        self.present = [c for c in range(26) if letter_words[c]]
+        self.reference = None  # 上一次评分的密钥（密文 -> 明文）
+        self.scores = [0] * len(self.words)  # 上一次评分时各单词的得分（已乘出现次数）
+        self.total = 0
+
+    def score(self, key):
+        """密钥解密后命中词典的单词数"""
+        inverse = key.inverse
+        reference = self.reference
+        if reference is None:
+            changed = self.present
+        else:
+            changed = [c for c in self.present if inverse[c] != reference[c]]
+        self.reference = bytes(inverse)
+        if not changed:
+            return self.total
+        
+        ids = list(frozenset().union(*(self.letter_words[c] for c in changed)))
+        words = self.words
+        counts = self.counts
+        dictionary = self.dictionary
+        scores = self.scores
+        total = self.total
+        for i, word in zip(ids, key.decrypt(" ".join([words[i] for i in ids])).split(" ")):
+            score = counts[i] if word in dictionary else 0
+            total += score - scores[i]
+            scores[i] = score
+        self.total = total
+        return total
+
+
+# 工作进程内的评分状态，由 _init_fitness_worker 或 _init_parallel_worker 在进程启动时设置
+_worker_state = {}
+
+
+def _init_parallel_worker(stop_event, progress_queue=None):
+    """并行破译的工作进程初始化：保存主进程共享的停止事件和进度队列"""
+    _worker_state['stop_event'] = stop_event
+    _worker_state['progress_queue'] = progress_queue
+    if progress_queue is not None:
+        # 主进程结束后不再读取队列，进程退出时不等待未送出的进度
+        progress_queue.cancel_join_thread()
+
+
+def _init_fitness_worker(ciphertext, dictionary, pooled_words=None, pooled_ngrams=None, model_name=None):
+    _worker_state['ciphertext'] = ciphertext
+    _worker_state['dictionary'] = frozenset(dictionary)
+    _worker_state['pooled_words'] = pooled_words
+    _worker_state['pooled_ngrams'] = pooled_ngrams
+    if pooled_ngrams is not None:
+        # n 元语法表在工作进程中按名称加载（内存映射），不经过进程间传递
+        order, table = get_language_model(model_name).ngram_table()
+        _worker_state['ngram_table'] = table
+
+
+def _score_keys_in_worker(keys):
+    """在工作进程中为一批密钥评分（词典匹配数或 n 元语法对数概率）"""
+    pooled_ngrams = _worker_state['pooled_ngrams']
+    if pooled_ngrams is not None:
+        table = _worker_state['ngram_table']
+        return [score_pooled_ngrams(key, pooled_ngrams, table) for key in keys]
+    dictionary = _worker_state['dictionary']
+    pooled_words = _worker_state['pooled_words']
+    if pooled_words is not None:
+        return [count_pooled_matches(key, pooled_words, dictionary) for key in keys]
+    ciphertext = _worker_state['ciphertext']
+    return [count_dictionary_matches(key, ciphertext, dictionary) for key in keys]
+
+
+def parse_fixed_pairs(text):
+    """解析命令行的固定密钥对（明文-密文，逗号分隔，如 a-q,e-x），返回 {明文: 密文}；格式无效时抛出 ValueError"""
+    fixed_pairs = {}
+    for pair in filter(None, (text or "").split(',')):
+        plain, _, ciph = pair.strip().lower().partition('-')
+        if plain not in LETTERS or ciph not in LETTERS or len(plain) != 1 or len(ciph) != 1:
+            raise ValueError(f"无效的固定密钥对: {pair.strip()}（格式为 明文-密文，如 a-q）")
+        if plain in fixed_pairs:
+            raise ValueError(f"明文字母 {plain} 被固定了多次")
+        if ciph in fixed_pairs.values():
+            raise ValueError(f"密文字母 {ciph} 被固定了多次")
+        fixed_pairs[plain] = ciph
+    return fixed_pairs
+
+
+def enforce_fixed_pairs(key, fixed_pairs):
+    """通过交换使密钥满足所有固定的密钥对"""
+    for plain, ciph in fixed_pairs.items():
+        if key[plain] != ciph:
+            key = key.swapped(plain, key.plain_for(ciph))
+    return key
+
+
+def random_key(rng, fixed_pairs=None):
+    """用随机数发生器 rng 生成满足固定密钥对的随机密钥：固定的字母保持映射，其余字母随机排列"""
+    fixed_pairs = fixed_pairs or {}
+    if len(set(fixed_pairs.values())) != len(fixed_pairs):
+        raise ValueError("固定的密钥对中有重复的密文字母")
+    available = [letter for letter in LETTERS if letter not in fixed_pairs.values()]
+    rng.shuffle(available)
+    free = iter(available)
+    return SubstitutionKey.from_dict({
+        letter: fixed_pairs[letter] if letter in fixed_pairs else next(free) for letter in LETTERS
+    })
+
+
+def create_process_pool(initializer=None, initargs=(), max_workers=None):
+    """创建使用 spawn 方式启动的进程池，避免在带有 Tk 线程的进程中 fork"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=initializer,
+        initargs=initargs
+    )
+
+
+def order_crossover(parent_a, parent_b, fixed_pairs, rng=random):
+    """顺序交叉（OX）：子代保留父代A的一段连续映射，其余位置按父代B中的顺序填充
+
+    只在非固定字母上交叉，固定的密钥对原样保留，结果始终是合法的置换。
+    """
+    free = [i for i in range(26) if LETTERS[i] not in fixed_pairs]
+    if len(free) < 2:
+        return parent_a
+    
+    a = parent_a.forward
+    b = parent_b.forward
+    start, end = sorted(rng.sample(range(len(free) + 1), 2))
+    
+    child = bytearray(a)
+    kept = {a[i] for i in free[start:end]}
+    # 从交叉段之后开始，按父代B的顺序依次取出未使用的密文字母
+    order = free[end:] + free[:end]
+    fill = (b[i] for i in order if b[i] not in kept)
+    for i in free[end:] + free[:start]:
+        child[i] = next(fill)
+    
+    return SubstitutionKey(child)
+
+
+def normalize_ciphertext(text):
+    """规范化密文：统一小写并压缩空白，使仅有排版差异的密文得到相同的哈希"""
+    return " ".join(text.lower().split())
+
+
+class BreakResultCache:
+    """破译结果的持久化缓存
+
+    以 规范化密文 + 固定密钥对 + 评分设置 的哈希为索引，保存最佳密钥、得分和运行信息。
+    所有条目按最近使用顺序存放在一个 JSON 文件中，超过 max_entries 时淘汰最久未用的条目。
+    """
+
+    def __init__(self, path, max_entries=200, signature_words=200):
+        self.path = path
+        self.max_entries = max_entries
+        self.signature_words = signature_words
+        self.entries = OrderedDict()
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as file:
+                    self.entries = OrderedDict(json.load(file).get('entries', []))
+        except Exception as e:
+            print(f"读取破译缓存时出错: {str(e)}")
+            self.entries = OrderedDict()
+
+    def save(self):
+        """先写临时文件再替换，避免写到一半时损坏缓存"""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'entries': list(self.entries.items())}, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"保存破译缓存时出错: {str(e)}")
+
+    @staticmethod
+    def settings_hash(settings):
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def make_key(cls, ciphertext, fixed_pairs, settings):
+        """计算缓存索引"""
+        digest = hashlib.sha256(normalize_ciphertext(ciphertext).encode('utf-8'))
+        digest.update(json.dumps(sorted(fixed_pairs.items())).encode('utf-8'))
+        digest.update(cls.settings_hash(settings).encode('utf-8'))
+        return digest.hexdigest()
+
+    def signature(self, ciphertext):
+        """近似重复检测用的签名：出现最多的若干个密文单词"""
+        words = Counter(WORD_PATTERN.findall(ciphertext.lower()))
+        return sorted(word for word, _ in words.most_common(self.signature_words))
+
+    def get(self, cache_key):
+        """查找缓存条目，命中时将其移到最近使用的位置"""
+        entry = self.entries.get(cache_key)
+        if entry is not None:
+            entry['last_used'] = time.time()
+            self.entries.move_to_end(cache_key)
+            self.save()
+        return entry
+
+    def nearest(self, ciphertext, settings, min_similarity=0.5):
+        """查找评分设置相同、单词签名最相似（Jaccard）的缓存条目"""
+        words = set(self.signature(ciphertext))
+        if not words:
+            return None
+        settings_hash = self.settings_hash(settings)
+        best_entry = None
+        best_similarity = min_similarity
+        for entry in self.entries.values():
+            if entry.get('settings') != settings_hash:
+                continue
+            other = set(entry.get('words', []))
+            similarity = len(words & other) / len(words | other) if other else 0.0
+            if similarity >= best_similarity:
+                best_entry = entry
+                best_similarity = similarity
+        return best_entry
+
+    def put(self, cache_key, ciphertext, settings, key, score, **metadata):
+        """保存破译结果；已有得分更高的条目时保留原结果，仅更新使用时间"""
+        old = self.entries.get(cache_key)
+        if old is not None and old['score'] > score:
+            old['last_used'] = time.time()
+            self.entries.move_to_end(cache_key)
+        else:
+            entry = {
+                'key': key.to_dict(),
+                'score': score,
+                'settings': self.settings_hash(settings),
+                'words': self.signature(ciphertext),
+                'created': time.time(),
+                'last_used': time.time(),
+            }
+            entry.update(metadata)
+            self.entries[cache_key] = entry
+            self.entries.move_to_end(cache_key)
+        
+        # LRU 淘汰
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.save()
+
+
+class KeyStore:
+    """大量密钥与破译结果的紧凑存储（SQLite）
+
+    每条记录的密钥存为26字节的置换（明文序号 -> 密文序号），得分、置信度等为独立的列，
+    按规范化密文的哈希建立索引。批量追加在一个事务中完成，查询同一密文的所有结果只需一次索引查找。
+    导出的 .key 文件与 save_key 保存的格式一致。
+    """
+
+    COLUMNS = ('cipher_hash', 'key', 'score', 'confidence', 'iterations', 'model', 'source', 'created', 'metadata')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()  # 任务服务会在不同线程中写入
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS keys (
+                    id INTEGER PRIMARY KEY,
+                    cipher_hash TEXT NOT NULL,
+                    key BLOB NOT NULL,
+                    score REAL,
+                    confidence REAL,
+                    iterations INTEGER,
+                    model TEXT,
+                    source TEXT,
+                    created REAL NOT NULL,
+                    metadata TEXT
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS keys_cipher_hash ON keys (cipher_hash)")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def ciphertext_hash(ciphertext):
+        """规范化密文的 SHA-256，作为查找索引"""
+        return hashlib.sha256(normalize_ciphertext(ciphertext).encode('utf-8')).hexdigest()
+
+    def append(self, records):
+        """批量追加记录，返回追加的条数
+
+        每条记录是一个字典：key（SubstitutionKey 或 .key 格式的字典）、ciphertext 或 cipher_hash 必须给出，
+        score、confidence、iterations、model、source 可选，其余字段存入 metadata（JSON）。
+        """
+        now = time.time()
+        
+        def rows():
+            for record in records:
+                record = dict(record)
+                key = record.pop('key')
+                if not isinstance(key, SubstitutionKey):
+                    key = SubstitutionKey.from_dict(key)
+                ciphertext = record.pop('ciphertext', None)
+                cipher_hash = record.pop('cipher_hash', None) or self.ciphertext_hash(ciphertext)
+                values = [record.pop(name, None) for name in ('score', 'confidence', 'iterations', 'model', 'source')]
+                created = record.pop('created', now)
+                yield (cipher_hash, key.forward, *values, created,
+                       json.dumps(record, ensure_ascii=False) if record else None)
+        
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                f"INSERT INTO keys ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                rows()
+            )
+            return self.connection.total_changes - before
+
+    def append_result(self, ciphertext, result, source='break'):
+        """追加一次破译的结果（CipherBreaker.result() 的返回值），没有密钥时不追加"""
+        if not result.get('key'):
+            return 0
+        return self.append([{
+            'ciphertext': ciphertext,
+            'key': result['key'],
+            'score': result['score'],
+            'confidence': result['confidence'],
+            'iterations': result['iterations'],
+            'model': result.get('model'),
+            'source': source,
+        }])
+
+    @staticmethod
+    def _record(row):
+        record = dict(row)
+        record['key'] = SubstitutionKey(row['key'])
+        record['metadata'] = json.loads(row['metadata']) if row['metadata'] else {}
+        return record
+
+    def lookup(self, ciphertext=None, cipher_hash=None, limit=None):
+        """查找同一密文的所有记录，按得分从高到低排列"""
+        cipher_hash = cipher_hash or self.ciphertext_hash(ciphertext)
+        query = "SELECT * FROM keys WHERE cipher_hash = ? ORDER BY score DESC, id DESC"
+        params = [cipher_hash]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return [self._record(row) for row in self.connection.execute(query, params)]
+
+    def best(self, ciphertext=None, cipher_hash=None):
+        """同一密文得分最高的记录，没有时返回 None"""
+        records = self.lookup(ciphertext, cipher_hash, limit=1)
+        return records[0] if records else None
+
+    def get(self, record_id):
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM keys WHERE id = ?", (record_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def export_key(self, record_id, path):
+        """把一条记录的密钥导出为 .key 文件"""
+        record = self.get(record_id)
+        if record is None:
+            raise KeyError(record_id)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(record['key'].to_dict(), file)
+
+
+def frequency_signature(text):
+    """密文的频率签名：字母计数和单词内相邻字母的双字母计数"""
+    letters = letter_frequencies(text)
+    bigrams = Counter()
+    for word in WORD_PATTERN.findall(text.lower()):
+        bigrams.update(word[i:i + 2] for i in range(len(word) - 1))
+    return letters, bigrams
+
+
+def chi_square_homogeneity(counts_a, counts_b, min_expected=5):
+    """两组计数的卡方齐性检验，返回 (统计量, 自由度)
+
+    期望频数不足 min_expected 的类别合并为一类，避免稀疏的双字母计数放大统计量。
+    """
+    total_a = sum(counts_a.values())
+    total_b = sum(counts_b.values())
+    total = total_a + total_b
+    if not total_a or not total_b:
+        return 0.0, 0
+    
+    statistic = 0.0
+    cells = 0
+    rare_a = rare_b = 0
+    for category in counts_a.keys() | counts_b.keys():
+        a = counts_a.get(category, 0)
+        b = counts_b.get(category, 0)
+        if (a + b) * min(total_a, total_b) / total < min_expected:
+            rare_a += a
+            rare_b += b
+            continue
+        expected_a = (a + b) * total_a / total
+        expected_b = (a + b) * total_b / total
+        statistic += (a - expected_a) ** 2 / expected_a + (b - expected_b) ** 2 / expected_b
+        cells += 1
+    if rare_a + rare_b:
+        expected_a = (rare_a + rare_b) * total_a / total
+        expected_b = (rare_a + rare_b) * total_b / total
+        statistic += (rare_a - expected_a) ** 2 / expected_a + (rare_b - expected_b) ** 2 / expected_b
+        cells += 1
+    return statistic, max(0, cells - 1)
+
+
+def chi_square_z(statistic, df):
+    """用 Wilson-Hilferty 近似把卡方统计量换算为标准正态分数"""
+    if df <= 0:
+        return 0.0
+    scale = 2 / (9 * df)
+    return ((statistic / df) ** (1 / 3) - (1 - scale)) / math.sqrt(scale)
+
+
+def signature_distance(counts_a, counts_b):
+    """两组计数的差异：返回卡方检验的 z 分数和效应量（Cramér's V）"""
+    statistic, df = chi_square_homogeneity(counts_a, counts_b)
+    total = sum(counts_a.values()) + sum(counts_b.values())
+    effect = math.sqrt(statistic / total) if total else 0.0
+    return chi_square_z(statistic, df), effect
+
+
+def cluster_by_key(ciphertexts, critical_z=3.09, max_effect=0.25):
+    """按可能共用的密钥对密文分组，返回每组密文下标的列表
+
+    同一密钥下各段密文的字母和双字母分布只是同一个语言分布的置换，只有抽样误差和
+    题材带来的小差异；密钥不同时置换不同，分布差异很大（效应量通常在 0.45 以上）。
+    字母和双字母两项比较都满足 z < critical_z（默认相当于 0.001 的显著性水平）
+    或效应量 < max_effect 时认为分布一致，后者避免长文本中题材差异导致的误拒。
+    按长度从长到短依次处理，每段密文并入分布一致且效应量最小的组，否则自成一组；
+    组的签名为组内计数之和。很短的密文检验能力不足，可能被并入任意一组。
+    先做只有 26 类的字母比较，字母分布已不一致的组不再做约 600 类的双字母比较；
+    不同密钥的组几乎都在第一步排除，双字母比较通常只对真正匹配的组进行。
+    总工作量仍约为 密文数 × 组数，纯 Python 下 1000 段 400 字符的密文、40 个密钥约需 3 秒，
+    上万段密文、数百个密钥时应先按其他线索（来源、时间）分批。
+    """
+    signatures = [frequency_signature(text) for text in ciphertexts]
+    order = sorted(range(len(ciphertexts)), key=lambda i: sum(signatures[i][0].values()), reverse=True)
+    
+    groups = []  # [成员下标列表, 字母计数, 双字母计数]
+    for i in order:
+        letters, bigrams = signatures[i]
+        best_group = None
+        best_effect = None
+        for group in groups:
+            letter_z, letter_effect = signature_distance(letters, group[1])
+            if letter_z >= critical_z and letter_effect >= max_effect:
+                continue
+            bigram_z, bigram_effect = signature_distance(bigrams, group[2])
+            if bigram_z >= critical_z and bigram_effect >= max_effect:
+                continue
+            effect = max(letter_effect, bigram_effect)
+            if best_effect is None or effect < best_effect:
+                best_group, best_effect = group, effect
+        if best_group is None:
+            groups.append([[i], Counter(letters), Counter(bigrams)])
+        else:
+            best_group[0].append(i)
+            best_group[1].update(letters)
+            best_group[2].update(bigrams)
+    
+    return [sorted(group[0]) for group in groups]
+
+
+# 删除 a-z 以外所有字节的 bytes.translate 参数
+_NON_LETTER_BYTES = bytes(b for b in range(256) if not 97 <= b <= 122)
+
+CIPHER_TYPES = {
+    'monoalphabetic': "单表代换",
+    'transposition': "换位密码或明文",
+    'polyalphabetic': "多表代换",
+    'unknown': "无法判断",
+}
+
+
+def letter_array(text):
+    """把文本转为只含 a-z 的字节串，之后的统计都在字节串上用 C 实现的方法完成"""
+    return text.lower().encode('ascii', 'ignore').translate(None, _NON_LETTER_BYTES)
+
+
+def index_of_coincidence(data):
+    """字节串的重合指数：随机取两个字母相同的概率"""
+    n = len(data)
+    if n < 2:
+        return 0.0
+    return sum(count * (count - 1) for count in Counter(data).values()) / (n * (n - 1))
+
+
+def classify_cipher(text, model=None, min_letters=100, max_period=20, ioc_tolerance=0.85):
+    """在破译前判断密文是否像单表代换
+
+    单表代换保持重合指数不变，但改变字母分布；换位密码保持重合指数和字母分布；
+    多表代换使重合指数接近随机文本，按周期分列后各列的重合指数才恢复到语言水平。
+    返回包含类型（CIPHER_TYPES 的键）、重合指数、周期等信息的字典。
+    """
+    model = model or ENGLISH_MODEL
+    data = letter_array(text)
+    ioc = index_of_coincidence(data)
+    result = {
+        'type': 'unknown',
+        'letters': len(data),
+        'ioc': ioc,
+        'expected_ioc': model.expected_ioc,
+        'period': None,
+        'fit': model.fit(text),
+    }
+    if len(data) < min_letters:
+        result['reason'] = f"字母数 {len(data)} 太少，无法判断"
+        return result
+    
+    if ioc >= model.expected_ioc * ioc_tolerance:
+        if result['fit'] >= 1.0:
+            result['type'] = 'transposition'
+            result['reason'] = "字母分布与明文语言一致，可能是换位密码或未加密的文本"
+        else:
+            result['type'] = 'monoalphabetic'
+            result['reason'] = "重合指数与明文语言一致，字母分布被置换"
+        return result
+    
+    # 周期性检验：找出各列平均重合指数恢复到语言水平的最小周期
+    result['type'] = 'polyalphabetic'
+    for period in range(2, max_period + 1):
+        columns = [data[i::period] for i in range(period)]
+        if min(len(column) for column in columns) < 2:
+            break
+        column_ioc = sum(index_of_coincidence(column) for column in columns) / period
+        if column_ioc >= model.expected_ioc * ioc_tolerance:
+            result['period'] = period
+            result['reason'] = f"重合指数接近随机文本，按周期 {period} 分列后恢复到语言水平"
+            return result
+    result['reason'] = "重合指数接近随机文本，未发现周期，可能是多表代换或其他密码"
+    return result
+
+
+def describe_classification(classification):
+    """把 classify_cipher 的结果整理成一行说明"""
+    return (f"{CIPHER_TYPES[classification['type']]}（重合指数 {classification['ioc']:.4f}，"
+            f"语言期望 {classification['expected_ioc']:.4f}）：{classification['reason']}")
+
+
+# 'a'..'z' -> 0..25 的 bytes.translate 表
+_LETTER_TO_INDEX = bytes(97) + bytes(range(26)) + bytes(133)
+
+
+def pool_cipher_ngrams(ciphertexts, n):
+    """统计去掉空格和标点后的密文字母流中的 n 元组
+
+    返回 (不同 n 元组依次连接的字母序号字节串, 对应的出现次数列表, n)。
+    n 元组不跨越不同的密文段。评分时只需对每个不同的 n 元组查一次表。
+    """
+    counts = Counter()
+    for text in ciphertexts:
+        codes = letter_array(text).translate(_LETTER_TO_INDEX)
+        counts.update(codes[i:i + n] for i in range(len(codes) - n + 1))
+    return b"".join(counts), list(counts.values()), n
+
+
+def score_pooled_ngrams(key, pooled_ngrams, table):
+    """按 n 元组计数表计算用密钥解密后的对数概率之和（越大越好）"""
+    grams, counts, n = pooled_ngrams
+    plain = grams.translate(key.inverse + bytes(230))
+    index = plain[0::n]
+    for k in range(1, n):
+        index = [i * 26 + c for i, c in zip(index, plain[k::n])]
+    return sum(count * table[i] for i, count in zip(index, counts))
+
+
+def build_word_trie(words, max_length=20):
+    """由词表构造分词用的字典树（嵌套字典，'$' 标记单词结尾）"""
+    trie = {}
+    for word in words:
+        word = word.lower()
+        if len(word) <= max_length and word.isascii() and word.isalpha():
+            node = trie
+            for c in word:
+                node = node.setdefault(c, {})
+            node['$'] = True
+    return trie
+
+
+def segment_words(text, trie):
+    """在去掉空格和标点的字母串上切分单词（维特比式动态规划）
+
+    词典中长度为 L 的单词得 L*L 分，不在词典中的字母不得分，取总分最高、
+    分数相同时段数最少的切分。每个位置只沿字典树向后查找，而字典树的深度有上限，
+    所以总时间与文本长度成线性关系。返回 ([(片段, 是否为词典单词), ...], 词典单词覆盖的字母比例)，
+    相邻的未知字母合并为一个片段。
+    """
+    letters = letter_array(text).decode('ascii')
+    n = len(letters)
+    if not n:
+        return [], 0.0
+    best = [(0, 0)] + [(-1, 0)] * n  # 前缀的最佳 (得分, -段数)
+    back = [0] * (n + 1)
+    for i in range(n):
+        score, segments = best[i]
+        # 单个未知字母
+        candidate = (score, segments - 1)
+        if candidate > best[i + 1]:
+            best[i + 1] = candidate
+            back[i + 1] = i
+        # 从 i 开始的所有词典单词
+        node = trie
+        for j in range(i, n):
+            node = node.get(letters[j])
+            if node is None:
+                break
+            if '$' in node:
+                length = j + 1 - i
+                candidate = (score + length * length, segments - 1)
+                if candidate > best[j + 1]:
+                    best[j + 1] = candidate
+                    back[j + 1] = i
+    
+    pieces = []
+    end = n
+    while end > 0:
+        start = back[end]
+        pieces.append(letters[start:end])
+        end = start
+    pieces.reverse()
+    
+    tokens = []
+    covered = 0
+    for piece in pieces:
+        known = len(piece) > 1 or _trie_contains(trie, piece)
+        if known:
+            covered += len(piece)
+        if not known and tokens and not tokens[-1][1]:
+            tokens[-1] = (tokens[-1][0] + piece, False)
+        else:
+            tokens.append((piece, known))
+    return tokens, covered / n
+
+
+def _trie_contains(trie, word):
+    node = trie
+    for c in word:
+        node = node.get(c)
+        if node is None:
+            return False
+    return '$' in node
+
+
+def segment_text(text, trie):
+    """返回按词典切分后以空格分隔的文本"""
+    tokens, _ = segment_words(text, trie)
+    return " ".join(token for token, _ in tokens)
+
+
+def word_pattern(word):
+    """单词的字母重复模式，如 attack -> (0, 1, 1, 0, 2, 3)；单表代换不改变该模式"""
+    seen = {}
+    return tuple(seen.setdefault(c, len(seen)) for c in word)
+
+
+class PatternIndex:
+    """密文单词的模式索引，用于明文片段拖动（crib dragging）
+
+    构造时按字母重复模式记录每个模式出现的单词位置。拖动明文片段时只检查
+    与片段中最少见的单词模式相同的位置，每个位置的检查只与片段长度有关，
+    整段密文的扫描是线性的，同一索引可以反复拖动不同的片段。
+    """
+
+    def __init__(self, ciphertext):
+        self.words = []  # 密文单词（小写）
+        self.offsets = []  # 各单词在密文中的字符位置
+        self.positions = {}  # 模式 -> 单词序号列表
+        for i, match in enumerate(WORD_PATTERN.finditer(ciphertext)):
+            word = match.group().lower()
+            self.words.append(word)
+            self.offsets.append(match.start())
+            self.positions.setdefault(word_pattern(word), []).append(i)
+
+    def drag(self, crib, fixed_pairs=None):
+        """把明文片段与每个可能的单词位置对齐，返回与代换和固定密钥对都不矛盾的位置
+
+        对应相同密文的位置合并为一个结果，包含首次出现的单词序号 position、字符位置 offset、
+        出现次数 count、对应的密文 cipher、推出的映射 mapping（明文 -> 密文）
+        和其中尚未固定的新映射数 new_pairs。出现次数多的结果排在前面。
+        """
+        crib_words = WORD_PATTERN.findall(crib.lower())
+        if not crib_words:
+            return []
+        patterns = [word_pattern(word) for word in crib_words]
+        # 以密文中出现次数最少的模式为锚点，候选位置最少
+        anchor = min(range(len(crib_words)), key=lambda i: len(self.positions.get(patterns[i], ())))
+        fixed_pairs = dict(fixed_pairs or {})
+        fixed_inverse = {ciph: plain for plain, ciph in fixed_pairs.items()}
+        
+        placements = {}
+        for position in self.positions.get(patterns[anchor], ()):
+            start = position - anchor
+            if start < 0 or start + len(crib_words) > len(self.words):
+                continue
+            cipher = " ".join(self.words[start:start + len(crib_words)])
+            if cipher in placements:
+                placements[cipher]['count'] += 1
+                continue
+            mapping = self.implied_mapping(crib_words, patterns, start, fixed_pairs, fixed_inverse)
+            if mapping is None:
+                continue
+            placements[cipher] = {
+                'position': start,
+                'offset': self.offsets[start],
+                'count': 1,
+                'cipher': cipher,
+                'mapping': mapping,
+                'new_pairs': sum(1 for plain in mapping if plain not in fixed_pairs),
+            }
+        return sorted(placements.values(), key=lambda placement: (-placement['count'], placement['position']))
+
+    def implied_mapping(self, crib_words, patterns, start, fixed_pairs, fixed_inverse):
+        """片段放在第 start 个单词处推出的映射；与代换或固定密钥对矛盾时返回 None"""
+        mapping = {}
+        inverse = {}
+        for offset, (plain_word, pattern) in enumerate(zip(crib_words, patterns)):
+            cipher_word = self.words[start + offset]
+            if len(cipher_word) != len(plain_word) or word_pattern(cipher_word) != pattern:
+                return None
+            for plain, ciph in zip(plain_word, cipher_word):
+                if mapping.setdefault(plain, ciph) != ciph or inverse.setdefault(ciph, plain) != plain:
+                    return None
+                if fixed_pairs.get(plain, ciph) != ciph or fixed_inverse.get(ciph, plain) != plain:
+                    return None
+        return mapping
+
+
+# 界面中的评分方式名称 -> CipherBreaker 的 scorer
+SCORERS = {"词典匹配": "dictionary", "n元语法": "ngram"}
+
+# 界面中的破译算法名称 -> CipherBreaker 的 mode
+BREAK_MODES = {"模拟退火": "anneal", "遗传算法": "genetic", "精确搜索": "exact"}
+
+MIN_RESUME_BUDGET = 5.0  # 从检查点恢复时至少给出的时间预算（秒），保存时预算可能已经用完
+
+
+def record_key(seed, index, fixed_pairs=None):
+    """批量加密中第 index 条记录的密钥，只由种子和序号决定，与进程划分无关"""
+    return random_key(random.Random(f"{seed}:{index}"), fixed_pairs)
+
+
+def _encrypt_records(seed, fixed_pairs, start, texts):
+    """在工作进程中加密一批记录，返回 [(密钥字典, 密文), ...]"""
+    results = []
+    for index, text in enumerate(texts, start):
+        key = record_key(seed, index, fixed_pairs)
+        results.append((key.to_dict(), key.encrypt_bytes(text.encode('utf-8')).decode('utf-8')))
+    return results
+
+
+def encrypt_corpus(records, seed, fixed_pairs=None, workers=None, batch_size=1000):
+    """批量加密明文记录流，每条记录使用独立的随机密钥
+
+    按原顺序逐条产生 (序号, 明文, 密钥字典, 密文)。记录按批分给进程池加密，
+    同时在途的批数有上限，任意长的记录流只占用有限的内存。
+    """
+    workers = workers or os.cpu_count() or 1
+    fixed_pairs = dict(fixed_pairs or {})
+    
+    def batches():
+        batch = []
+        for text in records:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    if workers == 1:
+        start = 0
+        for batch in batches():
+            for offset, (key, ciphertext) in enumerate(_encrypt_records(seed, fixed_pairs, start, batch)):
+                yield start + offset, batch[offset], key, ciphertext
+            start += len(batch)
+        return
+    
+    pool = create_process_pool(max_workers=workers)
+    try:
+        pending = []
+        start = 0
+        for batch in batches():
+            pending.append((start, batch, pool.submit(_encrypt_records, seed, fixed_pairs, start, batch)))
+            start += len(batch)
+            if len(pending) >= workers * 2:
+                yield from _finished_batch(pending.pop(0))
+        while pending:
+            yield from _finished_batch(pending.pop(0))
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _finished_batch(item):
+    """等待一批记录加密完成，按顺序产生该批的结果"""
+    start, batch, future = item
+    for offset, (key, ciphertext) in enumerate(future.result()):
+        yield start + offset, batch[offset], key, ciphertext
+
+
+def read_corpus_records(paths, split='line'):
+    """读取明文记录：.jsonl 文件每行一个含 text 字段的 JSON 对象，
+    其他文件按 split 每行（'line'）、每个空行分隔的段落（'paragraph'）或整个文件（'file'）作为一条记录"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as file:
+            if path.endswith('.jsonl'):
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)['text']
+            elif split == 'file':
+                yield file.read()
+            elif split == 'paragraph':
+                paragraph = []
+                for line in file:
+                    if line.strip():
+                        paragraph.append(line)
+                    elif paragraph:
+                        yield "".join(paragraph).strip()
+                        paragraph = []
+                if paragraph:
+                    yield "".join(paragraph).strip()
+            else:
+                for line in file:
+                    line = line.rstrip('\n')
+                    if line.strip():
+                        yield line
+
+
+def write_corpus_jsonl(triples, path, shard_size=None):
+    """把 (序号, 明文, 密钥字典, 密文) 写成 JSONL；给出 shard_size 时 path 为目录，每个分片文件最多 shard_size 条"""
+    if shard_size:
+        os.makedirs(path, exist_ok=True)
+    file = None
+    count = 0
+    try:
+        for index, plaintext, key, ciphertext in triples:
+            if file is None or (shard_size and count % shard_size == 0):
+                if file is not None:
+                    file.close()
+                shard_path = os.path.join(path, f"part-{count // shard_size:05d}.jsonl") if shard_size else path
+                file = open(shard_path, 'w', encoding='utf-8')
+            file.write(json.dumps(
+                {'id': index, 'plaintext': plaintext, 'key': key, 'ciphertext': ciphertext}, ensure_ascii=False
+            ) + "\n")
+            count += 1
+    finally:
+        if file is not None:
+            file.close()
+    return count
+
+
+def write_corpus_files(triples, directory, shard_size=1000):
+    """按 text_key 目录的格式写出 plaintextN.txt、ciphertextN.txt 和 keyN.key，
+    每个子目录 shard-XXXXX 最多 shard_size 组"""
+    count = 0
+    shard = None
+    for index, plaintext, key, ciphertext in triples:
+        if shard is None or index % shard_size == 0:
+            shard = os.path.join(directory, f"shard-{index // shard_size:05d}")
+            os.makedirs(shard, exist_ok=True)
+        number = index + 1  # 与 text_key 中的文件名一样从 1 开始编号
+        with open(os.path.join(shard, f"plaintext{number}.txt"), 'w', encoding='utf-8') as file:
+            file.write(plaintext)
+        with open(os.path.join(shard, f"ciphertext{number}.txt"), 'w', encoding='utf-8') as file:
+            file.write(ciphertext)
+        with open(os.path.join(shard, f"key{number}.key"), 'w', encoding='utf-8') as file:
+            json.dump(key, file)
+        count += 1
+    return count
+
+
+def store_corpus_keys(triples, store, chunk_size=10000):
+    """原样传递 (序号, 明文, 密钥字典, 密文)，同时把每条记录的密钥按块批量追加到密钥库"""
+    chunk = []
+    for triple in triples:
+        index, _, key, ciphertext = triple
+        chunk.append({'ciphertext': ciphertext, 'key': key, 'source': 'corpus', 'record': index})
+        if len(chunk) >= chunk_size:
+            store.append(chunk)
+            chunk = []
+        yield triple
+    if chunk:
+        store.append(chunk)
+
+
+class ExactSolver:
+    """短密文的精确破译（分支定界），求词典匹配得分最高的密钥
+
+    每个密文单词的候选明文是词典中字母重复模式相同、且与固定密钥对不矛盾的单词。
+    搜索时按 出现次数×单词长度/候选数（该单词可能命中的字母数与分支数之比）从高到低选择密文单词，依次尝试其每个候选（同时确定其中的字母映射）
+    或不把它当作词典单词；每次确定新的映射后只重新过滤受影响单词的候选表。
+    候选表存为换行分隔的字符串，过滤时用一次 str.translate 把未使用的明文字母替换为 '?'，
+    与按已确定映射解密出的模板逐行比较即可；
+    候选按字母的语言概率从高到低排列，使较好的解较早出现、剪枝更多。
+    上界 = 已确定命中的单词数 + 仍有候选的未定单词的出现次数，上界不超过已知最佳时剪枝。
+    得分相同的最优解按语言模型的 n 元语法得分选出最像自然语言的一个；
+    仍未确定的密文字母按频率顺序对应剩余的明文字母。
+    """
+
+    def __init__(self, ciphertext, dictionary, fixed_pairs=None, model=None, max_ties=10):
+        self.ciphertexts = [ciphertext] if isinstance(ciphertext, str) else list(ciphertext)
+        self.model = model or ENGLISH_MODEL
+        self.fixed_pairs = dict(fixed_pairs or {})
+        self.max_ties = max_ties  # 最多保留的同分最优解数
+        
+        by_pattern = {}
+        log_p = self.model.log_p
+        for word in sorted(dictionary, key=lambda word: -sum(log_p[ord(c) - 97] for c in word) / len(word)):
+            if word.isascii() and word.isalpha() and word.islower():
+                by_pattern.setdefault(word_pattern(word), []).append(word)
+        
+        counts = Counter()
+        letter_counts = Counter()
+        for text in self.ciphertexts:
+            counts.update(WORD_PATTERN.findall(text.lower()))
+            letter_counts.update(c for c in text.lower() if c in LETTERS)
+        self.cipher_order = [c for c, _ in letter_counts.most_common()]  # 密文字母按频率从高到低
+        
+        # 初始映射（密文 -> 明文）来自固定密钥对
+        self.initial = {ciph: plain for plain, ciph in self.fixed_pairs.items()}
+        used = set(self.initial.values())
+        self.words = []  # 有候选的密文单词
+        self.counts = []  # 出现次数
+        self.candidates = []  # 初始候选
+        for word, count in counts.items():
+            candidates = [plain for plain in by_pattern.get(word_pattern(word), ())
+                          if self.consistent(word, plain, self.initial, used)]
+            if candidates:
+                self.words.append(word)
+                self.counts.append(count)
+                self.candidates.append("\n".join(candidates))
+        self.letters = [set(word) for word in self.words]
+        self.plain_letters = [set(candidates) - {"\n"} for candidates in self.candidates]
+        
+        self.nodes = 0
+        self.max_nodes = None
+        self.deadline = None
+        self.should_stop = None
+        self.interrupted = False
+        self.best_score = -1
+        self.ties = []
+
+    @staticmethod
+    def consistent(cipher_word, plain_word, assignment, used):
+        """候选明文单词是否与已确定的映射（密文 -> 明文）不矛盾；调用前已保证两词模式相同"""
+        for ciph, plain in zip(cipher_word, plain_word):
+            assigned = assignment.get(ciph)
+            if assigned is None:
+                if plain in used:
+                    return False
+            elif assigned != plain:
+                return False
+        return True
+
+    def root(self):
+        """搜索的初始状态 (映射, 已用明文字母, 未定单词的候选表, 得分)"""
+        return dict(self.initial), set(self.initial.values()), dict(enumerate(self.candidates)), 0
+
+    def branches(self, state):
+        """展开一个状态：返回其所有子状态，第一个子状态之前先处理已完全确定的单词"""
+        assignment, used, pending, score = self.resolve(*state)
+        if not pending:
+            return []
+        index = max(pending, key=lambda i: self.counts[i] * len(self.words[i]) / (pending[i].count("\n") + 1))
+        candidates = pending.pop(index)
+        children = []
+        for plain_word in candidates.split("\n"):
+            new = {ciph: plain for ciph, plain in zip(self.words[index], plain_word) if ciph not in assignment}
+            children.append(self.assign(assignment, used, pending, score + self.counts[index], new))
+        # 不把该单词当作词典单词
+        children.append((assignment, used, pending, score))
+        return children
+
+    def resolve(self, assignment, used, pending, score):
+        """字母已全部确定的单词不需要分支：仍有候选即命中，否则放弃"""
+        resolved = [i for i in pending if self.letters[i].issubset(assignment)]
+        if resolved:
+            pending = dict(pending)
+            for i in resolved:
+                if pending.pop(i):
+                    score += self.counts[i]
+        return assignment, used, pending, score
+
+    def assign(self, assignment, used, pending, score, new):
+        """确定新的映射，只重新过滤含有新密文字母或候选中含有新明文字母的单词"""
+        assignment = {**assignment, **new}
+        new_plain = set(new.values())
+        used = used | new_plain
+        new_cipher = new.keys()
+        # 已使用的明文字母保持不变，其余替换为 '?'
+        mask = str.maketrans({letter: letter if letter in used else '?' for letter in LETTERS})
+        filtered = {}
+        for i, candidates in pending.items():
+            if not self.letters[i].isdisjoint(new_cipher) or not self.plain_letters[i].isdisjoint(new_plain):
+                # 已确定的密文字母必须解密为对应的明文，其余位置只能是尚未使用的明文字母：
+                # 候选经 mask 替换后应与模板完全相同
+                template = "".join(assignment.get(ciph, '?') for ciph in self.words[i])
+                candidates = "\n".join(
+                    plain for plain, masked in zip(candidates.split("\n"), candidates.translate(mask).split("\n"))
+                    if masked == template
+                )
+            if candidates:
+                filtered[i] = candidates
+        return assignment, used, filtered, score
+
+    def search(self, state):
+        """深度优先的分支定界"""
+        self.nodes += 1
+        if self.nodes % 1000 == 0:
+            if ((self.deadline is not None and time.time() >= self.deadline) or
+                    (self.max_nodes is not None and self.nodes >= self.max_nodes) or
+                    (self.should_stop is not None and self.should_stop())):
+                self.interrupted = True
+        if self.interrupted:
+            return
+        
+        assignment, used, pending, score = state = self.resolve(*state)
+        bound = score + sum(self.counts[i] for i in pending)
+        if bound < self.best_score or (bound == self.best_score and len(self.ties) >= self.max_ties):
+            return
+        if not pending:
+            if score > self.best_score:
+                self.best_score = score
+                self.ties = [assignment]
+            else:
+                self.ties.append(assignment)
+            return
+        for child in self.branches(state):
+            self.search(child)
+
+    def run(self, states=None, time_budget=None, max_nodes=None, should_stop=None):
+        """从给定状态（默认为初始状态）开始搜索，返回 (最佳得分, 同分的映射列表, 是否搜索完整)"""
+        self.deadline = time.time() + time_budget if time_budget is not None else None
+        self.max_nodes = max_nodes
+        self.should_stop = should_stop
+        limit = len(self.words) + 100
+        if sys.getrecursionlimit() < limit:
+            sys.setrecursionlimit(limit)
+        for state in states if states is not None else [self.root()]:
+            self.search(state)
+        return self.best_score, self.ties, not self.interrupted
+
+    def complete(self, assignment):
+        """把部分映射补全为完整密钥：未确定的密文字母按频率顺序对应剩余的明文字母"""
+        assignment = dict(assignment)
+        free_plain = [plain for plain in self.model.frequency_order if plain not in assignment.values()]
+        free_cipher = [c for c in self.cipher_order if c not in assignment]
+        free_cipher += [c for c in LETTERS if c not in assignment and c not in free_cipher]
+        assignment.update(zip(free_cipher, free_plain))
+        return SubstitutionKey.from_dict({plain: ciph for ciph, plain in assignment.items()})
+
+    def rank(self, ties):
+        """补全同分的最优映射，按 n 元语法得分从高到低排列，返回 [(密钥, n 元语法得分), ...]"""
+        order, table = self.model.ngram_table()
+        pooled = pool_cipher_ngrams(self.ciphertexts, order)
+        keys = {self.complete(assignment) for assignment in ties}
+        return sorted(((key, score_pooled_ngrams(key, pooled, table)) for key in keys), key=lambda item: -item[1])
+
+
+def _run_exact_branches(ciphertexts, dictionary, fixed_pairs, model_name, max_ties, states, time_budget, max_nodes,
+                        deadline=None):
+    """在工作进程中搜索精确破译的一部分子树
+
+    给定 deadline（绝对时间）时以它代替 time_budget；在 _init_parallel_worker 初始化的进程中运行时，
+    停止事件被设置后尽快结束，返回到那时为止的结果。
+    """
+    if deadline is not None:
+        time_budget = max(0.001, deadline - time.time())
+    stop_event = _worker_state.get('stop_event')
+    solver = ExactSolver(ciphertexts, dictionary, fixed_pairs, get_language_model(model_name), max_ties)
+    best_score, ties, complete = solver.run(
+        states, time_budget, max_nodes, should_stop=stop_event.is_set if stop_event is not None else None
+    )
+    return best_score, ties, complete, solver.nodes
+
+
+def _run_probe_break(ciphertexts, dictionary, fixed_pairs, model_name, iterations, scorer='dictionary',
+                     time_budget=None):
+    """在工作进程中用指定的语言模型做一次短时间的试探破译，返回该模型达到的归一化得分
+
+    试探被停止或没有剩余预算而没有得到密钥时，置信度为 0、吻合度为负无穷、得分为 None。
+    在 _init_parallel_worker 初始化的进程中运行时，停止事件被设置后尽快结束。
+    """
+    model = get_language_model(model_name)
+    stop_event = _worker_state.get('stop_event')
+    
+    def check_stop(breaker):
+        if stop_event is not None and stop_event.is_set():
+            breaker.stop()
+    
+    breaker = CipherBreaker(
+        ciphertexts,
+        model.words or dictionary,
+        fixed_pairs,
+        iterations,
+        workers=1,
+        progress_callback=check_stop,
+        model=model,
+        scorer=scorer,
+        time_budget=time_budget
+    )
+    breaker.run()
+    if breaker.best_key is None:
+        return {'model': model_name, 'confidence': 0.0, 'fit': float('-inf'), 'score': None,
+                'iterations': breaker.iterations}
+    return {
+        'model': model_name,
+        'confidence': breaker.confidence,
+        'fit': model.fit(breaker.best_key.decrypt(breaker.ciphertext)),
+        'score': breaker.best_match_count,
+        'iterations': breaker.iterations,
+    }
+
+
+def _run_timed_break(ciphertexts, dictionary, fixed_pairs, model_name, scorer, time_budget, seed, initial_key=None,
+                     max_iterations=sys.maxsize, worker_index=None, deadline=None, report_interval=0.5):
+    """在工作进程中按时间预算运行一个单进程的模拟退火破译器，返回结果和合并所需的统计
+
+    只给出 max_iterations（time_budget 为 None）时，同样的种子总是得到同样的结果。
+    给定 deadline（绝对时间）时以它代替 time_budget，进程启动所花的时间不会使破译超出预算。
+    在 _init_parallel_worker 初始化的进程中运行时，每隔 report_interval 秒把
+    (worker_index, 目前的结果, 遥测快照) 放入进度队列，停止事件被设置后尽快结束。
+    """
+    if deadline is not None:
+        time_budget = max(0.001, deadline - time.time())
+    stop_event = _worker_state.get('stop_event')
+    progress_queue = _worker_state.get('progress_queue')
+    last_report = 0.0
+    
+    def report(breaker):
+        nonlocal last_report
+        if stop_event is not None and stop_event.is_set():
+            breaker.stop()
+        if progress_queue is not None and time.time() - last_report >= report_interval:
+            last_report = time.time()
+            progress_queue.put((worker_index, breaker.partial_result(), breaker.telemetry()))
+    
+    breaker = CipherBreaker(
+        ciphertexts,
+        dictionary,
+        fixed_pairs,
+        max_iterations,
+        workers=1,
+        progress_callback=report,
+        model=get_language_model(model_name),
+        scorer=scorer,
+        time_budget=time_budget,
+        seed=seed
+    )
+    breaker.run(SubstitutionKey.from_dict(initial_key) if initial_key else None)
+    return breaker.partial_result()
+
+
+class CipherBreaker:
+    """自动破译器（模拟退火 / 遗传算法）
+
+    不依赖图形界面，可以在界面的后台线程、命令行或任务服务的工作进程中运行。
+    运行过程中每隔一段时间调用 progress_callback(breaker) 报告进度，调用 stop() 可随时停止。
+    ciphertext 也可以是共用同一密钥的多段密文的列表，此时按合并后的单词计数表联合评分，
+    每次迭代的计算量只取决于不同密文单词的数量，不随密文段数增加。
+    给定 candidate_models（语言模型名称列表）时，先用每个模型并行做一次短时间的试探破译，
+    选出归一化得分最高的模型，剩余的迭代次数只用于该模型。
+    scorer 为 'ngram' 时不依赖单词边界，按去掉空格和标点后的字母流的 n 元语法对数概率评分，
+    适用于五字母分组或没有空格的密文。
+    给定 checkpoint_path 时每隔 checkpoint_interval 秒（以及被停止时）把完整的搜索状态
+    （包括随机数发生器状态）原子地写入检查点文件，之后可用 run(resume=...) 从该状态继续。
+    给定 telemetry_queue（queue.Queue）时，每次报告进度都把一份遥测快照（见 telemetry()）放入该队列，
+    界面线程可以按自己的节奏取出，不必在破译线程中操作界面。
+    给定 time_budget（秒）时破译在截止时间前结束并返回到那时为止的最佳密钥；
+    此时模拟退火的各次重启分配到 workers 个进程中并行运行，各进程共用同一截止时间，
+    运行中定期把结果和遥测发回主进程合并（见 break_parallel）。
+    mode 为 'exact' 时用 ExactSolver 做分支定界的精确搜索（只适用于词典匹配评分和较短的密文），
+    迭代次数即搜索的节点数。
+    """
+
+    def __init__(self, ciphertext, dictionary, fixed_pairs=None, max_iterations=1000000,
+                 mode='anneal', workers=None, progress_callback=None, model=None,
+                 candidate_models=None, probe_iterations=20000, scorer='dictionary',
+                 checkpoint_path=None, checkpoint_interval=60.0, seed=None, time_budget=None,
+                 telemetry_queue=None):
+        if mode == 'exact' and scorer != 'dictionary':
+            raise ValueError("精确搜索只支持词典匹配评分")
+        if isinstance(ciphertext, str):
+            self.ciphertexts = [ciphertext]
+        else:
+            self.ciphertexts = list(ciphertext)
+        # 置信度估计等每条链只做一次的计算直接使用合并后的全文
+        self.ciphertext = "\n".join(self.ciphertexts)
+        self.pooled_words = pool_cipher_words(self.ciphertexts)  # 不同的密文单词及出现次数，词典匹配只为它们评分
+        self.dictionary = dictionary
+        self.model = model or ENGLISH_MODEL  # 置信度估计和频率评分使用的语言模型
+        self.base_dictionary = dictionary  # 自动选择时，没有自带词表的模型使用该词典
+        self.candidate_models = list(candidate_models or [])
+        self.probe_iterations = probe_iterations  # 每个候选模型试探破译的迭代次数
+        self.probe_results = []  # 各候选模型的试探结果，按得分从高到低排列
+        self.scorer = scorer  # 'dictionary'（词典匹配数）或 'ngram'（n 元语法对数概率）
+        if scorer == 'ngram':
+            # 只有字母表的模型无法区分代换密钥，n 元语法评分只使用带双字母或四字母表的模型
+            if self.candidate_models:
+                self.candidate_models = [name for name in self.candidate_models if get_language_model(name).has_ngrams]
+                if not self.candidate_models:
+                    raise ValueError("n 元语法评分需要带双字母或四字母表的语言模型，请先用 build-model 编译")
+            elif not self.model.has_ngrams:
+                raise ValueError(f"语言模型 {self.model.name} 没有双字母或四字母表，不能用于 n 元语法评分，"
+                                 "请用 build-model 从语料编译")
+        self.prepare_scoring()
+        self.fixed_pairs = dict(fixed_pairs or {})
+        self.max_iterations = max_iterations
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1  # 遗传算法并行评分的进程数，1 表示在当前进程内评分
+        self.progress_callback = progress_callback
+        self.telemetry_queue = telemetry_queue
+        self.rng = random.Random(seed)  # 独立的随机数发生器，其状态随检查点一起保存
+        self.time_budget = time_budget  # 时间预算（秒），为 None 时只受迭代次数限制
+        self.deadline = None  # 按时间预算计算的截止时间
+        
+        # 检查点
+        self.checkpoint_path = checkpoint_path  # 为 None 时不保存检查点
+        self.checkpoint_interval = checkpoint_interval  # 保存检查点的间隔（秒）
+        self.next_checkpoint = 0.0
+        self.initial_key = None
+        self.restart_keys = []  # 各条退火链的最佳密钥
+        self.resume_phase = None  # 从检查点恢复时，尚未完成的退火链或遗传算法种群
+        
+        # 运行状态
+        self.is_running = False
+        self.cancelled = False
+        self.iterations = 0
+        self.best_key = None
+        self.best_match_count = 0
+        self.confidence = 0.0
+        
+        # 遥测
+        self.started = 0.0  # 本次 run() 的开始时间
+        self.current_score = None  # 当前退火链的得分（遗传算法为当前一代的最高得分）
+        self.temperature = None  # 当前退火链的温度，其他算法为 None
+        self.accepted = 0  # 上次报告以来被接受的交换次数
+        self.last_report = (0.0, 0)  # 上次报告的时间和迭代次数，用于计算速度和接受率
+        
+        # 收敛判断
+        self.convergence_restarts = 3  # 多少次独立重启得到相同密钥即视为收敛
+        self.expected_word_coverage = 0.5  # 词典覆盖率达到该值（且语言吻合度达标）即视为破译成功
+        self.warm_start_acceptance = 0.05  # 从已有密钥继续时，变差的交换被接受的平均概率
+        
+        # 并行破译
+        self.parallel_report_interval = 0.5  # 工作进程发回结果和遥测的间隔（秒）
+        self.parallel_grace = 1.0  # 停止或到达截止时间后等待工作进程交回最终结果的最长时间（秒）
+        self.worker_telemetry = {}  # 工作进程序号 -> 最近一次的遥测快照
+        
+        # 遗传算法参数
+        self.population_size = 200  # 种群大小
+        self.elite_count = 10  # 每代直接保留的最优个体数
+        self.mutation_rate = 0.3  # 子代发生交换变异的概率
+        self.max_stagnant_generations = 200  # 连续多少代没有改进则停止
+        
+        # 候选密钥与字母置信度
+        self.top_k = 10  # 保留得分最高的不同密钥数
+        self.top_keys = []  # (得分, 序号, 密钥) 的最小堆
+        self.top_key_set = set()
+        self.candidate_count = 0
+        self.marginal_window = 0.05  # 得分与最佳得分相差不超过该比例的被接受状态计入字母映射统计
+        self.marginal_counts = [0] * (26 * 26)  # 下标为 密文字母*26+明文字母
+        self.marginal_best = float('-inf')  # 已计入统计的状态中的最高得分
+        
+        # 密文中出现过的字母（序号），判断重启结果是否一致和统计字母置信度时只看这些字母
+        self.present = sorted({ord(c) - 97 for c in self.ciphertext.lower() if c in LETTERS})
+        
+        # 可交换的非固定字母只需计算一次
+        self.non_fixed = [k for k in LETTERS if k not in self.fixed_pairs]
+
+    def prepare_scoring(self):
+        """准备评分：词典匹配评分构造增量评分器；n 元语法评分预先统计密文的 n 元组
+        并构造分词用的字典树（切换语言模型后需重新调用）"""
+        self.pooled_ngrams = None
+        self.ngram_table = None
+        self.word_trie = None
+        self.word_scorer = None
+        if self.scorer == 'dictionary':
+            self.word_scorer = WordScorer(self.pooled_words, self.dictionary)
+        elif self.scorer == 'ngram':
+            order, self.ngram_table = self.model.ngram_table()
+            self.pooled_ngrams = pool_cipher_ngrams(self.ciphertexts, order)
+            self.word_trie = build_word_trie(self.dictionary) if self.dictionary else None
+
+    def run(self, initial_key=None, resume=None):
+        """运行破译直到收敛、迭代次数用尽或被停止，返回结果字典
+
+        resume 为 load_checkpoint 读出的检查点时，从检查点保存的状态继续运行。
+        """
+        self.is_running = True
+        self.cancelled = False
+        self.started = time.time()
+        self.last_report = (self.started, self.iterations)
+        self.next_checkpoint = time.time() + self.checkpoint_interval
+        self.deadline = time.time() + self.time_budget if self.time_budget is not None else None
+        try:
+            if resume is not None:
+                self.restore_checkpoint(resume)
+                self.last_report = (self.started, self.iterations)
+                initial_key = self.initial_key
+            else:
+                self.initial_key = initial_key
+                if self.candidate_models:
+                    self.select_model()
+            if not self.is_running:
+                return self.result()
+            if self.mode == 'genetic':
+                self.break_genetic(initial_key)
+            elif self.mode == 'exact':
+                self.break_exact()
+            elif self.deadline is not None and self.workers > 1 and (
+                    self.resume_phase is None or self.resume_phase['type'] == 'parallel'):
+                self.break_parallel(initial_key)
+            else:
+                self.break_annealing(initial_key)
+        finally:
+            self.is_running = False
+        return self.result()
+
+    def has_budget(self):
+        """是否还可以继续迭代：未被停止、迭代次数未用尽且未到截止时间"""
+        return (self.is_running and self.iterations < self.max_iterations and
+                (self.deadline is None or time.time() < self.deadline))
+
+    def remaining_time(self):
+        """距截止时间的剩余秒数，没有时间预算时为 None"""
+        return max(0.0, self.deadline - time.time()) if self.deadline is not None else None
+
+    # ---- 检查点 ----
+
+    def checkpoint_settings(self):
+        """检查点中保存的破译设置，恢复时据此重新构造破译器"""
+        return {
+            'ciphertexts': self.ciphertexts,
+            'fixed_pairs': self.fixed_pairs,
+            'max_iterations': self.max_iterations,
+            'mode': self.mode,
+            'scorer': self.scorer,
+            'model': self.model.name,
+            'dictionary': dictionary_fingerprint(self.dictionary),
+            'time_budget': self.remaining_time(),  # 恢复时只使用剩余的时间预算
+        }
+
+    def maybe_checkpoint(self, phase):
+        """到达保存间隔时保存检查点；phase 为返回当前退火链或种群状态的函数，只在需要保存时调用"""
+        if self.checkpoint_path and time.time() >= self.next_checkpoint:
+            self.save_checkpoint(phase())
+            self.next_checkpoint = time.time() + self.checkpoint_interval
+
+    def save_checkpoint(self, phase):
+        """把破译的完整状态原子地写入检查点文件（先写临时文件再替换）"""
+        if not self.checkpoint_path:
+            return
+        version, internal, gauss_next = self.rng.getstate()
+        checkpoint = {
+            'version': 1,
+            'saved': time.time(),
+            'settings': self.checkpoint_settings(),
+            'iterations': self.iterations,
+            'best_key': self.best_key.to_dict() if self.best_key is not None else None,
+            'best_score': self.best_match_count,
+            'confidence': self.confidence,
+            'initial_key': self.initial_key.to_dict() if self.initial_key is not None else None,
+            'restart_keys': [key.to_dict() for key in self.restart_keys],
+            'rng_state': [version, list(internal), gauss_next],
+            'top_keys': [[key.to_dict(), score] for key, score in self.top_candidates()],
+            'marginal_counts': self.marginal_counts,
+            'marginal_best': self.marginal_best,
+            'probe_results': self.probe_results,
+            'phase': phase,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(checkpoint, file, ensure_ascii=False)
+            os.replace(tmp_path, self.checkpoint_path)
+        except Exception as e:
+            print(f"保存检查点时出错: {str(e)}")
+
+    def remove_checkpoint(self):
+        """破译正常结束后删除检查点"""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            try:
+                os.remove(self.checkpoint_path)
+            except OSError as e:
+                print(f"删除检查点时出错: {str(e)}")
+
+    @staticmethod
+    def load_checkpoint(path):
+        """读取检查点文件"""
+        with open(path, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('version') != 1:
+            raise ValueError(f"不支持的检查点版本: {checkpoint.get('version')}")
+        return checkpoint
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, dictionary, **options):
+        """按检查点中的设置构造破译器，之后调用 run(resume=checkpoint) 继续破译
+
+        检查点中的剩余时间预算不足 MIN_RESUME_BUDGET 秒时按 MIN_RESUME_BUDGET 秒继续。
+        """
+        settings = checkpoint['settings']
+        ciphertexts = settings['ciphertexts']
+        model = get_language_model(settings['model'])
+        time_budget = settings.get('time_budget')
+        if time_budget is not None:
+            time_budget = max(time_budget, MIN_RESUME_BUDGET)
+        return cls(
+            ciphertexts if len(ciphertexts) > 1 else ciphertexts[0],
+            model.words or dictionary,
+            settings['fixed_pairs'],
+            settings['max_iterations'],
+            mode=settings['mode'],
+            model=model,
+            scorer=settings['scorer'],
+            time_budget=time_budget,
+            **options
+        )
+
+    def restore_checkpoint(self, checkpoint):
+        """恢复检查点中保存的状态"""
+        def to_key(mapping):
+            return SubstitutionKey.from_dict(mapping) if mapping else None
+        
+        saved = checkpoint['settings']['dictionary']
+        if saved != self.checkpoint_settings()['dictionary']:
+            print("警告: 当前词典与保存检查点时使用的词典不同，继续破译的得分可能与之前不可比")
+        
+        self.iterations = checkpoint['iterations']
+        self.best_key = to_key(checkpoint['best_key'])
+        self.best_match_count = checkpoint['best_score']
+        self.confidence = checkpoint['confidence']
+        self.initial_key = to_key(checkpoint['initial_key'])
+        self.restart_keys = [to_key(mapping) for mapping in checkpoint['restart_keys']]
+        version, internal, gauss_next = checkpoint['rng_state']
+        self.rng.setstate((version, tuple(internal), gauss_next))
+        for mapping, score in checkpoint['top_keys']:
+            self.record_candidate(to_key(mapping), score)
+        self.marginal_counts = checkpoint['marginal_counts']
+        self.marginal_best = checkpoint['marginal_best']
+        self.probe_results = checkpoint['probe_results']
+        self.resume_phase = checkpoint['phase']
+
+    def select_model(self):
+        """对每个候选语言模型并行做试探破译，选出得分最高的模型
+
+        试探破译消耗的迭代次数计入总迭代次数，之后的破译只使用剩余的预算。
+        只有一个候选模型时不做试探，直接使用该模型。
+        """
+        if len(self.candidate_models) == 1:
+            self.model = get_language_model(self.candidate_models[0])
+            self.dictionary = self.model.words or self.base_dictionary
+            self.prepare_scoring()
+            return
+        
+        budget = min(self.probe_iterations, self.max_iterations // (len(self.candidate_models) + 1))
+        # 有时间预算时，试探破译合计最多使用预算的一半
+        probe_time = None
+        if self.deadline is not None:
+            rounds = -(-len(self.candidate_models) // max(1, self.workers))
+            probe_time = self.remaining_time() / (2 * rounds)
+        args = [
+            (self.ciphertexts, self.base_dictionary, self.fixed_pairs, name, budget, self.scorer, probe_time)
+            for name in self.candidate_models
+        ]
+        
+        if self.workers > 1 and len(args) > 1:
+            stop_event = multiprocessing.get_context('spawn').Event()
+            pool = create_process_pool(_init_parallel_worker, (stop_event,), min(self.workers, len(args)))
+            try:
+                futures = {pool.submit(_run_probe_break, *arg): i for i, arg in enumerate(args)}
+                finished = {}  # 候选模型的序号 -> 试探结果
+                pending = set(futures)
+                # 定时检查是否被停止；被停止时通知运行中的试探结束，不再等待
+                while pending and self.is_running:
+                    done, pending = wait(pending, timeout=self.parallel_report_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished[futures[future]] = future.result()
+                results = [finished[i] for i in sorted(finished)]
+            finally:
+                stop_event.set()
+                pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            results = []
+            for arg in args:
+                if not self.is_running:
+                    break
+                results.append(_run_probe_break(*arg))
+        self.iterations += sum(item['iterations'] for item in results)
+        # 没有得到密钥的试探不参与选择
+        results = [item for item in results if item['score'] is not None]
+        if not results:
+            return
+        
+        self.probe_results = sorted(results, key=lambda item: (item['confidence'], item['fit']), reverse=True)
+        for item in self.probe_results:
+            print(f"语言模型 {item['model']}: 置信度 {item['confidence']*100:.2f}%，吻合度 {item['fit']:.3f}")
+        
+        self.model = get_language_model(self.probe_results[0]['model'])
+        self.dictionary = self.model.words or self.base_dictionary
+        self.prepare_scoring()
+        print(f"选择语言模型 {self.model.name}")
+        self.report_progress()
+
+    def stop(self):
+        """请求停止破译，运行中的循环会在下一次检查时退出"""
+        self.cancelled = True
+        self.is_running = False
+
+    def result(self):
+        return {
+            'key': self.best_key.to_dict() if self.best_key is not None else None,
+            'score': self.best_match_count if self.best_key is not None else 0,
+            'confidence': self.confidence,
+            'iterations': self.iterations,
+            'cancelled': self.cancelled,
+            'model': self.model.name,
+            'top_keys': [{'key': key.to_dict(), 'score': score} for key, score in self.top_candidates()],
+            'marginals': {
+                letter: [[plain, probability] for plain, probability in candidates[:3]]
+                for letter, candidates in self.letter_marginals().items()
+            },
+        }
+
+    def partial_result(self):
+        """result() 加上合并多个破译器的结果所需的统计：各次重启的密钥和字母映射统计"""
+        result = self.result()
+        result['restart_keys'] = [key.to_dict() for key in self.restart_keys]
+        result['marginal_counts'] = self.marginal_counts
+        result['marginal_best'] = self.marginal_best
+        return result
+
+    def record_candidate(self, key, score):
+        """把密钥加入得分最高的 top_k 个不同密钥中"""
+        heap = self.top_keys
+        if len(heap) >= self.top_k and score <= heap[0][0]:
+            return
+        if key in self.top_key_set:
+            return
+        self.candidate_count += 1
+        entry = (score, self.candidate_count, key)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, entry)
+        else:
+            removed = heapq.heappushpop(heap, entry)
+            self.top_key_set.discard(removed[2])
+        self.top_key_set.add(key)
+
+    def record_marginals(self, key, score):
+        """把一个接近最佳得分的被接受状态计入各密文字母的映射统计
+
+        出现明显更好的状态时清空此前的统计，使统计只反映当前最佳解附近的状态。
+        """
+        window = self.marginal_window * max(1.0, abs(score))
+        if score < self.marginal_best - window:
+            return
+        if score > self.marginal_best + window:
+            self.marginal_counts = [0] * (26 * 26)
+        self.marginal_best = max(self.marginal_best, score)
+        counts = self.marginal_counts
+        inverse = key.inverse
+        for c in self.present:
+            counts[c * 26 + inverse[c]] += 1
+
+    def top_candidates(self):
+        """得分从高到低的候选密钥列表 [(密钥, 得分), ...]"""
+        return [(key, score) for score, _, key in sorted(self.top_keys, reverse=True)]
+
+    def letter_marginals(self):
+        """各密文字母映射到各明文字母的比例 {密文字母: [(明文字母, 比例), ...]}，按比例从高到低排列"""
+        marginals = {}
+        for c in self.present:
+            row = self.marginal_counts[c * 26:(c + 1) * 26]
+            total = sum(row)
+            if total:
+                marginals[LETTERS[c]] = sorted(
+                    ((LETTERS[p], count / total) for p, count in enumerate(row) if count),
+                    key=lambda item: item[1],
+                    reverse=True
+                )
+        return marginals
+
+    def report_progress(self):
+        if self.telemetry_queue is not None:
+            self.telemetry_queue.put(self.telemetry())
+        if self.progress_callback is not None:
+            self.progress_callback(self)
+
+    def telemetry(self):
+        """遥测快照：速度、当前与最佳得分、温度、接受率和最佳密钥
+
+        速度和接受率按上次取快照以来的迭代计算，因此每次报告只应调用一次；其间没有迭代时两者为 None。
+        """
+        now = time.time()
+        last_time, last_iterations = self.last_report
+        steps = self.iterations - last_iterations
+        elapsed = now - last_time
+        snapshot = {
+            'elapsed': now - self.started,
+            'iterations': self.iterations,
+            'rate': steps / elapsed if steps > 0 and elapsed > 0 else None,
+            'current_score': self.current_score,
+            'best_score': self.best_match_count if self.best_key is not None else None,
+            'temperature': self.temperature,
+            'acceptance_rate': self.accepted / steps if self.temperature is not None and steps > 0 else None,
+            'confidence': self.confidence,
+            'best_key': self.best_key.to_dict() if self.best_key is not None else None,
+        }
+        if steps > 0:
+            self.last_report = (now, self.iterations)
+            self.accepted = 0
+        if self.worker_telemetry:
+            self.merge_worker_telemetry(snapshot)
+        return snapshot
+
+    def merge_worker_telemetry(self, snapshot):
+        """并行破译时，用各工作进程最近的遥测填入快照中的当前得分、温度和接受率
+
+        主进程自己不运行退火链，这几项只能来自工作进程：当前得分取最高值，温度和接受率取平均。
+        """
+        reports = list(self.worker_telemetry.values())
+        scores = [report['current_score'] for report in reports if report['current_score'] is not None]
+        temperatures = [report['temperature'] for report in reports if report['temperature'] is not None]
+        acceptance = [report['acceptance_rate'] for report in reports if report['acceptance_rate'] is not None]
+        snapshot['current_score'] = max(scores) if scores else None
+        snapshot['temperature'] = sum(temperatures) / len(temperatures) if temperatures else None
+        snapshot['acceptance_rate'] = sum(acceptance) / len(acceptance) if acceptance else None
+
+    def break_annealing(self, initial_key=None):
+        """使用模拟退火算法自动破译密码
+
+        每条退火链结束后从新的随机密钥重启，直到多次独立重启得到一致的密钥、
+        解密结果达到该语言文本的期望水平、迭代次数用尽或被停止。
+        给定 initial_key 时先逐步精化：每条链都从目前的最佳密钥出发，
+        初始温度按该密钥附近的得分变化自动标定，只做局部调整；某条精化链不再提高最佳得分后
+        改为从随机密钥重启。精化链的结果总是接近出发的密钥，不是独立的证据，不计入重启一致度。
+        """
+        present = self.present
+        refining = initial_key is not None
+        
+        resume = self.resume_phase
+        self.resume_phase = None
+        if resume is None:
+            self.best_key = None
+            self.best_match_count = float('-inf')
+            self.restart_keys = []
+        elif resume['type'] == 'parallel':
+            # 并行破译的检查点没有未完成的链，保留已恢复的结果，继续新的退火链
+            resume = None
+        restart_keys = self.restart_keys
+        
+        while self.has_budget():
+            independent = not refining
+            if resume is not None:
+                # 继续检查点中尚未完成的退火链
+                chain_key, chain_score = self.anneal_chain(resume=resume)
+                resume = None
+            elif refining:
+                start_key = self.best_key if self.best_key is not None else initial_key
+                previous_best = self.best_match_count
+                temperature = self.calibrate_temperature(start_key)
+                chain_key, chain_score = self.anneal_chain(start_key, temperature)
+                refining = self.best_match_count > previous_best
+            else:
+                chain_key, chain_score = self.anneal_chain()
+            if not self.is_running:
+                break  # 被停止的链不计入重启结果，恢复时会从检查点继续这条链
+            if independent:
+                restart_keys.append(chain_key)
+            
+            # 统计与当前最佳密钥一致的重启次数
+            agreeing = sum(
+                1 for key in restart_keys
+                if all(key.inverse[c] == self.best_key.inverse[c] for c in present)
+            )
+            agreement = min(1.0, agreeing / self.convergence_restarts)
+            self.confidence, solved = self.estimate_confidence(self.best_key, self.best_match_count, agreement)
+            self.report_progress()
+            
+            if agreeing >= self.convergence_restarts:
+                print(f"破译收敛: {agreeing} 次独立重启得到一致的密钥")
+                break
+            if solved:
+                print("破译收敛: 解密结果已达到该语言文本的期望水平")
+                break
+
+    def anneal_chain(self, initial_key=None, temperature=100.0, resume=None):
+        """运行一条模拟退火链（默认从随机密钥开始），返回该链的最佳密钥和得分
+
+        resume 为检查点中保存的链状态时，从该状态继续运行。
+        """
+        if resume is not None:
+            current_key = SubstitutionKey.from_dict(resume['current_key'])
+            current_score = resume['current_score']
+            chain_best_key = SubstitutionKey.from_dict(resume['chain_best_key'])
+            chain_best_score = resume['chain_best_score']
+            temperature = resume['temperature']
+            stagnation_count = resume['stagnation_count']
+        else:
+            # 初始化密钥
+            current_key = initial_key if initial_key is not None else self.generate_initial_key()
+            current_score = self.evaluate_key(current_key)
+            
+            # 本条链的最佳密钥
+            chain_best_key = current_key
+            chain_best_score = current_score
+            if current_score > self.best_match_count:
+                self.best_key = current_key
+                self.best_match_count = current_score
+            
+            # 记录连续未改进的迭代次数
+            stagnation_count = 0
+        
+        # 模拟退火参数
+        cooling_rate = 0.999  # 减慢降温速率，增加探索时间
+        max_stagnation = 10000  # 连续10000次迭代没有改进则停止
+        
+        def chain_state():
+            return {
+                'type': 'anneal',
+                'current_key': current_key.to_dict(),
+                'current_score': current_score,
+                'chain_best_key': chain_best_key.to_dict(),
+                'chain_best_score': chain_best_score,
+                'temperature': temperature,
+                'stagnation_count': stagnation_count,
+            }
+        
+        # 迭代
+        while temperature > 0.1 and self.has_budget():
+            # 生成新密钥
+            new_key = self.swap_mapping(current_key)
+            new_score = self.evaluate_key(new_key)
+            
+            # 计算接受概率
+            prob = self.acceptance_probability(current_score, new_score, temperature)
+            
+            # 决定是否接受新解
+            if prob > self.rng.random():
+                current_key = new_key
+                current_score = new_score
+                self.accepted += 1
+                self.record_candidate(current_key, current_score)
+                self.record_marginals(current_key, current_score)
+                
+                # 更新最佳解
+                if current_score > chain_best_score:
+                    chain_best_key = current_key
+                    chain_best_score = current_score
+                    stagnation_count = 0
+                    if current_score > self.best_match_count:
+                        self.best_key = current_key
+                        self.best_match_count = current_score
+                else:
+                    stagnation_count += 1
+            else:
+                stagnation_count += 1
+            
+            # 增加迭代次数
+            self.iterations += 1
+            
+            # 每1000次迭代报告一次进度，减少界面更新频率提高性能
+            if self.iterations % 1000 == 0:
+                self.current_score = current_score
+                self.temperature = temperature
+                self.report_progress()
+                self.maybe_checkpoint(chain_state)
+            
+            # 检查是否停滞
+            if stagnation_count >= max_stagnation:
+                print(f"破译停滞: 在 {max_stagnation} 次迭代中没有改进")
+                break
+            
+            # 降低温度
+            temperature *= cooling_rate
+            
+            # 小睡一下，避免CPU占用过高，但时间更短
+            if self.iterations % 100 == 0:
+                time.sleep(0.001)  # 每100次迭代才休眠，减少休眠次数
+        
+        if not self.is_running:
+            # 被停止时保存检查点，之后可以从这里继续
+            self.save_checkpoint(chain_state())
+        
+        return chain_best_key, chain_best_score
+
+    def break_exact(self):
+        """分支定界的精确搜索；有多个工作进程时把第一层子树分给各进程
+
+        多进程时各进程共用停止事件和截止时间：被停止或到达截止时间时通知各进程结束，
+        最多等待 parallel_grace 秒收取各子树目前的结果，此时的结果不是完整的证明。
+        """
+        solver = ExactSolver(self.ciphertexts, self.dictionary, self.fixed_pairs, self.model, self.top_k)
+        max_nodes = self.max_iterations - self.iterations
+        if self.workers > 1:
+            # 展开到子状态数不少于进程数，再按轮转分组
+            states = [solver.root()]
+            while 0 < len(states) < self.workers * 4:
+                expanded = solver.branches(states[0])
+                if not expanded:
+                    break
+                states = states[1:] + expanded
+            groups = [states[i::self.workers] for i in range(self.workers)]
+            stop_event = multiprocessing.get_context('spawn').Event()
+            pool = create_process_pool(_init_parallel_worker, (stop_event,), self.workers)
+            try:
+                pending = {
+                    pool.submit(
+                        _run_exact_branches, self.ciphertexts, self.dictionary, self.fixed_pairs, self.model.name,
+                        self.top_k, group, None, max_nodes // self.workers, deadline=self.deadline
+                    )
+                    for group in groups if group
+                }
+                best_score, ties, complete = -1, [], True
+                finished = []
+                while pending and self.is_running and (self.deadline is None or self.remaining_time() > 0):
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    finished.extend(done)
+                # 通知仍在搜索的进程结束，稍等它们交回目前的结果
+                stop_event.set()
+                done, pending = wait(pending, timeout=self.parallel_grace)
+                finished.extend(done)
+                complete = not pending
+                for future in finished:
+                    score, group_ties, group_complete, nodes = future.result()
+                    self.iterations += nodes
+                    complete = complete and group_complete
+                    if score > best_score:
+                        best_score, ties = score, group_ties
+                    elif score == best_score:
+                        ties += group_ties
+            finally:
+                stop_event.set()
+                pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            best_score, ties, complete = solver.run(
+                time_budget=self.remaining_time(), max_nodes=max_nodes, should_stop=lambda: not self.is_running
+            )
+            self.iterations += solver.nodes
+        if not ties:
+            return
+        
+        ranked = solver.rank(ties[:self.top_k])
+        for key, _ in reversed(ranked):
+            self.record_candidate(key, self.evaluate_key(key))
+        self.best_key = ranked[0][0]
+        self.best_match_count = self.evaluate_key(self.best_key)
+        self.confidence, _ = self.estimate_confidence(self.best_key, self.best_match_count)
+        if complete:
+            print(f"精确搜索完成: 已证明词典匹配得分 {best_score} 为最优，共搜索 {self.iterations} 个节点")
+        else:
+            print(f"精确搜索未完成: 返回目前的最佳得分 {best_score}")
+        self.report_progress()
+
+    def break_parallel(self, initial_key=None):
+        """按时间预算在多个进程中并行运行模拟退火，合并各进程的结果
+
+        每个进程独立地重复退火链，直到收敛、用完分到的迭代次数或到达共同的截止时间，
+        各次重启的结果一起用于判断收敛。
+        各进程每隔 parallel_report_interval 秒通过队列发回目前的结果和遥测，主进程随即合并、
+        报告进度并按间隔保存检查点。被停止或到达截止时间时通知各进程结束，
+        最多等待 parallel_grace 秒收取最终结果，再合并所有已收到的结果。
+        从并行破译的检查点恢复时，检查点中的结果与新一轮的结果一起合并。
+        """
+        resume = self.resume_phase
+        self.resume_phase = None
+        if resume is None:
+            self.best_key = None
+            self.best_match_count = float('-inf')
+            self.restart_keys = []
+        # 此前的状态（试探破译用掉的迭代次数，或检查点中已合并的结果）作为一份结果参与合并
+        previous = self.partial_result()
+        self.worker_telemetry = {}
+        start_key = initial_key.to_dict() if initial_key is not None else None
+        # 剩余的迭代次数平均分给各进程；合并时各进程的迭代次数与 previous 相加，总数不超过上限
+        worker_iterations = max(1, (self.max_iterations - self.iterations) // self.workers)
+        
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        progress_queue = context.Queue()
+        latest = {}  # 工作进程序号 -> 最近收到的结果，进程结束后为最终结果
+        finished = set()
+        
+        def collect(done):
+            for future in done:
+                index = futures[future]
+                latest[index] = future.result()
+                finished.add(index)
+        
+        def drain():
+            received = False
+            while True:
+                try:
+                    index, partial, snapshot = progress_queue.get_nowait()
+                except queue.Empty:
+                    return received
+                self.worker_telemetry[index] = snapshot
+                if index not in finished:
+                    latest[index] = partial
+                received = True
+        
+        pool = create_process_pool(_init_parallel_worker, (stop_event, progress_queue), self.workers)
+        try:
+            futures = {
+                pool.submit(
+                    _run_timed_break, self.ciphertexts, self.dictionary, self.fixed_pairs, self.model.name,
+                    self.scorer, None, self.rng.getrandbits(64), start_key, max_iterations=worker_iterations,
+                    worker_index=index, deadline=self.deadline, report_interval=self.parallel_report_interval
+                ): index
+                for index in range(self.workers)
+            }
+            pending = set(futures)
+            while pending and self.is_running and self.remaining_time() > 0:
+                timeout = min(self.parallel_report_interval, self.remaining_time())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                collect(done)
+                if drain() or done:
+                    self.merge_results([previous] + list(latest.values()))
+                    self.report_progress()
+                    self.maybe_checkpoint(lambda: {'type': 'parallel'})
+            
+            # 通知仍在运行的进程结束，稍等它们交回最终结果
+            stop_event.set()
+            done, pending = wait(pending, timeout=self.parallel_grace)
+            collect(done)
+            drain()
+            self.merge_results([previous] + list(latest.values()))
+            self.report_progress()
+        finally:
+            stop_event.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        if not self.is_running:
+            # 被停止时保存合并后的状态，之后可以从这里继续
+            self.save_checkpoint({'type': 'parallel'})
+
+    def merge_results(self, results):
+        """合并并行破译进程的结果：最佳密钥、候选密钥、字母映射统计和重启一致度"""
+        if not results:
+            return
+        self.iterations = sum(result['iterations'] for result in results)
+        best = max((result for result in results if result['key']), key=lambda result: result['score'], default=None)
+        if best is None:
+            return
+        self.best_key = SubstitutionKey.from_dict(best['key'])
+        self.best_match_count = best['score']
+        self.restart_keys = [SubstitutionKey.from_dict(key) for result in results for key in result['restart_keys']]
+        
+        for result in results:
+            for item in result['top_keys']:
+                self.record_candidate(SubstitutionKey.from_dict(item['key']), item['score'])
+        # 只合并最佳解附近的字母映射统计
+        window = self.marginal_window * max(1.0, abs(self.best_match_count))
+        self.marginal_counts = [0] * (26 * 26)
+        self.marginal_best = self.best_match_count
+        for result in results:
+            if result['marginal_best'] >= self.best_match_count - window:
+                for i, count in enumerate(result['marginal_counts']):
+                    self.marginal_counts[i] += count
+        
+        agreeing = sum(
+            1 for key in self.restart_keys
+            if all(key.inverse[c] == self.best_key.inverse[c] for c in self.present)
+        )
+        agreement = min(1.0, agreeing / self.convergence_restarts)
+        self.confidence, _ = self.estimate_confidence(self.best_key, self.best_match_count, agreement)
+
+    def estimate_confidence(self, key, score, agreement=0.0):
+        """估计破译结果的置信度（0~1），并判断是否已可视为破译成功
+
+        置信度 = 语言吻合度 × max(重启一致度, 词典覆盖率/期望覆盖率)。
+        n 元语法评分时，词典覆盖率为分词后词典单词覆盖的字母比例。
+        """
+        fit = self.model.fit(key.decrypt(self.ciphertext))
+        if self.scorer == 'ngram':
+            coverage = segment_words(key.decrypt(self.ciphertext), self.word_trie)[1] if self.word_trie else 0.0
+        else:
+            total_words = len(WORD_PATTERN.findall(self.ciphertext))
+            coverage = score / total_words if total_words else 0.0
+        evidence = max(agreement, min(1.0, coverage / self.expected_word_coverage))
+        solved = fit >= 1.0 and coverage >= self.expected_word_coverage
+        return fit * evidence, solved
+
+    def break_genetic(self, initial_key=None):
+        """使用遗传算法自动破译密码，每一代的适应度在多个工作进程中并行计算"""
+        resume = self.resume_phase
+        self.resume_phase = None
+        if resume is not None:
+            # 继续检查点中保存的种群
+            population = [SubstitutionKey.from_dict(mapping) for mapping in resume['population']]
+            stagnant_generations = resume['stagnant_generations']
+        else:
+            population = [self.generate_initial_key() for _ in range(self.population_size)]
+            if initial_key is not None:
+                # 用给定密钥及其少量变异体替换一部分随机个体
+                population[0] = initial_key
+                for i in range(1, self.population_size // 4):
+                    population[i] = self.swap_mapping(initial_key)
+            
+            self.best_key = population[0]
+            self.best_match_count = float('-inf')
+            stagnant_generations = 0
+        
+        def population_state():
+            return {
+                'type': 'genetic',
+                'population': [key.to_dict() for key in population],
+                'stagnant_generations': stagnant_generations,
+            }
+        
+        pool = None
+        if self.workers > 1:
+            pool = create_process_pool(
+                _init_fitness_worker,
+                (self.ciphertext, self.dictionary, self.pooled_words, self.pooled_ngrams, self.model.name),
+                self.workers
+            )
+        try:
+            while self.has_budget():
+                scores = self.evaluate_population(population, pool)
+                self.iterations += len(population)
+                
+                ranked = sorted(zip(scores, population), key=lambda item: item[0], reverse=True)
+                for score, key in ranked[:self.top_k]:
+                    self.record_candidate(key, score)
+                for score, key in ranked[:self.elite_count]:
+                    self.record_marginals(key, score)
+                self.current_score = ranked[0][0]
+                if ranked[0][0] > self.best_match_count:
+                    self.best_match_count, self.best_key = ranked[0]
+                    self.confidence, solved = self.estimate_confidence(self.best_key, self.best_match_count)
+                    stagnant_generations = 0
+                else:
+                    solved = False
+                    stagnant_generations += 1
+                
+                self.report_progress()
+                
+                if solved:
+                    print("破译收敛: 解密结果已达到该语言文本的期望水平")
+                    break
+                if stagnant_generations >= self.max_stagnant_generations:
+                    print(f"破译停滞: 在 {self.max_stagnant_generations} 代中没有改进")
+                    break
+                
+                # 精英保留，其余个体由锦标赛选择出的父代交叉、变异产生
+                next_population = [key for _, key in ranked[:self.elite_count]]
+                while len(next_population) < self.population_size:
+                    parent_a = self.tournament_select(ranked)
+                    parent_b = self.tournament_select(ranked)
+                    child = order_crossover(parent_a, parent_b, self.fixed_pairs, self.rng)
+                    if self.rng.random() < self.mutation_rate:
+                        child = self.swap_mapping(child)
+                    next_population.append(child)
+                population = next_population
+                self.maybe_checkpoint(population_state)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        
+        if not self.is_running:
+            # 被停止时保存检查点，之后可以从这里继续
+            self.save_checkpoint(population_state())
+
+    def evaluate_population(self, population, pool=None):
+        """为整代种群评分；有进程池时把种群分块交给工作进程"""
+        if pool is None:
+            return [self.evaluate_key(key) for key in population]
+        chunk_size = max(1, len(population) // (self.workers * 2))
+        chunks = [population[i:i + chunk_size] for i in range(0, len(population), chunk_size)]
+        return [score for chunk_scores in pool.map(_score_keys_in_worker, chunks) for score in chunk_scores]
+
+    def tournament_select(self, ranked, size=3):
+        """锦标赛选择：随机抽取若干个体，返回其中得分最高者的密钥"""
+        return max(self.rng.sample(ranked, size), key=lambda item: item[0])[1]
+
+    def generate_initial_key(self):
+        """基于当前固定的密钥对生成初始密钥"""
+        return random_key(self.rng, self.fixed_pairs)
+
+    def swap_mapping(self, key):
+        """随机交换两个非固定的映射，返回新密钥"""
+        non_fixed = self.non_fixed
+        
+        if len(non_fixed) < 2:
+            return key  # 没有足够的非固定字母进行交换
+        
+        # 随机选择两个非固定的字母
+        a, b = self.rng.sample(non_fixed, 2)
+        
+        # 交换它们的映射
+        return key.swapped(a, b)
+
+    def evaluate_key(self, key):
+        """按所选的评分方式评估密钥，得分越高越好"""
+        if self.pooled_ngrams is not None:
+            return score_pooled_ngrams(key, self.pooled_ngrams, self.ngram_table)
+        return self.evaluate_key_dictionary(key)
+
+    def evaluate_key_dictionary(self, key):
+        """使用词典匹配评估密钥的质量"""
+        if self.word_scorer is not None:
+            return self.word_scorer.score(key)
+        if self.pooled_words is not None:
+            return count_pooled_matches(key, self.pooled_words, self.dictionary)
+        return count_dictionary_matches(key, self.ciphertext, self.dictionary)
+
+    def evaluate_key_frequency(self, key):
+        """使用频率分析评估密钥的质量"""
+        # 解密文本
+        decrypted_text_str = key.decrypt(self.ciphertext)
+        
+        # 计算解密文本的字母频率
+        freq = Counter(c.lower() for c in decrypted_text_str if c.isalpha())
+        
+        # 语言模型的字母频率顺序
+        language_freq_order = self.model.frequency_order
+        
+        # 计算解密文本的字母频率顺序
+        decrypted_freq_order = ''.join([letter for letter, _ in freq.most_common()])
+        
+        # 计算评分：频率顺序匹配程度
+        score = 0
+        for i, letter in enumerate(decrypted_freq_order):
+            if letter in language_freq_order:
+                pos = language_freq_order.index(letter)
+                # 位置越接近，得分越高
+                score += 10 - abs(i - pos) if i < 10 else 0
+        
+        return score
+
+    def acceptance_probability(self, current_score, new_score, temperature):
+        """计算接受新解的概率"""
+        if new_score > current_score:
+            return 1.0
+        return 1.0 * (1 - (current_score - new_score) / temperature)
+
+    def calibrate_temperature(self, key, samples=200):
+        """标定从已有密钥继续退火时的初始温度
+
+        在 key 附近随机尝试若干次交换，选取使变差交换的平均接受概率
+        约等于 warm_start_acceptance 的温度。
+        """
+        base_score = self.evaluate_key(key)
+        losses = []
+        for _ in range(samples):
+            loss = base_score - self.evaluate_key(self.swap_mapping(key))
+            if loss > 0:
+                losses.append(loss)
+        if not losses:
+            return 1.0
+        
+        def mean_acceptance(temperature):
+            return sum(self.acceptance_probability(loss, 0, temperature) for loss in losses if loss < temperature) / len(losses)
+        
+        # 平均接受概率随温度单调递增，二分查找
+        low, high = 0.0, max(losses) * 10
+        for _ in range(40):
+            middle = (low + high) / 2
+            if mean_acceptance(middle) < self.warm_start_acceptance:
+                low = middle
+            else:
+                high = middle
+        # 温度至少要比退火的终止温度高，保证链能运行一段时间
+        return max(high, 0.5)
+
+
+class VirtualTextView(ttk.Frame):
+    """只渲染可见行的只读大文本视图
+
+    全文保存在 Python 端的行列表中（过长的行按 row_width 折成多行），
+    Text 控件里始终只有当前窗口可见的几十行。transform 在渲染时作用于可见部分，
+    例如传入 key.decrypt 即可只解密当前视口。
+    """
+
+    def __init__(self, master, row_width=120, transform=None, **text_options):
+        super().__init__(master)
+        self.row_width = row_width
+        self.transform = transform
+        self.text = ""
+        self.rows = []
+        self.top = 0  # 视口第一行在 rows 中的位置
+        self.visible = 1  # 视口能显示的行数
+        
+        self.text_widget = tk.Text(self, wrap=tk.NONE, state=tk.DISABLED, **text_options)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_height = max(1, tkfont.Font(font=self.text_widget.cget('font')).metrics('linespace'))
+        
+        self.text_widget.bind("<Configure>", self.on_resize)
+        self.text_widget.bind("<MouseWheel>", lambda event: self.scroll_rows(-3 if event.delta > 0 else 3))
+        self.text_widget.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.text_widget.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.text_widget.bind("<Prior>", lambda event: self.scroll_rows(-self.visible))
+        self.text_widget.bind("<Next>", lambda event: self.scroll_rows(self.visible))
+
+    def set_text(self, text):
+        """设置全文并回到开头"""
+        self.text = text
+        width = self.row_width
+        rows = []
+        for line in text.split("\n"):
+            if len(line) <= width:
+                rows.append(line)
+            else:
+                rows.extend(line[i:i + width] for i in range(0, len(line), width))
+        self.rows = rows
+        self.top = 0
+        self.render()
+
+    def get_text(self):
+        return self.text
+
+    def set_transform(self, transform):
+        self.transform = transform
+        self.render()
+
+    def visible_text(self):
+        """当前视口中的原文（未经 transform）"""
+        return "\n".join(self.rows[self.top:self.top + self.visible])
+
+    def on_resize(self, event):
+        self.visible = max(1, event.height // self.line_height)
+        self.render()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.top = int(float(amount) * len(self.rows))
+        elif action == tk.SCROLL:
+            step = self.visible if unit == tk.PAGES else 1
+            self.top += int(amount) * step
+        self.render()
+
+    def scroll_rows(self, count):
+        self.top += count
+        self.render()
+        return "break"
+
+    def render(self):
+        """重新绘制视口，只有可见的行经过 transform 并写入 Text 控件"""
+        total = len(self.rows)
+        self.top = max(0, min(self.top, total - self.visible))
+        window = self.visible_text()
+        if self.transform is not None:
+            window = self.transform(window)
+        
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert(tk.END, window)
+        self.text_widget.config(state=tk.DISABLED)
+        
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
 
 class CipherTool:
     def __init__(self, root):
@@ -15,16 +2783,23 @@ class CipherTool:
         self.root.geometry("1400x800")
         
         # 存储当前密钥和固定密钥对
-        self.key = {chr(97 + i): chr(97 + i) for i in range(26)}
+        self.key = SubstitutionKey()
         self.fixed_pairs = {}  # 存储固定的密钥对
         self.current_page = None
         self.current_page_frame = None
+        self.pages = {}  # 已创建的页面：页面名 -> 页面框架，每个页面只在第一次显示时创建
         
         # 缓存文本内容
         self.cached_plaintext = ""
         self.cached_ciphertext = ""
         self.cached_decrypt_text = ""
         
+        # 大文本密文只保存在 Python 端，用虚拟视图显示
+        self.cipher_buffer = None
+        self.large_text_threshold = 200000  # 超过该字符数的密文使用虚拟视图
+        self.analysis_sample_size = 200000  # 频率分析、词典匹配和破译意见最多使用的字符数
+        self.show_decrypted_preview = tk.BooleanVar(value=False)  # 虚拟视图中是否显示解密后的文本
+        
         # 标记示例文本状态
         self.plaintext_has_example = True
         self.decrypt_text_has_example = True
@@ -32,17 +2807,39 @@ class CipherTool:
         # 词典相关
         self.dictionary = set()  # 存储词典单词
         self.dictionary_path = "dictionary.txt"  # 默认词典路径
-        self.load_dictionary()  # 尝试加载词典
+        self.dictionary_fingerprint = ""  # 词典内容的哈希，作为缓存索引的一部分
+        self.loading_resources = 0  # 正在后台加载的词典和语言模型数量，为 0 时才能开始破译
+        
+        # 语言模型：破译、评分和破译意见使用的语言统计
+        self.language_model = ENGLISH_MODEL
+        self.model_name = tk.StringVar(value=self.language_model.name)
+        self.scoring_mode = tk.StringVar(value="词典匹配")  # 评分方式，n元语法适用于没有空格的密文
+        self.word_trie = None  # 分词用的字典树，与 word_trie_source 对应的词表一起缓存
+        self.word_trie_source = None
         
         # 自动破译相关
         self.is_breaking = False  # 是否正在进行自动破译
         self.break_thread = None  # 自动破译线程
-        self.best_key = None  # 最佳密钥
-        self.best_match_count = 0  # 最佳匹配数
-        self.iterations = 0  # 迭代次数
-        self.max_iterations = 1000000  # 最大迭代次数
-        self.last_updated_iterations = 0  # 上次更新界面的迭代次数
-        self.update_interval = 1000  # 界面更新间隔
+        self.breaker = None  # 当前的破译器（CipherBreaker）
+        self.time_budget = tk.IntVar(value=30)  # 时间预算（秒），0 表示只按最大迭代次数破译
+        self.max_iterations = tk.IntVar(value=1000000)  # 没有时间预算时的最大迭代次数
+        self.break_cores = tk.IntVar(value=os.cpu_count() or 1)  # 破译使用的进程数
+        self.telemetry_queue = queue.Queue()  # 破译器放入遥测快照的队列，每次破译使用新的队列
+        self.telemetry_interval = 250  # 取出遥测快照、刷新进度显示的间隔（毫秒）
+        self.telemetry_job = None  # 下一次刷新的 after 标识
+        self.score_history = []  # 得分曲线的数据点 (已用时间, 当前得分, 最佳得分)
+        self.max_history_points = 400  # 数据点超过该数量时隔点抽稀
+        self.preview_key = None  # 最近一次遥测中的最佳密钥
+        self.preview_interval = 1.0  # 最佳密钥预览的最短刷新间隔（秒）
+        self.last_preview = 0.0
+        self.break_mode = tk.StringVar(value="模拟退火")  # 破译算法
+        self.result_cache = BreakResultCache("break_cache.json")  # 破译结果缓存
+        self.cache_trust_confidence = 0.9  # 缓存结果置信度达到该值时直接使用，不再重新破译
+        self.checkpoint_path = "break_checkpoint.json"  # 破译检查点，被停止或意外退出的破译可以从这里继续
+        self.warm_start = tk.BooleanVar(value=False)  # 是否从当前密钥继续破译
+        self.break_cache_key = None  # 本次破译对应的缓存索引
+        self.break_ciphertext = ""  # 本次破译的密文
+        self.break_started = 0.0  # 本次破译的开始时间
         
         # 设置主题样式
         self.style = ttk.Style()
@@ -59,31 +2856,72 @@ class CipherTool:
         # 创建顶部按钮框架
         self.create_top_buttons()
         
-        # 默认显示解密页面
-        self.current_page = 'decrypt'
-        self.show_page('decrypt')
-        
-        # 模拟点击加密按钮
+        # 默认显示加密页面，解密页面在第一次切换时才创建
         self.show_page('encrypt')
         
-        # 强制更新显示
-        self.root.update_idletasks()
-        self.update_key_display()
+        # 词典在后台加载，不阻塞窗口显示
+        self.load_dictionary()
 
-    def load_dictionary(self):
-        """加载词典文件"""
-        try:
-            if os.path.exists(self.dictionary_path):
-                with open(self.dictionary_path, 'r', encoding='utf-8') as file:
-                    self.dictionary = {line.strip().lower() for line in file if line.strip()}
-                print(f"成功加载词典，包含 {len(self.dictionary)} 个单词")
-                return True
+    def run_in_background(self, description, load, apply):
+        """在后台线程中执行 load，完成后回到界面线程调用 apply(结果, 异常)；加载期间顶部显示加载状态"""
+        self.loading_resources += 1
+        self.update_resource_status(f"{description}加载中…")
+        
+        def worker():
+            try:
+                result, error = load(), None
+            except Exception as e:
+                result, error = None, e
+            self.root.after(0, finish, result, error)
+        
+        def finish(result, error):
+            self.loading_resources -= 1
+            apply(result, error)
+            self.update_resource_status()
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def update_resource_status(self, text=None):
+        """更新顶部的词典和语言模型加载状态"""
+        if text is None:
+            if self.loading_resources:
+                return
+            if self.dictionary:
+                text = f"词典已就绪（{len(self.dictionary)} 个单词）"
             else:
-                print(f"词典文件 {self.dictionary_path} 不存在")
-                return False
-        except Exception as e:
-            print(f"加载词典时出错: {str(e)}")
-            return False
+                text = "未加载词典"
+        self.resource_status.config(text=text)
+
+    def load_dictionary(self, announce=False):
+        """在后台线程中加载词典文件；announce 为真时加载完成后弹窗提示结果"""
+        path = self.dictionary_path
+        
+        def load():
+            if not os.path.exists(path):
+                return None
+            dictionary = read_dictionary(path)
+            return dictionary, dictionary_fingerprint(dictionary)
+        
+        def apply(result, error):
+            if path != self.dictionary_path:
+                return  # 加载期间又选择了其他词典
+            if error is not None or result is None:
+                if error is not None:
+                    print(f"加载词典时出错: {str(error)}")
+                else:
+                    print(f"词典文件 {path} 不存在")
+                if announce:
+                    messagebox.showerror("错误", "词典加载失败")
+                return
+            self.dictionary, self.dictionary_fingerprint = result
+            print(f"成功加载词典，包含 {len(self.dictionary)} 个单词")
+            if announce:
+                messagebox.showinfo("成功", f"词典加载成功，包含 {len(self.dictionary)} 个单词")
+            # 如果当前在解密页面且有密文，更新匹配结果
+            if self.current_page == 'decrypt' and self.cached_decrypt_text and self.cached_decrypt_text != "请在此输入密文...":
+                self.update_decrypt_results()
+        
+        self.run_in_background("词典", load, apply)
 
     def create_top_buttons(self):
         # 创建顶部按钮框架
@@ -106,6 +2944,10 @@ class CipherTool:
         )
         self.decrypt_btn.pack(side=tk.LEFT, padx=5)
         
+        # 词典和语言模型的加载状态
+        self.resource_status = ttk.Label(self.button_frame, text="", font=("宋体", 10))
+        self.resource_status.pack(side=tk.RIGHT, padx=5)
+        
         # 初始按钮状态
         self.update_button_state()
 
@@ -118,11 +2960,20 @@ class CipherTool:
         
         self.current_page = page_name
         
-        if page_name == 'encrypt':
-            self.create_encrypt_page()
-        elif page_name == 'decrypt':
-            self.create_decrypt_page()
-            
+        if page_name in self.pages:
+            # 页面已创建，直接重新显示，文本和控件状态都保持不变
+            self.current_page_frame = self.pages[page_name]
+            self.current_page_frame.pack(fill=tk.BOTH, expand=True)
+            # 密钥可能在另一个页面中修改过
+            if page_name == 'decrypt' and self.cached_decrypt_text and self.cached_decrypt_text != "请在此输入密文...":
+                self.update_decrypt_results()
+        else:
+            if page_name == 'encrypt':
+                self.create_encrypt_page()
+            elif page_name == 'decrypt':
+                self.create_decrypt_page()
+            self.pages[page_name] = self.current_page_frame
+        
         self.update_button_state()
         self.root.update_idletasks()  # 确保界面立即更新
 
@@ -138,12 +2989,14 @@ class CipherTool:
             if hasattr(self, 'plaintext_area') and self.plaintext_area.winfo_exists():
                 self.cached_plaintext = self.plaintext_area.get("1.0", tk.END).strip()
         elif self.current_page == 'decrypt':
-            if hasattr(self, 'decrypt_text_area') and self.decrypt_text_area.winfo_exists():
+            if self.cipher_buffer is not None:
+                self.cached_decrypt_text = self.cipher_buffer
+            elif hasattr(self, 'decrypt_text_area') and self.decrypt_text_area.winfo_exists():
                 self.cached_decrypt_text = self.decrypt_text_area.get("1.0", tk.END).strip()
         
-        # 清除当前页面
+        # 隐藏当前页面，控件保留，再次显示时无需重建
         if self.current_page_frame and self.current_page_frame.winfo_exists():
-            self.current_page_frame.destroy()
+            self.current_page_frame.pack_forget()
             self.current_page_frame = None
 
     def create_encrypt_page(self):
@@ -219,8 +3072,22 @@ class CipherTool:
         self.decrypt_text_area = scrolledtext.ScrolledText(left_frame, height=10, wrap=tk.WORD, font=("宋体", 10))
         self.decrypt_text_area.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
         
+        # 大文本的虚拟视图，平时不显示
+        self.virtual_view_frame = ttk.Frame(left_frame)
+        ttk.Checkbutton(
+            self.virtual_view_frame,
+            text="按当前密钥显示解密结果",
+            variable=self.show_decrypted_preview,
+            command=self.refresh_virtual_view
+        ).pack(anchor=tk.W)
+        self.decrypt_virtual_view = VirtualTextView(self.virtual_view_frame, height=10, font=("宋体", 10))
+        self.decrypt_virtual_view.pack(fill=tk.BOTH, expand=True)
+        
         # 设置示例文本或恢复缓存文本
-        if not self.cached_decrypt_text:
+        if self.cipher_buffer is not None:
+            self.show_cipher_buffer()
+            self.decrypt_text_has_example = False
+        elif not self.cached_decrypt_text:
             self.decrypt_text_area.insert(tk.END, "请在此输入密文...")
             self.decrypt_text_has_example = True
             self.decrypt_text_area.bind("<FocusIn>", self.on_decrypt_text_focus_in)
@@ -265,6 +3132,9 @@ class CipherTool:
         )
         self.break_btn.pack(side=tk.LEFT, padx=10)
         
+        # 联合破译：与若干共用同一密钥的密文文件一起破译
+        ttk.Button(btn_frame, text="联合破译", command=self.start_joint_breaking).pack(side=tk.LEFT, padx=10)
+        
         # 右侧：破译辅助
         right_frame = ttk.Frame(self.current_page_frame, width=480, padding=10)
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
@@ -305,6 +3175,71 @@ class CipherTool:
         self.best_match = ttk.Label(break_frame, text="最佳匹配: 0", font=("宋体", 10))
         self.best_match.pack(pady=5, fill=tk.X)
         
+        self.confidence_label = ttk.Label(break_frame, text="置信度: 0.00%", font=("宋体", 10))
+        self.confidence_label.pack(pady=5, fill=tk.X)
+        
+        self.telemetry_label = ttk.Label(break_frame, text="速度: -  温度: -  接受率: -", font=("宋体", 10))
+        self.telemetry_label.pack(pady=5, fill=tk.X)
+        
+        # 得分曲线：灰色为当前得分，蓝色为最佳得分
+        self.score_chart = tk.Canvas(break_frame, height=100, background='white', highlightthickness=0)
+        self.score_chart.pack(pady=5, fill=tk.X)
+        self.score_chart.bind("<Configure>", lambda event: self.draw_score_chart())
+        
+        # 最佳密钥对密文可见部分的解密预览，已经可读时即可停止破译
+        ttk.Label(break_frame, text="最佳密钥预览（密文可见部分）:", font=("宋体", 10)).pack(anchor=tk.W)
+        self.best_preview = scrolledtext.ScrolledText(break_frame, height=4, wrap=tk.WORD, font=("宋体", 10))
+        self.best_preview.pack(pady=5, fill=tk.BOTH, expand=True)
+        
+        ttk.Button(break_frame, text="候选密钥与字母置信度", command=self.show_break_candidates).pack(pady=5, anchor=tk.W)
+        
+        # 破译算法选择
+        mode_frame = ttk.Frame(break_frame)
+        mode_frame.pack(pady=5, fill=tk.X)
+        ttk.Label(mode_frame, text="破译算法:", font=("宋体", 10)).pack(side=tk.LEFT)
+        ttk.Combobox(
+            mode_frame,
+            textvariable=self.break_mode,
+            values=list(BREAK_MODES),
+            state="readonly",
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(mode_frame, text="从当前密钥继续", variable=self.warm_start).pack(side=tk.LEFT, padx=5)
+        
+        # 破译预算：按时间预算破译，到截止时间返回最佳密钥；时间预算为 0 时按最大迭代次数
+        budget_frame = ttk.Frame(break_frame)
+        budget_frame.pack(pady=5, fill=tk.X)
+        ttk.Label(budget_frame, text="时间预算(秒):", font=("宋体", 10)).pack(side=tk.LEFT)
+        ttk.Spinbox(budget_frame, from_=0, to=3600, increment=5, textvariable=self.time_budget, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(budget_frame, text="核心数:", font=("宋体", 10)).pack(side=tk.LEFT)
+        ttk.Spinbox(budget_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.break_cores, width=3).pack(side=tk.LEFT, padx=5)
+        ttk.Label(budget_frame, text="最大迭代次数:", font=("宋体", 10)).pack(side=tk.LEFT)
+        ttk.Spinbox(
+            budget_frame, from_=1000, to=1000000, increment=10000, textvariable=self.max_iterations, width=8
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # 语言模型选择，可随时切换
+        model_frame = ttk.Frame(break_frame)
+        model_frame.pack(pady=5, fill=tk.X)
+        ttk.Label(model_frame, text="语言模型:", font=("宋体", 10)).pack(side=tk.LEFT)
+        model_box = ttk.Combobox(model_frame, textvariable=self.model_name, state="readonly", width=10)
+        # 每次展开时重新扫描模型目录，新编译的模型无需重启即可选择
+        model_box.config(postcommand=lambda: model_box.config(values=list(available_models()) + [AUTO_MODEL]))
+        model_box.bind("<<ComboboxSelected>>", lambda event: self.select_language_model())
+        model_box.pack(side=tk.LEFT, padx=5)
+        
+        # 评分方式：n元语法不依赖单词边界，解密结果按词典分词显示
+        ttk.Label(model_frame, text="评分方式:", font=("宋体", 10)).pack(side=tk.LEFT, padx=(10, 0))
+        scorer_box = ttk.Combobox(
+            model_frame,
+            textvariable=self.scoring_mode,
+            values=list(SCORERS),
+            state="readonly",
+            width=8
+        )
+        scorer_box.bind("<<ComboboxSelected>>", lambda event: self.update_decrypt_results())
+        scorer_box.pack(side=tk.LEFT, padx=5)
+        
         # 破译意见
         advice_frame = ttk.LabelFrame(right_frame, text="破译意见", padding=10)
         advice_frame.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -320,18 +3255,58 @@ class CipherTool:
         if self.cached_decrypt_text and self.cached_decrypt_text != "请在此输入密文...":
             self.update_decrypt_results()
 
+    def select_language_model(self):
+        """在后台加载并切换语言模型，完成后刷新破译意见"""
+        name = self.model_name.get()
+        if self.is_breaking:
+            messagebox.showwarning("警告", "请先停止自动破译再切换语言模型")
+            self.model_name.set(self.language_model.name)
+            return
+        if name == AUTO_MODEL:
+            # 自动选择在破译开始时进行，破译意见暂时沿用当前模型
+            return
+        
+        def apply(model, error):
+            if self.model_name.get() != name:
+                return  # 加载期间又选择了其他模型
+            if error is not None:
+                messagebox.showerror("错误", f"加载语言模型时出错: {str(error)}")
+                self.model_name.set(self.language_model.name)
+                return
+            self.language_model = model
+            print(f"已切换到语言模型 {name}，词表包含 {len(self.language_model.words)} 个单词")
+            if self.cached_decrypt_text and self.cached_decrypt_text != "请在此输入密文...":
+                self.update_decrypt_results()
+        
+        self.run_in_background("语言模型", lambda: get_language_model(name), apply)
+
+    def scoring_dictionary(self):
+        """评分使用的词表：语言模型自带词表时使用模型词表，否则使用加载的词典"""
+        if self.model_name.get() == AUTO_MODEL:
+            return self.dictionary
+        return self.language_model.words or self.dictionary
+
+    def get_word_trie(self):
+        """评分词表的字典树，词表变化时重新构造"""
+        dictionary = self.scoring_dictionary()
+        if self.word_trie_source is not dictionary:
+            self.word_trie = build_word_trie(dictionary)
+            self.word_trie_source = dictionary
+        return self.word_trie
+
+    def decrypted_words(self, decrypted_text):
+        """解密文本中的单词；n元语法评分时按词典分词，不依赖原文的空格"""
+        if SCORERS[self.scoring_mode.get()] == 'ngram':
+            tokens, _ = segment_words(decrypted_text, self.get_word_trie())
+            return [token for token, _ in tokens]
+        return re.findall(r'\b[a-zA-Z]+\b', decrypted_text.lower())
+
     def load_dictionary_gui(self):
         """通过GUI界面加载词典文件"""
         file_path = filedialog.askopenfilename(filetypes=[("文本文件", "*.txt")])
         if file_path:
             self.dictionary_path = file_path
-            if self.load_dictionary():
-                messagebox.showinfo("成功", f"词典加载成功，包含 {len(self.dictionary)} 个单词")
-                # 如果当前在解密页面且有密文，更新匹配结果
-                if self.current_page == 'decrypt' and self.cached_decrypt_text and self.cached_decrypt_text != "请在此输入密文...":
-                    self.update_decrypt_results()
-            else:
-                messagebox.showerror("错误", "词典加载失败")
+            self.load_dictionary(announce=True)
 
     def on_plaintext_focus_in(self, event):
         if self.plaintext_has_example:
@@ -347,7 +3322,7 @@ class CipherTool:
         # 创建密钥编辑窗口
         edit_window = tk.Toplevel(self.root)
         edit_window.title("编辑密钥")
-        edit_window.geometry("800x600")
+        edit_window.geometry("800x800")
         
         # 主框架
         main_frame = ttk.Frame(edit_window, padding=10)
@@ -374,6 +3349,69 @@ class CipherTool:
             fixed_pairs_text = ", ".join([f"{k}-{v}" for k, v in sorted(self.fixed_pairs.items())])
             fixed_text.insert(tk.END, fixed_pairs_text)
         
+        # 明文片段拖动：把已知的明文片段与密文中每个可能的位置对齐，选中的位置推出的映射加入固定密钥对
+        crib_frame = ttk.LabelFrame(main_frame, text="明文片段拖动（已知明文，位置未知）", padding=10)
+        crib_frame.pack(pady=10, fill=tk.BOTH, expand=True)
+        crib_input = ttk.Frame(crib_frame)
+        crib_input.pack(fill=tk.X)
+        ttk.Label(crib_input, text="明文片段:", font=("宋体", 10)).pack(side=tk.LEFT)
+        crib_entry = ttk.Entry(crib_input, font=("宋体", 10))
+        crib_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        crib_tree = ttk.Treeview(
+            crib_frame, columns=("offset", "count", "cipher", "pairs"), show="headings", height=5, selectmode="browse"
+        )
+        crib_tree.heading("offset", text="位置")
+        crib_tree.heading("count", text="出现次数")
+        crib_tree.heading("cipher", text="对应的密文")
+        crib_tree.heading("pairs", text="推出的密钥对（新增数）")
+        crib_tree.column("offset", width=70, anchor=tk.CENTER)
+        crib_tree.column("count", width=70, anchor=tk.CENTER)
+        crib_tree.column("cipher", width=220)
+        crib_tree.column("pairs", width=350)
+        crib_tree.pack(pady=5, fill=tk.BOTH, expand=True)
+        crib_placements = []
+        
+        def current_fixed_pairs():
+            pairs = {}
+            for pair in fixed_text.get("1.0", tk.END).split(","):
+                plain, _, ciph = pair.strip().lower().partition("-")
+                if len(plain) == 1 and len(ciph) == 1 and plain.isalpha() and ciph.isalpha():
+                    pairs[plain] = ciph
+            return pairs
+        
+        def drag_crib():
+            ciphertext = self.get_ciphertext()
+            if not ciphertext or self.decrypt_text_has_example:
+                messagebox.showwarning("警告", "请先输入密文", parent=edit_window)
+                return
+            placements = PatternIndex(ciphertext).drag(crib_entry.get(), current_fixed_pairs())
+            crib_placements[:] = placements
+            crib_tree.delete(*crib_tree.get_children())
+            for i, placement in enumerate(placements):
+                pairs = ", ".join(f"{p}-{c}" for p, c in sorted(placement['mapping'].items()))
+                crib_tree.insert("", tk.END, iid=str(i), values=(
+                    placement['offset'], placement['count'], placement['cipher'], f"{pairs}（{placement['new_pairs']}）"
+                ))
+            if not placements:
+                messagebox.showinfo("明文片段拖动", "没有与代换和固定密钥对都不矛盾的位置", parent=edit_window)
+        
+        def use_placement():
+            selection = crib_tree.selection()
+            if not selection:
+                messagebox.showwarning("警告", "请先选择一个位置", parent=edit_window)
+                return
+            pairs = current_fixed_pairs()
+            pairs.update(crib_placements[int(selection[0])]['mapping'])
+            fixed_text.delete("1.0", tk.END)
+            fixed_text.insert(tk.END, ", ".join(f"{p}-{c}" for p, c in sorted(pairs.items())))
+            # 当前密钥同步满足新的固定密钥对
+            key_text.delete("1.0", tk.END)
+            key_text.insert(tk.END, ", ".join(f"{k}-{v}" for k, v in sorted(enforce_fixed_pairs(self.key, pairs).items())))
+        
+        ttk.Button(crib_input, text="查找位置", command=drag_crib).pack(side=tk.LEFT, padx=5)
+        ttk.Button(crib_input, text="固定所选位置的密钥对", command=use_placement).pack(side=tk.LEFT, padx=5)
+        crib_entry.bind("<Return>", lambda event: drag_crib())
+        
         # 按钮框架
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(pady=10, fill=tk.X)
@@ -554,7 +3592,7 @@ class CipherTool:
                         if len(ciph) == 1 and len(plain) == 1 and ciph.isalpha() and plain.isalpha():
                             new_fixed_pairs[ciph] = plain                
                 # 更新密钥
-                self.key = new_key
+                self.key = SubstitutionKey.from_dict(new_key)
                 self.fixed_pairs = new_fixed_pairs
                 
                 self.update_key_display()
@@ -581,6 +3619,36 @@ class CipherTool:
             self.encrypt_key_display.config(text=key_text)
         if hasattr(self, 'decrypt_key_display') and self.decrypt_key_display.winfo_exists():
             self.decrypt_key_display.config(text=key_text)
+        self.refresh_virtual_view()
+
+    def get_ciphertext(self):
+        """返回当前密文；大文本直接取 Python 端的缓冲区，不经过 Tcl"""
+        if self.cipher_buffer is not None:
+            return self.cipher_buffer
+        return self.decrypt_text_area.get("1.0", tk.END).strip()
+
+    def analysis_sample(self, text):
+        """频率分析等辅助信息只使用大文本的开头部分"""
+        return text[:self.analysis_sample_size]
+
+    def show_cipher_buffer(self):
+        """用虚拟视图代替密文输入框显示大文本"""
+        self.virtual_view_frame.pack(pady=10, padx=10, fill=tk.BOTH, expand=True, before=self.decrypt_text_area)
+        self.decrypt_text_area.pack_forget()
+        self.decrypt_virtual_view.set_text(self.cipher_buffer)
+        self.refresh_virtual_view()
+
+    def hide_cipher_buffer(self):
+        """恢复密文输入框"""
+        self.decrypt_text_area.pack(pady=10, padx=10, fill=tk.BOTH, expand=True, before=self.virtual_view_frame)
+        self.virtual_view_frame.pack_forget()
+        self.decrypt_virtual_view.set_text("")
+
+    def refresh_virtual_view(self):
+        """按当前密钥重新渲染虚拟视图的视口"""
+        if hasattr(self, 'decrypt_virtual_view') and self.decrypt_virtual_view.winfo_exists():
+            transform = self.key.decrypt if self.show_decrypted_preview.get() else None
+            self.decrypt_virtual_view.set_transform(transform)
 
     def perform_encryption(self):
         # 检查是否为示例文本
@@ -595,19 +3663,11 @@ class CipherTool:
             messagebox.showwarning("警告", "请输入明文")
             return
         
-        encrypted_text = []
-        for c in plaintext:
-            if c.isalpha():
-                if c.isupper():
-                    encrypted_text.append(self.key[c.lower()].upper())
-                else:
-                    encrypted_text.append(self.key[c])
-            else:
-                encrypted_text.append(c)
+        encrypted_text = self.key.encrypt(plaintext)
         
         self.ciphertext_area.delete("1.0", tk.END)
-        self.ciphertext_area.insert(tk.END, "".join(encrypted_text))
-        self.cached_ciphertext = "".join(encrypted_text)
+        self.ciphertext_area.insert(tk.END, encrypted_text)
+        self.cached_ciphertext = encrypted_text
 
     def perform_decryption(self):
         # 检查是否为示例文本
@@ -617,7 +3677,7 @@ class CipherTool:
             return
             
         # 执行解密
-        ciphertext = self.decrypt_text_area.get("1.0", tk.END).strip()
+        ciphertext = self.get_ciphertext()
         if not ciphertext:
             messagebox.showwarning("警告", "请输入密文")
             return
@@ -654,24 +3714,26 @@ class CipherTool:
         result_frame = ttk.LabelFrame(main_frame, text="解密文本", padding=10)
         result_frame.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        reverse_key = {v: k for k, v in self.key.items()}
-        ciphertext = self.decrypt_text_area.get("1.0", tk.END).strip()
-        decrypted_text = []
+        full_ciphertext = self.get_ciphertext()
+        key = self.key
         
-        for c in ciphertext:
-            if c.isalpha():
-                if c.isupper():
-                    decrypted_text.append(reverse_key.get(c.lower(), '*').upper())
-                else:
-                    decrypted_text.append(reverse_key.get(c, '*'))
+        if len(full_ciphertext) > self.large_text_threshold:
+            # 大文本只解密当前视口
+            result_view = VirtualTextView(result_frame, transform=key.decrypt, height=15, font=("宋体", 10))
+            result_view.pack(pady=5, fill=tk.BOTH, expand=True)
+            result_view.set_text(full_ciphertext)
+        else:
+            result_text = scrolledtext.ScrolledText(result_frame, height=15, wrap=tk.WORD, font=("宋体", 10))
+            result_text.pack(pady=5, fill=tk.BOTH, expand=True)
+            if SCORERS[self.scoring_mode.get()] == 'ngram' and self.scoring_dictionary():
+                # 没有空格的密文按词典分词后显示
+                result_text.insert(tk.END, segment_text(key.decrypt(full_ciphertext), self.get_word_trie()))
             else:
-                decrypted_text.append(c)
-        
-        decrypted_text_str = "".join(decrypted_text)
+                result_text.insert(tk.END, key.decrypt(full_ciphertext))
         
-        result_text = scrolledtext.ScrolledText(result_frame, height=15, wrap=tk.WORD, font=("宋体", 10))
-        result_text.pack(pady=5, fill=tk.BOTH, expand=True)
-        result_text.insert(tk.END, decrypted_text_str)
+        # 以下分析只使用文本的开头部分
+        ciphertext = self.analysis_sample(full_ciphertext)
+        decrypted_text_str = key.decrypt(ciphertext)
         
         # 频率分析 - 使用解密后的文本
         freq_frame = ttk.LabelFrame(main_frame, text="频率分析", padding=10)
@@ -738,12 +3800,13 @@ class CipherTool:
         dict_text = scrolledtext.ScrolledText(dict_frame, height=10, wrap=tk.WORD, font=("宋体", 10))
         dict_text.pack(pady=5, fill=tk.BOTH, expand=True)
         
-        if self.dictionary:
-            words = re.findall(r'\b[a-zA-Z]+\b', decrypted_text_str.lower())
+        dictionary = self.scoring_dictionary()
+        if dictionary:
+            words = self.decrypted_words(decrypted_text_str)
             if words:
                 matched_words = []
                 for word in words:
-                    if word in self.dictionary:
+                    if word in dictionary:
                         matched_words.append(word)
                 
                 if matched_words:
@@ -795,7 +3858,7 @@ class CipherTool:
             if file_path:
                 try:
                     with open(file_path, 'w', encoding='utf-8') as file:
-                        file.write(f"解密结果:\n\n{decrypted_text_str}\n\n")
+                        file.write(f"解密结果:\n\n{key.decrypt(full_ciphertext)}\n\n")
                         file.write(f"使用的密钥:\n{key_text}\n\n")
                         file.write(f"频率分析:\n")
                         file.write(f"最高频率字母: {high_freq_text}\n")
@@ -818,34 +3881,23 @@ class CipherTool:
 
     def update_decrypt_results(self):
         """更新解密结果和辅助信息"""
-        ciphertext = self.decrypt_text_area.get("1.0", tk.END).strip()
+        ciphertext = self.analysis_sample(self.get_ciphertext())
         if not ciphertext:
             return
         
-        reverse_key = {v: k for k, v in self.key.items()}
-        decrypted_text = []
-        
-        for c in ciphertext:
-            if c.isalpha():
-                if c.isupper():
-                    decrypted_text.append(reverse_key.get(c.lower(), '*').upper())
-                else:
-                    decrypted_text.append(reverse_key.get(c, '*'))
-            else:
-                decrypted_text.append(c)
-        
-        decrypted_text_str = "".join(decrypted_text)
+        decrypted_text_str = self.key.decrypt(ciphertext)
         
         # 更新频率分析
         self.update_frequency_analysis(ciphertext)
         
         # 更新词典匹配
-        if self.dictionary:
-            words = re.findall(r'\b[a-zA-Z]+\b', decrypted_text_str.lower())
+        dictionary = self.scoring_dictionary()
+        if dictionary:
+            words = self.decrypted_words(decrypted_text_str)
             if words:
                 matched_words = []
                 for word in words:
-                    if word in self.dictionary:
+                    if word in dictionary:
                         matched_words.append(word)
                 
                 if matched_words:
@@ -880,7 +3932,7 @@ class CipherTool:
     def update_frequency_analysis(self, text):
         """更新频率分析结果"""
         # 计算字母频率
-        freq = Counter(c.lower() for c in text if c.isalpha())
+        freq = letter_frequencies(text)
         
         # 最高频率字母
         high_freq = freq.most_common(10)
@@ -901,15 +3953,12 @@ class CipherTool:
         self.freq_low_display.insert(tk.END, low_freq_text)
 
     def generate_decryption_advice(self, ciphertext, decrypted_text):
-        """生成破译建议"""
+        """生成破译建议，所用的语言统计来自当前选择的语言模型"""
         advice = []
+        model = self.language_model
         
-        # 英语字母频率
-        english_freq = {'e': 12.70, 't': 9.06, 'a': 8.17, 'o': 7.51, 'i': 6.97, 'n': 6.75, 
-                        's': 6.33, 'h': 6.09, 'r': 5.99, 'd': 4.25, 'l': 4.03, 'c': 2.78, 
-                        'u': 2.76, 'm': 2.41, 'w': 2.36, 'f': 2.23, 'g': 2.02, 'y': 1.97, 
-                        'p': 1.93, 'b': 1.29, 'v': 0.98, 'k': 0.77, 'j': 0.15, 'x': 0.15, 
-                        'q': 0.10, 'z': 0.07}
+        # 语言模型的字母频率
+        language_freq = model.frequencies
         
         # 计算密文频率
         cipher_freq = Counter(c.lower() for c in ciphertext if c.isalpha())
@@ -924,64 +3973,65 @@ class CipherTool:
         # 频率匹配建议
         advice.append("=== 频率分析建议 ===")
         for letter, freq in sorted(decrypted_freq_percent.items(), key=lambda x: x[1], reverse=True)[:5]:
-            # 找到最接近的英语频率字母
-            closest_letter = min(english_freq, key=lambda k: abs(english_freq[k] - freq))
-            advice.append(f"解密后字母 '{letter}' 频率为 {freq:.2f}%，可能对应英语中的 '{closest_letter}'")
-        
-        # 英语语言规则建议
-        advice.append("\n=== 英语语言规则建议 ===")
-        
-        # Q-U规则
-        if 'q' in decrypted_freq:
-            q_mapping = self.key.get('q', '')
-            if q_mapping:
-                u_mapping = self.key.get('u', '')
-                if u_mapping:
-                    if u_mapping != 'u':
-                        advice.append(f"注意：在英语中，字母 'q' 后面几乎总是跟着 'u'。当前 'q' 映射到 '{q_mapping}'，'u' 映射到 '{u_mapping}'，可能需要调整。")
-                else:
-                    advice.append(f"注意：在英语中，字母 'q' 后面几乎总是跟着 'u'。当前 'q' 映射到 '{q_mapping}'，但 'u' 的映射可能需要检查。")
-        
-        # X前字母规则
-        x_count = decrypted_freq.get('x', 0)
-        if x_count > 0:
-            x_mapping = self.key.get('x', '')
-            if x_mapping:
-                # 查找X前的字母
-                x_positions = [i for i, c in enumerate(decrypted_text.lower()) if c == 'x']
-                preceding_letters = []
-                for pos in x_positions:
-                    if pos > 0 and decrypted_text[pos-1].isalpha():
-                        preceding_letters.append(decrypted_text[pos-1].lower())
-                
-                if preceding_letters:
-                    preceding_freq = Counter(preceding_letters)
-                    most_common = preceding_freq.most_common(1)[0][0]
-                    mapped_preceding = self.key.get(most_common, '')
+            # 找到最接近的该语言频率字母
+            closest_letter = min(language_freq, key=lambda k: abs(language_freq[k] - freq))
+            advice.append(f"解密后字母 '{letter}' 频率为 {freq:.2f}%，可能对应{model.label}中的 '{closest_letter}'")
+        
+        # 英语语言规则建议（仅英语模型）
+        if model.metadata.get('english_rules'):
+            advice.append("\n=== 英语语言规则建议 ===")
+            
+            # Q-U规则
+            if 'q' in decrypted_freq:
+                q_mapping = self.key.get('q', '')
+                if q_mapping:
+                    u_mapping = self.key.get('u', '')
+                    if u_mapping:
+                        if u_mapping != 'u':
+                            advice.append(f"注意：在英语中，字母 'q' 后面几乎总是跟着 'u'。当前 'q' 映射到 '{q_mapping}'，'u' 映射到 '{u_mapping}'，可能需要调整。")
+                    else:
+                        advice.append(f"注意：在英语中，字母 'q' 后面几乎总是跟着 'u'。当前 'q' 映射到 '{q_mapping}'，但 'u' 的映射可能需要检查。")
+            
+            # X前字母规则
+            x_count = decrypted_freq.get('x', 0)
+            if x_count > 0:
+                x_mapping = self.key.get('x', '')
+                if x_mapping:
+                    # 查找X前的字母
+                    x_positions = [i for i, c in enumerate(decrypted_text.lower()) if c == 'x']
+                    preceding_letters = []
+                    for pos in x_positions:
+                        if pos > 0 and decrypted_text[pos-1].isalpha():
+                            preceding_letters.append(decrypted_text[pos-1].lower())
                     
-                    if mapped_preceding not in ['i', 'e']:
-                        advice.append(f"注意：在英语中，字母 'x' 前面通常是 'i' 或 'e'。当前解密文本中 'x' 前面最常见的字母是 '{most_common}'，映射到 '{mapped_preceding}'，可能需要调整。")
-        
-        # EE之间R高频规则
-        e_count = decrypted_freq.get('e', 0)
-        if e_count > 0:
-            e_mapping = self.key.get('e', '')
-            if e_mapping:
-                # 查找EE之间的字母
-                e_positions = [i for i, c in enumerate(decrypted_text.lower()) if c == 'e']
-                middle_letters = []
-                for i in range(len(e_positions)-1):
-                    if e_positions[i+1] - e_positions[i] == 2:
-                        middle_letters.append(decrypted_text[e_positions[i]+1].lower())
-                
-                if middle_letters:
-                    middle_freq = Counter(middle_letters)
-                    most_common = middle_freq.most_common(1)[0][0]
-                    mapped_middle = self.key.get(most_common, '')
+                    if preceding_letters:
+                        preceding_freq = Counter(preceding_letters)
+                        most_common = preceding_freq.most_common(1)[0][0]
+                        mapped_preceding = self.key.get(most_common, '')
+                        
+                        if mapped_preceding not in ['i', 'e']:
+                            advice.append(f"注意：在英语中，字母 'x' 前面通常是 'i' 或 'e'。当前解密文本中 'x' 前面最常见的字母是 '{most_common}'，映射到 '{mapped_preceding}'，可能需要调整。")
+            
+            # EE之间R高频规则
+            e_count = decrypted_freq.get('e', 0)
+            if e_count > 0:
+                e_mapping = self.key.get('e', '')
+                if e_mapping:
+                    # 查找EE之间的字母
+                    e_positions = [i for i, c in enumerate(decrypted_text.lower()) if c == 'e']
+                    middle_letters = []
+                    for i in range(len(e_positions)-1):
+                        if e_positions[i+1] - e_positions[i] == 2:
+                            middle_letters.append(decrypted_text[e_positions[i]+1].lower())
                     
-                    if mapped_middle != 'r':
-                        advice.append(f"注意：在英语中，'ee' 组合之间经常出现字母 'r'（如 'tree'、'three'）。当前解密文本中 'e' 之间最常见的字母是 '{most_common}'，映射到 '{mapped_middle}'，可能需要调整。")
-        
+                    if middle_letters:
+                        middle_freq = Counter(middle_letters)
+                        most_common = middle_freq.most_common(1)[0][0]
+                        mapped_middle = self.key.get(most_common, '')
+                        
+                        if mapped_middle != 'r':
+                            advice.append(f"注意：在英语中，'ee' 组合之间经常出现字母 'r'（如 'tree'、'three'）。当前解密文本中 'e' 之间最常见的字母是 '{most_common}'，映射到 '{mapped_middle}'，可能需要调整。")
+            
         # 双字母组合分析 - 使用解密后的文本
         bigrams = []
         for i in range(len(decrypted_text)-1):
@@ -992,31 +4042,33 @@ class CipherTool:
             bigram_freq = Counter(bigrams)
             common_bigrams = bigram_freq.most_common(5)
             
-            # 英语中常见的双字母组合
-            english_common_bigrams = ['th', 'he', 'in', 'er', 'an']
+            # 该语言中常见的双字母组合
+            language_common_bigrams = model.common_bigrams
+            examples = ", ".join(f"'{bigram}'" for bigram in language_common_bigrams)
             
             advice.append("\n=== 双字母组合分析 ===")
             for bigram, count in common_bigrams:
-                if bigram in english_common_bigrams:
-                    advice.append(f"解密后双字母组合 '{bigram}' 出现 {count} 次，与英语常见组合匹配！")
+                if bigram in language_common_bigrams:
+                    advice.append(f"解密后双字母组合 '{bigram}' 出现 {count} 次，与{model.label}常见组合匹配！")
                 else:
-                    advice.append(f"解密后双字母组合 '{bigram}' 出现 {count} 次，可能需要调整以匹配英语常见组合（如 'th', 'he', 'in', 'er', 'an'）")
+                    advice.append(f"解密后双字母组合 '{bigram}' 出现 {count} 次，可能需要调整以匹配{model.label}常见组合（如 {examples}）")
         
         # 单字母单词分析
         words = re.findall(r'\b[a-zA-Z]+\b', decrypted_text.lower())
         one_letter_words = [word for word in words if len(word) == 1]
         
-        if one_letter_words:
+        if one_letter_words and model.one_letter_words:
             one_letter_freq = Counter(one_letter_words)
             most_common = one_letter_freq.most_common(1)[0][0]
             
             advice.append("\n=== 单字母单词分析 ===")
-            if most_common not in ['a', 'i']:
-                advice.append(f"注意：英语中最常见的单字母单词是 'a' 和 'i'。当前解密文本中最常见的单字母单词是 '{most_common}'，可能需要调整对应密钥。")
+            if most_common not in model.one_letter_words:
+                examples = " 和 ".join(f"'{word}'" for word in model.one_letter_words)
+                advice.append(f"注意：{model.label}中最常见的单字母单词是 {examples}。当前解密文本中最常见的单字母单词是 '{most_common}'，可能需要调整对应密钥。")
         
         # 常见前缀和后缀分析
-        prefixes = ['un', 're', 'in', 'im', 'dis', 'pre', 'post', 'anti', 'pro']
-        suffixes = ['ing', 'ed', 'es', 's', 'er', 'est', 'ly', 'tion', 'ation', 'ment']
+        prefixes = model.prefixes
+        suffixes = model.suffixes
         
         prefix_matches = []
         suffix_matches = []
@@ -1049,11 +4101,12 @@ class CipherTool:
         
         return "\n".join(advice)
 
-    def start_breaking(self):
-        """开始或停止自动破译"""
+    def start_breaking(self, extra_ciphertexts=None):
+        """开始或停止自动破译；extra_ciphertexts 为与当前密文共用同一密钥的其他密文"""
         if self.is_breaking:
             # 停止破译
             self.is_breaking = False
+            self.breaker.stop()
             self.break_btn.config(text="重复破译", style='TButton')
             if self.break_thread and self.break_thread.is_alive():
                 self.break_thread.join(timeout=1.0)  # 等待线程结束，最多1秒
@@ -1061,247 +4114,424 @@ class CipherTool:
                     print("警告: 自动破译线程未能及时停止")
         else:
             # 开始破译
-            ciphertext = self.decrypt_text_area.get("1.0", tk.END).strip()
-            if not ciphertext:
-                messagebox.showwarning("警告", "请输入密文")
+            if self.loading_resources:
+                messagebox.showwarning("警告", "词典或语言模型仍在加载，请在加载完成后再开始破译")
                 return
+            ciphertexts = [self.get_ciphertext()] + list(extra_ciphertexts or [])
+            ciphertexts = [text for text in ciphertexts if text]
+            if not ciphertexts:
+                messagebox.showwarning("警告", "请输入密文")
+                return
+            ciphertext = "\n".join(ciphertexts)
             
-            # 获取用户设置的迭代次数
-            iterations = simpledialog.askinteger(
-                "设置迭代次数", 
-                "请输入最大迭代次数:", 
-                parent=self.root,
-                minvalue=1000, 
-                maxvalue=1000000,  
-                initialvalue=self.max_iterations
-            )
-            
-            if iterations is not None:
-                self.max_iterations = iterations
-                self.is_breaking = True
-                self.break_btn.config(text="停止破译", style='Stop.TButton')
-                self.iterations = 0
-                self.best_key = None
-                self.best_match_count = 0
-                self.last_updated_iterations = 0
-                
-                # 重置进度显示
-                self.break_progress.config(text=f"迭代次数: 0")
-                self.best_match.config(text=f"最佳匹配: 0")
-                
-                # 启动自动破译线程
-                self.break_thread = threading.Thread(target=self.break_cipher, args=(ciphertext,))
-                self.break_thread.daemon = True
-                self.break_thread.start()
-
-    def break_cipher(self, ciphertext):
-        """使用模拟退火算法自动破译密码"""
-        # 初始化密钥
-        current_key = self.generate_initial_key()
-        current_score = self.evaluate_key_dictionary(current_key, ciphertext)
-        
-        # 最佳密钥
-        self.best_key = current_key.copy()
-        self.best_match_count = current_score
-        
-        # 模拟退火参数
-        temperature = 100.0
-        cooling_rate = 0.999  # 减慢降温速率，增加探索时间
-        
-        # 记录连续未改进的迭代次数
-        stagnation_count = 0
-        max_stagnation = 10000  # 连续10000次迭代没有改进则停止
-        
-        # 迭代
-        while temperature > 0.1 and self.iterations < self.max_iterations and self.is_breaking:
-            # 生成新密钥
-            new_key = self.swap_mapping(current_key.copy())
-            new_score = self.evaluate_key_dictionary(new_key, ciphertext)
-            
-            # 计算接受概率
-            prob = self.acceptance_probability(current_score, new_score, temperature)
-            
-            # 决定是否接受新解
-            improved = False
-            if prob > random.random():
-                current_key = new_key
-                current_score = new_score
-                
-                # 更新最佳解
-                if current_score > self.best_match_count:
-                    self.best_key = current_key.copy()
-                    self.best_match_count = current_score
-                    improved = True
-                    stagnation_count = 0
-                else:
-                    stagnation_count += 1
-            else:
-                stagnation_count += 1
-            
-            # 增加迭代次数
-            self.iterations += 1
+            # 先判断密文类型，不像单表代换时由用户决定是否继续
+            classification = classify_cipher(ciphertext, self.language_model)
+            print(f"密文类型检查: {describe_classification(classification)}")
+            if classification['type'] not in ('monoalphabetic', 'unknown'):
+                if not messagebox.askyesno(
+                    "密文类型警告",
+                    f"{describe_classification(classification)}\n\n自动破译只适用于单表代换，仍要继续破译吗？"
+                ):
+                    return
             
-            # 每1000次迭代更新一次界面，减少界面更新频率提高性能
-            if self.iterations % 1000 == 0:
-                self.root.after(0, self.update_break_progress)
+            # 同一密文有未完成的破译时，询问是否从检查点继续
+            checkpoint = self.matching_checkpoint(ciphertexts)
+            if checkpoint and messagebox.askyesno(
+                "继续破译",
+                f"发现该密文未完成的破译（已迭代 {checkpoint['iterations']} 次，"
+                f"保存于 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(checkpoint['saved']))}）。\n\n"
+                "是否从检查点继续破译？"
+            ):
+                settings = checkpoint['settings']
+                self.break_cache_key = self.result_cache.make_key(ciphertext, settings['fixed_pairs'], self.scorer_settings())
+                self.telemetry_queue = queue.Queue()
+                self.breaker = CipherBreaker.from_checkpoint(
+                    checkpoint,
+                    self.dictionary,
+                    telemetry_queue=self.telemetry_queue,
+                    checkpoint_path=self.checkpoint_path
+                )
+                self.launch_breaker(ciphertext, None, checkpoint)
+                return
             
-            # 检查是否停滞
-            if stagnation_count >= max_stagnation:
-                print(f"破译停滞: 在 {max_stagnation} 次迭代中没有改进")
-                break
+            # 查询破译结果缓存：可信的结果直接使用，否则从缓存的密钥继续破译
+            settings = self.scorer_settings()
+            self.break_cache_key = self.result_cache.make_key(ciphertext, self.fixed_pairs, settings)
+            cached = self.result_cache.get(self.break_cache_key)
+            if cached and cached.get('confidence', 0.0) >= self.cache_trust_confidence:
+                self.apply_cached_result(cached)
+                return
             
-            # 降低温度
-            temperature *= cooling_rate
+            initial_key = None
+            if self.warm_start.get():
+                # 在分析者手工调整过的密钥基础上继续
+                initial_key = enforce_fixed_pairs(self.key, self.fixed_pairs)
+            elif cached:
+                initial_key = SubstitutionKey.from_dict(cached['key'])
+            else:
+                similar = self.result_cache.nearest(ciphertext, settings)
+                if similar:
+                    initial_key = enforce_fixed_pairs(SubstitutionKey.from_dict(similar['key']), self.fixed_pairs)
             
-            # 小睡一下，避免CPU占用过高，但时间更短
-            if self.iterations % 100 == 0:
-                time.sleep(0.001)  # 每100次迭代才休眠，减少休眠次数
-        
-        # 迭代完成
-        if self.is_breaking:
-            self.is_breaking = False
-            self.root.after(0, self.update_break_complete)
+            if BREAK_MODES[self.break_mode.get()] == 'exact' and SCORERS[self.scoring_mode.get()] != 'dictionary':
+                messagebox.showwarning("警告", "精确搜索只支持词典匹配评分")
+                return
+            
+            budget = self.break_budget()
+            if budget is None:
+                return
+            time_budget, max_iterations, cores = budget
+            
+            self.telemetry_queue = queue.Queue()
+            try:
+                self.breaker = CipherBreaker(
+                    ciphertexts if len(ciphertexts) > 1 else ciphertext,
+                    self.scoring_dictionary(),
+                    self.fixed_pairs,
+                    max_iterations,
+                    mode=BREAK_MODES[self.break_mode.get()],
+                    workers=cores,
+                    telemetry_queue=self.telemetry_queue,
+                    model=self.language_model,
+                    candidate_models=list(available_models()) if self.model_name.get() == AUTO_MODEL else None,
+                    scorer=SCORERS[self.scoring_mode.get()],
+                    checkpoint_path=self.checkpoint_path,
+                    time_budget=time_budget
+                )
+            except ValueError as e:
+                messagebox.showwarning("警告", str(e))
+                return
+            self.launch_breaker(ciphertext, initial_key)
 
-    def generate_initial_key(self):
-        """基于当前固定的密钥对生成初始密钥"""
-        letters = list('abcdefghijklmnopqrstuvwxyz')
-        available_letters = [l for l in letters if l not in self.fixed_pairs.values()]
-        random.shuffle(available_letters)
-        
-        key = {}
-        available_index = 0
-        
-        for letter in letters:
-            if letter in self.fixed_pairs:
-                key[letter] = self.fixed_pairs[letter]
-            else:
-                if available_index < len(available_letters):
-                    key[letter] = available_letters[available_index]
-                    available_index += 1
-        
-        # 确保所有字母都有映射
-        if len(key) < 26:
-            remaining = [l for l in letters if l not in key.values()]
-            for letter in letters:
-                if letter not in key:
-                    if remaining:
-                        key[letter] = remaining.pop()
-        
-        return key
+    def launch_breaker(self, ciphertext, initial_key, checkpoint=None):
+        """在后台线程中启动已创建的破译器；checkpoint 不为空时从检查点继续"""
+        self.is_breaking = True
+        self.break_btn.config(text="停止破译", style='Stop.TButton')
+        
+        # 重置进度显示
+        if checkpoint:
+            self.show_break_stats(checkpoint['iterations'], checkpoint['best_score'], checkpoint['confidence'])
+        else:
+            self.show_break_stats(0, 0, 0.0)
+        self.score_history = []
+        self.preview_key = None
+        self.last_preview = 0.0
+        self.draw_score_chart()
+        self.best_preview.delete("1.0", tk.END)
+        
+        # 定时取出遥测快照
+        self.poll_telemetry()
+        
+        # 启动自动破译线程
+        self.break_started = time.time()
+        self.break_ciphertext = ciphertext
+        self.break_thread = threading.Thread(target=self.run_breaker, args=(initial_key, checkpoint))
+        self.break_thread.daemon = True
+        self.break_thread.start()
 
-    def swap_mapping(self, key):
-        """随机交换两个非固定的映射"""
-        # 获取所有非固定的字母
-        non_fixed = [k for k in key if k not in self.fixed_pairs]
-        
-        if len(non_fixed) < 2:
-            return key  # 没有足够的非固定字母进行交换
-        
-        # 随机选择两个非固定的字母
-        a, b = random.sample(non_fixed, 2)
-        
-        # 交换它们的映射
-        key[a], key[b] = key[b], key[a]
-        
-        return key
+    def break_budget(self):
+        """读取破译预算设置，返回 (时间预算, 最大迭代次数, 进程数)；设置无效时提示并返回 None"""
+        try:
+            time_budget = self.time_budget.get()
+            max_iterations = self.max_iterations.get()
+            cores = self.break_cores.get()
+        except tk.TclError:
+            messagebox.showwarning("警告", "时间预算、核心数和最大迭代次数必须是整数")
+            return None
+        if time_budget < 0 or cores < 1 or max_iterations < 1000:
+            messagebox.showwarning("警告", "时间预算不能为负数，核心数至少为 1，最大迭代次数至少为 1000")
+            return None
+        if time_budget:
+            # 按时间预算破译时不限制迭代次数
+            return time_budget, sys.maxsize, cores
+        return None, max_iterations, cores
 
-    def evaluate_key_dictionary(self, key, ciphertext):
-        """使用词典匹配评估密钥的质量"""
-        # 解密文本
-        reverse_key = {v: k for k, v in key.items()}
-        decrypted_text = []
-        for c in ciphertext:
-            if c.isalpha():
-                if c.isupper():
-                    decrypted_text.append(reverse_key.get(c.lower(), '*').upper())
-                else:
-                    decrypted_text.append(reverse_key.get(c, '*'))
-            else:
-                decrypted_text.append(c)
-        
-        decrypted_text_str = "".join(decrypted_text)
-        
-        # 执行词典匹配
-        words = re.findall(r'\b[a-zA-Z]+\b', decrypted_text_str.lower())
-        if not words:
-            return 0
+    def matching_checkpoint(self, ciphertexts):
+        """读取检查点，只有与待破译的密文完全相同时才返回"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            checkpoint = CipherBreaker.load_checkpoint(self.checkpoint_path)
+        except Exception as e:
+            print(f"读取检查点时出错: {str(e)}")
+            return None
+        if checkpoint['settings']['ciphertexts'] != ciphertexts:
+            return None
+        return checkpoint
+
+    def start_joint_breaking(self):
+        """选择若干密文文件，与当前密文一起联合破译同一个密钥"""
+        if self.is_breaking:
+            self.start_breaking()
+            return
         
-        matched_words = []
-        for word in words:
-            if word in self.dictionary:
-                matched_words.append(word)
+        file_paths = filedialog.askopenfilenames(
+            title="选择共用同一密钥的密文文件",
+            filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if not file_paths:
+            return
         
-        return len(matched_words)
+        ciphertexts = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    ciphertexts.append(file.read().strip())
+            except Exception as e:
+                messagebox.showerror("错误", f"加载文件时出错: {str(e)}")
+                return
+        self.start_breaking(ciphertexts)
 
-    def evaluate_key_frequency(self, key, ciphertext):
-        """使用频率分析评估密钥的质量"""
-        # 解密文本
-        reverse_key = {v: k for k, v in key.items()}
-        decrypted_text = []
-        for c in ciphertext:
-            if c.isalpha():
-                if c.isupper():
-                    decrypted_text.append(reverse_key.get(c.lower(), '*').upper())
-                else:
-                    decrypted_text.append(reverse_key.get(c, '*'))
-            else:
-                decrypted_text.append(c)
+    def show_break_candidates(self):
+        """显示破译得到的候选密钥和各字母的映射置信度，可把高置信度的密钥对固定后重新破译"""
+        breaker = self.breaker
+        if breaker is None or not breaker.top_keys:
+            messagebox.showinfo("提示", "请先进行自动破译")
+            return
+        candidates = breaker.top_candidates()
+        marginals = breaker.letter_marginals()
+        best_key = candidates[0][0]
         
-        decrypted_text_str = "".join(decrypted_text)
+        window = tk.Toplevel(self.root)
+        window.title("候选密钥与字母置信度")
+        window.geometry("700x650")
+        window.transient(self.root)
         
-        # 计算解密文本的字母频率
-        freq = Counter(c.lower() for c in decrypted_text_str if c.isalpha())
+        main_frame = ttk.Frame(window, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
         
-        # 英语字母频率顺序
-        english_freq_order = 'etaoinsrhdlucmfywgpbvkxqjz'
+        # 候选密钥
+        key_frame = ttk.LabelFrame(main_frame, text=f"得分最高的 {len(candidates)} 个不同密钥", padding=10)
+        key_frame.pack(pady=5, fill=tk.BOTH, expand=True)
+        key_tree = ttk.Treeview(key_frame, columns=("score", "diff"), show="headings", height=8, selectmode="browse")
+        key_tree.heading("score", text="得分")
+        key_tree.heading("diff", text="与最佳密钥不同的映射（密文→明文）")
+        key_tree.column("score", width=100, anchor=tk.CENTER)
+        key_tree.column("diff", width=500)
+        for i, (key, score) in enumerate(candidates):
+            diff = ", ".join(
+                f"{LETTERS[c]}→{LETTERS[key.inverse[c]]}"
+                for c in breaker.present if key.inverse[c] != best_key.inverse[c]
+            )
+            key_tree.insert("", tk.END, iid=str(i), values=(f"{score:.1f}" if isinstance(score, float) else score, diff or "（最佳密钥）"))
+        key_tree.pack(fill=tk.BOTH, expand=True)
         
-        # 计算解密文本的字母频率顺序
-        decrypted_freq_order = ''.join([letter for letter, _ in freq.most_common()])
+        def use_selected_key():
+            selection = key_tree.selection()
+            if not selection:
+                return
+            self.key = candidates[int(selection[0])][0]
+            self.update_key_display()
+            self.update_decrypt_results()
         
-        # 计算评分：频率顺序匹配程度
-        score = 0
-        for i, letter in enumerate(decrypted_freq_order):
-            if letter in english_freq_order:
-                pos = english_freq_order.index(letter)
-                # 位置越接近，得分越高
-                score += 10 - abs(i - pos) if i < 10 else 0
+        ttk.Button(key_frame, text="使用所选密钥", command=use_selected_key).pack(pady=5, anchor=tk.E)
         
-        return score
+        # 字母置信度
+        letter_frame = ttk.LabelFrame(main_frame, text="各密文字母的映射置信度（来自最佳解附近被接受的状态）", padding=10)
+        letter_frame.pack(pady=5, fill=tk.BOTH, expand=True)
+        letter_tree = ttk.Treeview(
+            letter_frame, columns=("cipher", "plain", "probability", "others"), show="headings", height=10
+        )
+        for column, text, width in (("cipher", "密文字母", 80), ("plain", "最可能的明文", 100),
+                                    ("probability", "置信度", 80), ("others", "其他可能", 300)):
+            letter_tree.heading(column, text=text)
+            letter_tree.column(column, width=width, anchor=tk.CENTER if column != "others" else tk.W)
+        for cipher_letter, options in sorted(marginals.items(), key=lambda item: -item[1][0][1]):
+            plain, probability = options[0]
+            others = ", ".join(f"{p} {q*100:.0f}%" for p, q in options[1:4])
+            letter_tree.insert("", tk.END, iid=cipher_letter, values=(cipher_letter, plain, f"{probability*100:.1f}%", others))
+            if probability >= 0.9 and self.fixed_pairs.get(plain) != cipher_letter:
+                letter_tree.selection_add(cipher_letter)
+        letter_tree.pack(fill=tk.BOTH, expand=True)
+        
+        def pin_selected_pairs():
+            pinned = []
+            skipped = []
+            for cipher_letter in letter_tree.selection():
+                plain = marginals[cipher_letter][0][0]
+                # 固定密钥对为 明文 -> 密文，不能与已有的固定映射冲突
+                if self.fixed_pairs.get(plain, cipher_letter) != cipher_letter or \
+                        any(c == cipher_letter and p != plain for p, c in self.fixed_pairs.items()):
+                    skipped.append(f"{plain}-{cipher_letter}")
+                    continue
+                self.fixed_pairs[plain] = cipher_letter
+                pinned.append(f"{plain}-{cipher_letter}")
+            if not pinned and not skipped:
+                return
+            self.key = enforce_fixed_pairs(self.key, self.fixed_pairs)
+            self.update_key_display()
+            self.update_decrypt_results()
+            message = f"已固定 {len(pinned)} 个密钥对: {', '.join(pinned)}"
+            if skipped:
+                message += f"\n与已有固定密钥对冲突而跳过: {', '.join(skipped)}"
+            messagebox.showinfo("固定密钥对", message + "\n\n重新破译时这些映射将保持不变。", parent=window)
+        
+        ttk.Button(letter_frame, text="固定所选密钥对", command=pin_selected_pairs).pack(pady=5, anchor=tk.E)
 
-    def acceptance_probability(self, current_score, new_score, temperature):
-        """计算接受新解的概率"""
-        if new_score > current_score:
-            return 1.0
-        return 1.0 * (1 - (current_score - new_score) / temperature)
+    def run_breaker(self, initial_key, checkpoint=None):
+        """在后台线程中运行破译器，正常结束（未被用户停止）时回到主线程更新界面"""
+        self.breaker.run(initial_key, resume=checkpoint)
+        if self.is_breaking:
+            # 正常结束的破译不再需要检查点；被停止的破译保留检查点，下次可以继续
+            self.breaker.remove_checkpoint()
+            self.is_breaking = False
+            self.root.after(0, self.update_break_complete)
 
-    def update_break_progress(self):
-        """更新自动破译进度显示"""
+    def show_break_stats(self, iterations, match_count, confidence):
+        """显示迭代次数、最佳匹配和置信度"""
         if hasattr(self, 'break_progress') and self.break_progress.winfo_exists():
-            self.break_progress.config(text=f"迭代次数: {self.iterations}")
+            self.break_progress.config(text=f"迭代次数: {iterations}")
         if hasattr(self, 'best_match') and self.best_match.winfo_exists():
-            self.best_match.config(text=f"最佳匹配: {self.best_match_count}")
-        
-        # 每10000次迭代才更新解密结果，减少计算负担
-        if self.iterations - self.last_updated_iterations >= 10000 and self.best_key:
-            self.last_updated_iterations = self.iterations
-            # 如果当前密钥是最佳密钥，更新解密结果
-            if self.key == self.best_key:
-                self.update_decrypt_results()
+            if isinstance(match_count, float):
+                match_count = f"{match_count:.1f}"  # n元语法评分为对数概率
+            self.best_match.config(text=f"最佳匹配: {match_count}")
+        if hasattr(self, 'confidence_label') and self.confidence_label.winfo_exists():
+            self.confidence_label.config(text=f"置信度: {confidence*100:.2f}%")
+
+    def poll_telemetry(self):
+        """取出破译器的遥测快照，刷新进度、得分曲线和最佳密钥预览；破译进行中定时调用"""
+        if self.telemetry_job is not None:
+            # 直接调用时取消已安排的刷新，保证同一时间只有一个定时刷新
+            self.root.after_cancel(self.telemetry_job)
+            self.telemetry_job = None
+        latest = None
+        while True:
+            try:
+                snapshot = self.telemetry_queue.get_nowait()
+            except queue.Empty:
+                break
+            latest = snapshot
+            self.record_score_point(snapshot)
+        if latest is not None:
+            best_score = latest['best_score']
+            self.show_break_stats(latest['iterations'], best_score if best_score is not None else 0, latest['confidence'])
+            self.show_telemetry_stats(latest)
+            self.draw_score_chart()
+            if latest['best_key']:
+                self.preview_key = SubstitutionKey.from_dict(latest['best_key'])
+        # 预览限制刷新频率，并且只解密可见的部分，不随密文长度变慢
+        if self.preview_key is not None and time.time() - self.last_preview >= self.preview_interval:
+            self.last_preview = time.time()
+            self.show_best_preview(self.preview_key)
+        if self.is_breaking:
+            self.telemetry_job = self.root.after(self.telemetry_interval, self.poll_telemetry)
+
+    def record_score_point(self, snapshot):
+        """把一份遥测快照加入得分曲线，数据点过多时隔点抽稀"""
+        if snapshot['best_score'] is None:
+            return
+        self.score_history.append((snapshot['elapsed'], snapshot['current_score'], snapshot['best_score']))
+        if len(self.score_history) > self.max_history_points:
+            self.score_history = self.score_history[::2]
+
+    def show_telemetry_stats(self, snapshot):
+        """显示速度、温度和接受率；快照之间没有迭代时保留原来的显示"""
+        if snapshot['rate'] is None:
+            return
+        temperature = snapshot['temperature']
+        acceptance = snapshot['acceptance_rate']
+        self.telemetry_label.config(text=(
+            f"速度: {snapshot['rate']:.0f} 次/秒  "
+            f"温度: {f'{temperature:.2f}' if temperature is not None else '-'}  "
+            f"接受率: {f'{acceptance*100:.1f}%' if acceptance is not None else '-'}"
+        ))
+
+    def draw_score_chart(self):
+        """按得分历史绘制曲线：横轴为已用时间，纵轴为得分"""
+        if not hasattr(self, 'score_chart'):
+            return
+        canvas = self.score_chart
+        canvas.delete("all")
+        points = self.score_history
+        scores = [score for point in points for score in point[1:] if score is not None and math.isfinite(score)]
+        if len(points) < 2 or not scores:
+            return
+        width, height, margin = canvas.winfo_width(), canvas.winfo_height(), 4
+        start, span = points[0][0], (points[-1][0] - points[0][0]) or 1.0
+        low, high = min(scores), max(scores)
+        scale = (high - low) or 1.0
+        
+        def coords(index):
+            result = []
+            for point in points:
+                score = point[index]
+                if score is None or not math.isfinite(score):
+                    continue
+                result.append(margin + (point[0] - start) / span * (width - 2 * margin))
+                result.append(height - margin - (score - low) / scale * (height - 2 * margin))
+            return result
+        
+        for index, color in ((1, '#999999'), (2, 'blue')):
+            line = coords(index)
+            if len(line) >= 4:
+                canvas.create_line(*line, fill=color)
+        canvas.create_text(margin, margin, anchor=tk.NW, text=f"{high:g}", font=("宋体", 8))
+        canvas.create_text(margin, height - margin, anchor=tk.SW, text=f"{low:g}", font=("宋体", 8))
+        canvas.create_text(width - margin, height - margin, anchor=tk.SE, text=f"{points[-1][0]:.0f} 秒", font=("宋体", 8))
+
+    def visible_ciphertext(self):
+        """密文输入框（或大文本虚拟视图）中当前可见的部分"""
+        if self.cipher_buffer is not None:
+            return self.decrypt_virtual_view.visible_text()
+        area = self.decrypt_text_area
+        return area.get("@0,0 linestart", f"@0,{area.winfo_height()} lineend")
+
+    def show_best_preview(self, key):
+        """用最佳密钥解密密文的可见部分并显示在预览框中"""
+        if not hasattr(self, 'best_preview') or self.decrypt_text_has_example:
+            return
+        self.best_preview.delete("1.0", tk.END)
+        self.best_preview.insert(tk.END, key.decrypt(self.visible_ciphertext()))
 
     def update_break_complete(self):
         """更新自动破译完成后的界面"""
         self.break_btn.config(text="重复破译", style='TButton')
-        
-        if self.best_key:
+        breaker = self.breaker
+        self.last_preview = 0.0
+        self.poll_telemetry()  # 取出最后的遥测快照
+        
+        if breaker.best_key:
+            if breaker.probe_results:
+                # 破译意见改用自动选出的语言模型
+                self.language_model = breaker.model
+                self.model_name.set(breaker.model.name)
+            
             # 使用最佳密钥
-            self.key = self.best_key
+            self.key = breaker.best_key
             self.update_key_display()
             self.update_decrypt_results()
             
-            messagebox.showinfo("破译完成", f"自动破译完成！\n迭代次数: {self.iterations}\n最佳匹配: {self.best_match_count}")
+            # 写入破译结果缓存
+            self.result_cache.put(
+                self.break_cache_key,
+                self.break_ciphertext,
+                self.scorer_settings(),
+                breaker.best_key,
+                breaker.best_match_count,
+                confidence=breaker.confidence,
+                iterations=breaker.iterations,
+                mode=self.break_mode.get(),
+                duration=time.time() - self.break_started
+            )
+            
+            messagebox.showinfo("破译完成", f"自动破译完成！\n迭代次数: {breaker.iterations}\n最佳匹配: {breaker.best_match_count}\n置信度: {breaker.confidence*100:.2f}%")
         else:
             messagebox.showinfo("破译取消", "自动破译已取消")
 
+    def scorer_settings(self):
+        """影响破译结果的评分设置，作为缓存索引的一部分"""
+        model = self.model_name.get() if self.model_name.get() == AUTO_MODEL else self.language_model.name
+        return {'scorer': SCORERS[self.scoring_mode.get()], 'dictionary': self.dictionary_fingerprint, 'model': model}
+
+    def apply_cached_result(self, cached):
+        """直接使用缓存中的破译结果"""
+        confidence = cached.get('confidence', 0.0)
+        self.key = SubstitutionKey.from_dict(cached['key'])
+        self.update_key_display()
+        self.update_decrypt_results()
+        self.show_break_stats(cached.get('iterations', 0), cached['score'], confidence)
+        messagebox.showinfo("破译完成", f"已使用缓存的破译结果\n最佳匹配: {cached['score']}\n置信度: {confidence*100:.2f}%")
+
     def save_key(self):
         """保存当前密钥到文件"""
         file_path = filedialog.asksaveasfilename(
@@ -1311,7 +4541,7 @@ class CipherTool:
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(self.key, file)
+                    json.dump(self.key.to_dict(), file)
                 messagebox.showinfo("成功", f"密钥已保存到 {file_path}")
             except Exception as e:
                 messagebox.showerror("错误", f"保存密钥时出错: {str(e)}")
@@ -1333,7 +4563,7 @@ class CipherTool:
                     messagebox.showerror("错误", "加载的密钥包含重复的映射")
                     return
                 
-                self.key = loaded_key
+                self.key = SubstitutionKey.from_dict(loaded_key)
                 self.update_key_display()
                 
                 if self.current_page == 'decrypt':
@@ -1364,24 +4594,12 @@ class CipherTool:
 
     def save_decrypted_text(self):
         """保存解密文本到文件"""
-        ciphertext = self.decrypt_text_area.get("1.0", tk.END).strip()
+        ciphertext = self.get_ciphertext()
         if not ciphertext:
             messagebox.showwarning("警告", "没有解密文本可保存")
             return
         
-        reverse_key = {v: k for k, v in self.key.items()}
-        decrypted_text = []
-        
-        for c in ciphertext:
-            if c.isalpha():
-                if c.isupper():
-                    decrypted_text.append(reverse_key.get(c.lower(), '*').upper())
-                else:
-                    decrypted_text.append(reverse_key.get(c, '*'))
-            else:
-                decrypted_text.append(c)
-        
-        decrypted_text_str = "".join(decrypted_text)
+        decrypted_text_str = self.key.decrypt(ciphertext)
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
@@ -1404,6 +4622,9 @@ class CipherTool:
             self.plaintext_area.insert(tk.END, "请在此输入明文...")
             self.plaintext_area.bind("<FocusIn>", self.on_plaintext_focus_in)
         elif page_type == 'decrypt' and hasattr(self, 'decrypt_text_area'):
+            if self.cipher_buffer is not None:
+                self.cipher_buffer = None
+                self.hide_cipher_buffer()
             self.decrypt_text_area.delete("1.0", tk.END)
             self.cached_decrypt_text = ""
             self.decrypt_text_has_example = True
@@ -1425,15 +4646,1155 @@ class CipherTool:
                     self.plaintext_has_example = False
                 elif page_type == 'decrypt' and hasattr(self, 'decrypt_text_area'):
                     self.decrypt_text_area.delete("1.0", tk.END)
-                    self.decrypt_text_area.insert(tk.END, text)
-                    self.cached_decrypt_text = text
+                    if len(text) > self.large_text_threshold:
+                        # 大文本不写入 Text 控件，只保存在 Python 端
+                        self.cipher_buffer = text.strip()
+                        self.cached_decrypt_text = self.cipher_buffer
+                        self.show_cipher_buffer()
+                    else:
+                        if self.cipher_buffer is not None:
+                            self.cipher_buffer = None
+                            self.hide_cipher_buffer()
+                        self.decrypt_text_area.insert(tk.END, text)
+                        self.cached_decrypt_text = text
                     self.decrypt_text_has_example = False
                 
                 messagebox.showinfo("成功", f"文本已从 {file_path} 加载")
             except Exception as e:
                 messagebox.showerror("错误", f"加载文件时出错: {str(e)}")
 
+# 任务服务工作进程内的状态，由 _init_job_worker 在进程启动时设置
+_job_worker_state = {}
+
+
+def _init_job_worker(dictionary_path):
+    """任务服务工作进程的初始化：每个进程只加载一次词典"""
+    try:
+        _job_worker_state['dictionary'] = read_dictionary(dictionary_path)
+    except OSError as e:
+        print(f"加载词典时出错: {str(e)}")
+        _job_worker_state['dictionary'] = set()
+
+
+def _run_break_job(request, progress, cancel_event):
+    """在工作进程中运行一个破译任务，通过 progress 报告进度，cancel_event 被设置时停止"""
+    def report(breaker):
+        progress.update(
+            iterations=breaker.iterations,
+            score=breaker.best_match_count,
+            confidence=breaker.confidence
+        )
+        if cancel_event.is_set():
+            breaker.stop()
+    
+    initial_key = request.get('initial_key')
+    model_name = request.get('model', 'english')
+    auto = model_name == AUTO_MODEL
+    model = ENGLISH_MODEL if auto else get_language_model(model_name)  # 每个工作进程中每个模型只加载一次
+    
+    # 不像单表代换的密文直接放弃，除非请求中设置了 force
+    ciphertext = request['ciphertext']
+    classification = classify_cipher(ciphertext if isinstance(ciphertext, str) else "\n".join(ciphertext), model)
+    if classification['type'] not in ('monoalphabetic', 'unknown') and not request.get('force'):
+        raise ValueError(f"已放弃破译，密文类型为{describe_classification(classification)}")
+
+    breaker = CipherBreaker(
+        ciphertext,
+        _job_worker_state['dictionary'] if auto else model.words or _job_worker_state['dictionary'],
+        request.get('fixed_pairs'),
+        request.get('max_iterations', sys.maxsize if request.get('time_budget') else 1000000),
+        mode=request.get('mode', 'anneal'),
+        workers=1,  # 任务本身已经在工作进程中并行，不再创建子进程池
+        progress_callback=report,
+        model=model,
+        candidate_models=list(available_models()) if auto else None,
+        scorer=request.get('scorer', 'dictionary'),
+        time_budget=request.get('time_budget')
+    )
+    if cancel_event.is_set():
+        breaker.stop()
+        return breaker.result()
+    if initial_key:
+        # 初始密钥必须满足固定密钥对，否则遗传算法的交叉可能产生不是置换的密钥
+        initial_key = enforce_fixed_pairs(SubstitutionKey.from_dict(initial_key), breaker.fixed_pairs)
+    return breaker.run(initial_key or None)
+
+
+class HTTPError(Exception):
+    """任务服务中返回给客户端的错误"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class BreakJob:
+    """任务服务中的一个破译任务"""
+
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.status = 'queued'  # queued / running / done / cancelled / failed
+        self.progress = {'iterations': 0, 'score': 0, 'confidence': 0.0}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.cancel_event = None
+        self.progress_proxy = None
+
+    def is_finished(self):
+        return self.status in ('done', 'cancelled', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class CipherJobServer:
+    """本地 HTTP/JSON 破译任务服务
+
+    只监听本机地址。加密、解密在事件循环中直接完成；破译任务进入有界队列，
+    由固定数量的调度协程交给进程池执行，队列已满时返回 503 让客户端稍后重试。
+
+    接口：
+        POST   /encrypt            {"text": ..., "key": {...}}
+        POST   /decrypt            {"text": ..., "key": {...}}
+        POST   /jobs               {"ciphertext": ..., "fixed_pairs", "max_iterations", "time_budget", "mode", "initial_key", "model", "scorer"}
+                                   ciphertext 可以是共用同一密钥的多段密文的列表，此时联合破译
+                                   model 为 "auto" 时先用各语言模型试探破译，再只用得分最高的模型
+                                   密文不像单表代换时任务失败，设置 "force": true 可强行破译
+        GET    /jobs               所有任务
+        GET    /jobs/<id>          任务状态、进度和结果
+        GET    /jobs/<id>/events   以 NDJSON 流的形式持续推送进度，直到任务结束
+        DELETE /jobs/<id>          取消任务
+    """
+
+    LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+    def __init__(self, dictionary_path="dictionary.txt", host='127.0.0.1', port=8765,
+                 workers=None, queue_size=16, max_finished_jobs=1000, poll_interval=0.5, key_store_path=None,
+                 max_body_size=16 * 1024 * 1024):
+        if host not in self.LOCAL_HOSTS:
+            raise ValueError("任务服务只能监听本机地址")
+        self.dictionary_path = dictionary_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_finished_jobs = max_finished_jobs
+        self.poll_interval = poll_interval
+        self.max_body_size = max_body_size  # 请求体的最大字节数，超过时返回 413
+        self.key_store_path = key_store_path  # 给出时完成的破译结果追加到该密钥库
+        self.key_store = None
+        self.jobs = OrderedDict()
+        self.next_job_id = 1
+        self.queue = None
+        self.pool = None
+        self.manager = None
+        self.server = None
+        self.dispatchers = []
+
+    async def start(self):
+        """启动进程池、调度协程和 HTTP 监听；port 为 0 时由系统分配端口"""
+        context = multiprocessing.get_context('spawn')
+        self.manager = context.Manager()
+        self.pool = create_process_pool(_init_job_worker, (self.dictionary_path,), self.workers)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.key_store_path:
+            self.key_store = KeyStore(self.key_store_path)
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"破译任务服务已启动: http://{self.host}:{self.port}")
+
+    async def stop(self):
+        """停止服务：取消所有任务并关闭进程池"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for job in self.jobs.values():
+            if job.cancel_event is not None and not job.is_finished():
+                job.cancel_event.set()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.manager is not None:
+            self.manager.shutdown()
+        if self.key_store is not None:
+            self.key_store.close()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ---- 任务调度 ----
+
+    @staticmethod
+    def parse_key(mapping):
+        """校验请求中的密钥字典并构造密钥"""
+        if not isinstance(mapping, dict):
+            raise HTTPError(400, "密钥必须是 {明文字母: 密文字母} 形式的 JSON 对象")
+        return SubstitutionKey.from_dict(mapping)
+
+    @staticmethod
+    def require_text(body):
+        """校验加密、解密请求中的文本"""
+        text = body.get('text')
+        if not isinstance(text, str):
+            raise HTTPError(400, "text 必须是字符串")
+        return text
+
+    def submit(self, request):
+        """校验破译请求的各字段后加入队列，字段类型不对时抛出 400，队列已满时抛出 503"""
+        ciphertext = request.get('ciphertext')
+        texts = [ciphertext] if isinstance(ciphertext, str) else ciphertext
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) and text.strip() for text in texts):
+            raise HTTPError(400, "缺少密文")
+        if request.get('mode', 'anneal') not in BREAK_MODES.values():
+            raise HTTPError(400, f"未知的破译算法: {request.get('mode')}")
+        if request.get('scorer', 'dictionary') not in SCORERS.values():
+            raise HTTPError(400, f"未知的评分方式: {request.get('scorer')}")
+        if request.get('mode') == 'exact' and request.get('scorer', 'dictionary') != 'dictionary':
+            raise HTTPError(400, "精确搜索只支持词典匹配评分")
+        if request.get('model', 'english') not in list(available_models()) + [AUTO_MODEL]:
+            raise HTTPError(400, f"未找到语言模型: {request.get('model')}")
+        time_budget = request.get('time_budget')
+        if time_budget is not None and (
+                not isinstance(time_budget, (int, float)) or isinstance(time_budget, bool) or time_budget <= 0):
+            raise HTTPError(400, "时间预算必须是正数")
+        max_iterations = request.get('max_iterations')
+        if max_iterations is not None and (
+                not isinstance(max_iterations, int) or isinstance(max_iterations, bool) or max_iterations <= 0):
+            raise HTTPError(400, "最大迭代次数必须是正整数")
+        fixed_pairs = request.get('fixed_pairs') or {}
+        if (not isinstance(fixed_pairs, dict) or
+                not all(isinstance(letter, str) and len(letter) == 1 and letter in LETTERS
+                        for pair in fixed_pairs.items() for letter in pair) or
+                len(set(fixed_pairs.values())) != len(fixed_pairs)):
+            raise HTTPError(400, "固定密钥对必须是 {明文字母: 密文字母} 形式（小写），且密文字母不能重复")
+        if request.get('initial_key'):
+            self.parse_key(request['initial_key'])
+        
+        job = BreakJob(str(self.next_job_id), request)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise HTTPError(503, "任务队列已满，请稍后重试", {'Retry-After': '1'})
+        self.next_job_id += 1
+        self.jobs[job.id] = job
+        self.prune_jobs()
+        return job
+
+    def prune_jobs(self):
+        """只保留最近的若干个已结束任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def cancel(self, job):
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished = time.time()
+        elif job.status == 'running':
+            job.cancel_event.set()
+
+    async def dispatch(self):
+        """调度协程：从队列中取出任务交给进程池，同时进程池中最多有 workers 个任务在运行"""
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status == 'queued':
+                    await self.run_job(job)
+            finally:
+                self.queue.task_done()
+
+    async def run_job(self, job):
+        loop = asyncio.get_running_loop()
+        # 创建代理对象要与管理进程往返通信，放到线程中执行，不阻塞事件循环
+        progress_proxy = await loop.run_in_executor(None, self.manager.dict, job.progress)
+        cancel_event = await loop.run_in_executor(None, self.manager.Event)
+        if job.status != 'queued':
+            return  # 创建代理对象期间已被取消
+        job.progress_proxy = progress_proxy
+        job.cancel_event = cancel_event
+        job.status = 'running'
+        future = loop.run_in_executor(self.pool, _run_break_job, job.request, job.progress_proxy, job.cancel_event)
+        try:
+            while not future.done():
+                await asyncio.wait({future}, timeout=self.poll_interval)
+                job.progress = await loop.run_in_executor(None, job.progress_proxy.copy)
+            job.result = future.result()
+            job.progress = {
+                'iterations': job.result['iterations'],
+                'score': job.result['score'],
+                'confidence': job.result['confidence'],
+            }
+            job.status = 'cancelled' if job.result['cancelled'] else 'done'
+            if self.key_store is not None and job.status == 'done':
+                ciphertext = job.request['ciphertext']
+                if not isinstance(ciphertext, str):
+                    ciphertext = "\n".join(ciphertext)
+                try:
+                    await loop.run_in_executor(None, self.key_store.append_result, ciphertext, job.result, 'server')
+                except sqlite3.Error as e:
+                    print(f"写入密钥库时出错: {str(e)}")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.progress_proxy = None
+
+    # ---- HTTP ----
+
+    async def handle_connection(self, reader, writer):
+        """处理一个 HTTP 连接（每个连接只处理一个请求）"""
+        try:
+            peer = writer.get_extra_info('peername')
+            if peer and not ipaddress.ip_address(peer[0]).is_loopback:
+                raise HTTPError(403, "只接受本机连接")
+            method, path, body = await self.read_request(reader)
+            await self.route(method, path, body, writer)
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {'error': e.message}, e.headers)
+        except (ValueError, KeyError) as e:
+            await self.send_json(writer, 400, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "无效的请求")
+        method, path, _ = parts
+        
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        body = None
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "无效的 Content-Length")
+        if length < 0:
+            raise HTTPError(400, "无效的 Content-Length")
+        if length > self.max_body_size:
+            raise HTTPError(413, f"请求体不能超过 {self.max_body_size} 字节")
+        if length:
+            try:
+                body = json.loads((await reader.readexactly(length)).decode('utf-8'))
+            except json.JSONDecodeError:
+                raise HTTPError(400, "请求体不是有效的 JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "请求体必须是 JSON 对象")
+        return method, path.split('?', 1)[0].rstrip('/'), body or {}
+
+    async def route(self, method, path, body, writer):
+        parts = [part for part in path.split('/') if part]
+        
+        if method == 'POST' and parts == ['encrypt']:
+            key = self.parse_key(body.get('key'))
+            await self.send_json(writer, 200, {'text': key.encrypt(self.require_text(body))})
+        elif method == 'POST' and parts == ['decrypt']:
+            key = self.parse_key(body.get('key'))
+            await self.send_json(writer, 200, {'text': key.decrypt(self.require_text(body))})
+        elif method == 'POST' and parts == ['jobs']:
+            job = self.submit(body)
+            await self.send_json(writer, 202, job.to_dict())
+        elif method == 'GET' and parts == ['jobs']:
+            await self.send_json(writer, 200, {'jobs': [job.to_dict() for job in self.jobs.values()]})
+        elif len(parts) >= 2 and parts[0] == 'jobs':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise HTTPError(404, "任务不存在")
+            if method == 'GET' and len(parts) == 2:
+                await self.send_json(writer, 200, job.to_dict())
+            elif method == 'GET' and parts[2:] == ['events']:
+                await self.stream_events(job, writer)
+            elif method == 'DELETE' and len(parts) == 2:
+                self.cancel(job)
+                await self.send_json(writer, 200, job.to_dict())
+            else:
+                raise HTTPError(404, "接口不存在")
+        else:
+            raise HTTPError(404, "接口不存在")
+
+    async def send_json(self, writer, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        await self.send_head(writer, status, {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Content-Length': str(len(body)),
+            **(headers or {})
+        })
+        writer.write(body)
+        await writer.drain()
+
+    async def send_head(self, writer, status, headers):
+        reason = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 403: 'Forbidden',
+                  404: 'Not Found', 413: 'Payload Too Large', 503: 'Service Unavailable'}.get(status, '')
+        lines = [f"HTTP/1.1 {status} {reason}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+
+    async def stream_events(self, job, writer):
+        """以分块传输的 NDJSON 流推送任务进度，任务结束后发送最终状态并关闭"""
+        await self.send_head(writer, 200, {
+            'Content-Type': 'application/x-ndjson; charset=utf-8',
+            'Transfer-Encoding': 'chunked'
+        })
+        last = None
+        while True:
+            snapshot = job.to_dict()
+            if snapshot != last:
+                line = (json.dumps(snapshot, ensure_ascii=False) + "\n").encode('utf-8')
+                writer.write(f"{len(line):x}\r\n".encode('latin-1') + line + b"\r\n")
+                await writer.drain()
+                last = snapshot
+            if job.is_finished():
+                break
+            await asyncio.sleep(self.poll_interval)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def shard_seed(seed, cipher_hash, index):
+    """由全局种子、密文哈希和分片编号推出分片的随机种子，与分片在哪台机器上运行无关"""
+    digest = hashlib.sha256(f"{seed}:{cipher_hash}:{index}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class BreakCoordinator:
+    """分布式破译的协调进程
+
+    每个破译任务（一段或多段共用同一密钥的密文）切分成 shards 个分片，每个分片是一次
+    使用独立种子、按时间预算（或迭代次数）运行的模拟退火（_run_timed_break）。
+    工作进程（run_break_worker，可以在其他机器上）通过 TCP 连接领取分片，协议为每行一个 JSON 对象，
+    工作进程每发一条消息，协调进程回复一条：
+        工作进程 -> 协调进程  {"type": "ready", "worker": 名称, "token": 共享令牌}
+                              {"type": "result", "shard": 分片编号, "result": {...}}
+                              {"type": "error", "shard": 分片编号, "error": 说明}
+        协调进程 -> 工作进程  {"type": "shard", "shard", "cipher_hash", "seed", "time_budget", "iterations",
+                               "model", "scorer", "fixed_pairs", "dictionary"（词典哈希）,
+                               "ciphertexts"（同一连接上每个任务只发送一次）}
+                              {"type": "stop"}  所有分片都已完成
+                              {"type": "error", "error": 说明}  令牌无效，随后断开连接
+    连接上的第一条消息必须是 ready；给出 token 时其中的令牌必须与之相同，协议本身不加密。
+    工作进程断开时，它正在运行的分片重新排队；报告错误的分片最多重试 max_attempts 次。
+    一个任务的分片全部完成后，按分片编号的顺序（与完成的先后和机器无关）用 CipherBreaker.merge_results 合并，
+    因此同样的任务、种子和迭代次数总是得到同样的结果。
+    """
+
+    def __init__(self, jobs, dictionary, host='127.0.0.1', port=8766, shards=8, time_budget=None,
+                 iterations=None, seed=0, model='english', scorer='dictionary', max_attempts=3, token=None):
+        if time_budget is None and iterations is None:
+            raise ValueError("需要给出每个分片的时间预算或迭代次数")
+        self.host = host
+        self.port = port
+        self.token = token  # 工作进程需提供的共享令牌，为 None 时不检查
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.model = get_language_model(model)
+        self.scorer = scorer
+        self.dictionary = self.model.words or dictionary  # 评分词表，与工作进程的词典哈希比较
+        self.fingerprint = dictionary_fingerprint(self.dictionary)
+        self.max_attempts = max_attempts
+        
+        # 任务和分片
+        self.jobs = []
+        self.shards = []
+        for job in jobs:
+            texts = job['ciphertexts']
+            cipher_hash = KeyStore.ciphertext_hash("\n".join(texts))
+            first = len(self.shards)
+            for index in range(shards):
+                self.shards.append({'job': len(self.jobs), 'seed': shard_seed(seed, cipher_hash, index)})
+            self.jobs.append({
+                'name': job.get('name', cipher_hash[:12]),
+                'ciphertexts': texts,
+                'fixed_pairs': dict(job.get('fixed_pairs') or {}),
+                'cipher_hash': cipher_hash,
+                'shards': range(first, len(self.shards)),
+            })
+        self.pending = list(range(len(self.shards)))  # 待分配的分片，从前往后分配
+        self.results = {}  # 分片编号 -> 结果
+        self.failed = {}  # 分片编号 -> 错误说明
+        self.attempts = Counter()
+        self.merged = [None] * len(self.jobs)  # 各任务合并后的结果
+        self.changed = None  # 有分片重新排队或完成时设置，唤醒等待分片的连接
+        self.finished = None
+        self.server = None
+    
+    async def start(self):
+        """开始监听；port 为 0 时由系统分配端口"""
+        self.changed = asyncio.Event()
+        self.finished = asyncio.Event()
+        if not self.shards:
+            self.finished.set()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"协调进程已启动: {self.host}:{self.port}，{len(self.jobs)} 个任务，{len(self.shards)} 个分片")
+    
+    async def wait_finished(self):
+        """等待所有分片完成，返回各任务合并后的结果（与任务列表的顺序相同）"""
+        await self.finished.wait()
+        return self.merged
+    
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def is_done(self, index):
+        return index in self.results or index in self.failed
+
+    def check_token(self, token):
+        """工作进程提供的令牌是否有效（用常数时间比较）"""
+        if self.token is None:
+            return True
+        return isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8'))
+    
+    async def next_shard(self):
+        """取出下一个待分配的分片；暂时没有但还有分片在运行时等待，全部完成时返回 None"""
+        while True:
+            if self.pending:
+                return self.pending.pop(0)
+            if self.finished.is_set():
+                return None
+            self.changed.clear()
+            await self.changed.wait()
+
+    def requeue(self, index, front=True):
+        """把未完成的分片放回队列（默认放在最前面）"""
+        if front:
+            self.pending.insert(0, index)
+        else:
+            self.pending.append(index)
+        self.changed.set()
+
+    def finish_shard(self, index, message, worker):
+        """记录工作进程报告的分片结果或错误"""
+        if self.is_done(index):
+            return
+        if message['type'] == 'result':
+            self.results[index] = message['result']
+        else:
+            self.attempts[index] += 1
+            print(f"工作进程 {worker} 运行分片 {index} 时出错: {message.get('error')}")
+            if self.attempts[index] < self.max_attempts:
+                self.requeue(index, front=False)  # 尽量交给其他工作进程重试
+                return
+            self.failed[index] = message.get('error')
+        
+        job_index = self.shards[index]['job']
+        job = self.jobs[job_index]
+        if all(self.is_done(shard) for shard in job['shards']):
+            self.merged[job_index] = self.merge_job(job)
+        if len(self.results) + len(self.failed) == len(self.shards):
+            self.finished.set()
+        self.changed.set()
+
+    def merge_job(self, job):
+        """按分片编号的顺序合并一个任务的全部分片结果"""
+        results = [self.results[shard] for shard in job['shards'] if shard in self.results]
+        breaker = CipherBreaker(
+            job['ciphertexts'] if len(job['ciphertexts']) > 1 else job['ciphertexts'][0],
+            self.dictionary,
+            job['fixed_pairs'],
+            workers=1,
+            model=self.model,
+            scorer=self.scorer
+        )
+        breaker.merge_results(results)
+        merged = breaker.result()
+        merged['name'] = job['name']
+        merged['cipher_hash'] = job['cipher_hash']
+        merged['shards'] = len(results)
+        merged['failed_shards'] = len(job['shards']) - len(results)
+        if results:
+            print(f"任务 {job['name']} 已完成: 最佳匹配 {merged['score']}，置信度 {merged['confidence']*100:.2f}%")
+        else:
+            print(f"任务 {job['name']} 失败: 所有分片都出错")
+        return merged
+
+    def shard_message(self, index, sent_jobs):
+        """发给工作进程的分片描述；同一连接上每个任务的密文只发送一次"""
+        shard = self.shards[index]
+        job = self.jobs[shard['job']]
+        message = {
+            'type': 'shard',
+            'shard': index,
+            'cipher_hash': job['cipher_hash'],
+            'seed': shard['seed'],
+            'time_budget': self.time_budget,
+            'iterations': self.iterations,
+            'model': self.model.name,
+            'scorer': self.scorer,
+            'fixed_pairs': job['fixed_pairs'],
+            'dictionary': self.fingerprint,
+        }
+        if shard['job'] not in sent_jobs:
+            message['ciphertexts'] = job['ciphertexts']
+            sent_jobs.add(shard['job'])
+        return message
+    
+    async def handle_connection(self, reader, writer):
+        """一个工作进程的连接：收到一条消息就回复下一个分片，直到没有分片"""
+        worker = str(writer.get_extra_info('peername'))
+        current = None
+        sent_jobs = set()
+        authorized = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if not authorized:
+                    if message.get('type') != 'ready' or not self.check_token(message.get('token')):
+                        print(f"拒绝来自 {worker} 的连接: 令牌无效")
+                        writer.write((json.dumps({'type': 'error', 'error': "令牌无效"}) + "\n").encode('utf-8'))
+                        await writer.drain()
+                        break
+                    authorized = True
+                if message.get('type') == 'ready':
+                    worker = message.get('worker') or worker
+                elif message.get('type') in ('result', 'error') and current is not None and message.get('shard') == current:
+                    self.finish_shard(current, message, worker)
+                    current = None
+                
+                current = await self.next_shard()
+                reply = {'type': 'stop'} if current is None else self.shard_message(current, sent_jobs)
+                writer.write((json.dumps(reply, ensure_ascii=False) + "\n").encode('utf-8'))
+                await writer.drain()
+                if current is None:
+                    break
+        except (ConnectionError, ValueError, KeyError) as e:
+            print(f"与工作进程 {worker} 的连接出错: {str(e)}")
+        finally:
+            if current is not None and not self.is_done(current):
+                # 工作进程中途断开，分片交给其他工作进程
+                print(f"工作进程 {worker} 已断开，分片 {current} 重新排队")
+                self.requeue(current)
+            writer.close()
+
+
+def run_break_worker(host, port, dictionary_path="dictionary.txt", name=None, connect_timeout=30.0, token=None):
+    """分布式破译的工作进程：连接协调进程，循环领取分片、运行并报告结果，直到协调进程通知结束
+
+    协调进程可能稍后才启动，connect_timeout 秒内会反复重试连接。token 为协调进程要求的共享令牌。
+    返回完成的分片数。
+    """
+    dictionary = read_dictionary(dictionary_path) if os.path.exists(dictionary_path) else set()
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    fingerprints = {}  # 语言模型名称 -> 评分词表的哈希
+    ciphertexts = {}  # 密文哈希 -> 密文
+    completed = 0
+    
+    deadline = time.time() + connect_timeout
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.5)
+    
+    with connection, connection.makefile('rwb') as stream:
+        message = {'type': 'ready', 'worker': name, 'token': token}
+        while True:
+            stream.write((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                break  # 协调进程已关闭
+            shard = json.loads(line)
+            if shard['type'] == 'stop':
+                break
+            if shard['type'] == 'error':
+                print(f"协调进程拒绝了工作进程 {name}: {shard.get('error')}")
+                break
+            if 'ciphertexts' in shard:
+                ciphertexts[shard['cipher_hash']] = shard['ciphertexts']
+            try:
+                model = get_language_model(shard['model'])
+                words = model.words or dictionary
+                if model.name not in fingerprints:
+                    fingerprints[model.name] = dictionary_fingerprint(words)
+                if fingerprints[model.name] != shard['dictionary']:
+                    raise ValueError("评分词表与协调进程不同，结果无法合并")
+                result = _run_timed_break(
+                    ciphertexts[shard['cipher_hash']], words, shard['fixed_pairs'], model.name, shard['scorer'],
+                    shard['time_budget'], shard['seed'], max_iterations=shard['iterations'] or sys.maxsize
+                )
+                message = {'type': 'result', 'shard': shard['shard'], 'result': result}
+                completed += 1
+            except Exception as e:
+                message = {'type': 'error', 'shard': shard['shard'], 'error': str(e)}
+    print(f"工作进程 {name} 已结束，共完成 {completed} 个分片")
+    return completed
+
+
+def run_coordinate_command(args):
+    """命令行分布式破译：每个密文文件是一个任务，切分成分片交给工作进程，合并后输出每个任务的结果
+
+    给出 --local-workers 时在本机启动相应数量的工作进程，可以在一台机器上代替远程节点。
+    只监听本机地址时可以不设令牌；监听其他地址（接受远程工作进程）时必须用 --token 设置共享令牌。
+    """
+    if args.scorer == 'ngram' and not get_language_model(args.model).has_ngrams:
+        print(f"语言模型 {args.model} 没有双字母或四字母表，不能用于 n 元语法评分，请用 build-model 从语料编译")
+        return
+    try:
+        loopback = args.host == 'localhost' or ipaddress.ip_address(args.host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback and not args.token:
+        print(f"监听非本机地址 {args.host} 时必须用 --token 设置工作进程的共享令牌")
+        return
+    try:
+        fixed_pairs = parse_fixed_pairs(args.fixed)
+    except ValueError as e:
+        print(str(e))
+        return
+    dictionary = read_dictionary(args.dictionary) if os.path.exists(args.dictionary) else set()
+    jobs = []
+    for file_path in args.files:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            jobs.append({'name': file_path, 'ciphertexts': [file.read().strip()], 'fixed_pairs': fixed_pairs})
+    
+    coordinator = BreakCoordinator(
+        jobs, dictionary, args.host, args.port, args.shards,
+        time_budget=(args.time or None) if args.time or args.iterations else 30.0,
+        iterations=args.iterations, seed=args.seed, model=args.model, scorer=args.scorer, token=args.token or None
+    )
+    workers = []
+    
+    async def coordinate():
+        await coordinator.start()
+        context = multiprocessing.get_context('spawn')
+        for i in range(args.local_workers):
+            process = context.Process(
+                target=run_break_worker,
+                args=('127.0.0.1' if args.host in ('0.0.0.0', '::') else args.host, coordinator.port, args.dictionary,
+                      f"local-{i + 1}"),
+                kwargs={'token': args.token or None}
+            )
+            process.start()
+            workers.append(process)
+        try:
+            return await coordinator.wait_finished()
+        finally:
+            await coordinator.stop()
+    
+    try:
+        results = asyncio.run(coordinate())
+    finally:
+        for process in workers:
+            process.join()
+    
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        for result in results:
+            line = json.dumps({
+                'name': result['name'],
+                'cipher_hash': result['cipher_hash'],
+                'key': result['key'],
+                'score': result['score'],
+                'confidence': result['confidence'],
+                'iterations': result['iterations'],
+                'shards': result['shards'],
+                'failed_shards': result['failed_shards'],
+            }, ensure_ascii=False)
+            print(line)
+            if output is not None:
+                output.write(line + "\n")
+    finally:
+        if output is not None:
+            output.close()
+    if args.store:
+        with KeyStore(args.store) as store:
+            for job, result in zip(coordinator.jobs, results):
+                if result['key'] is not None:
+                    store.append_result("\n".join(job['ciphertexts']), result, 'coordinator')
+        print(f"破译结果已追加到密钥库 {args.store}")
+
+
+def run_worker_command(args):
+    """命令行工作进程：启动 --processes 个工作进程连接协调进程"""
+    if args.processes <= 1:
+        run_break_worker(args.host, args.port, args.dictionary, args.name, token=args.token)
+        return
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=run_break_worker,
+            args=(args.host, args.port, args.dictionary, f"{args.name or socket.gethostname()}-{i + 1}"),
+            kwargs={'token': args.token}
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def run_break_command(args):
+    """命令行破译：读取一个或多个密文文件，输出破译出的密钥和第一段密文的解密结果
+
+    给出 --checkpoint 时定期（以及按 Ctrl-C 中断时）保存检查点，之后用 --resume 继续。
+    """
+    dictionary = read_dictionary(args.dictionary) if os.path.exists(args.dictionary) else set()
+    checkpoint = None
+    if args.resume:
+        checkpoint = CipherBreaker.load_checkpoint(args.resume)
+        ciphertexts = checkpoint['settings']['ciphertexts']
+        breaker = CipherBreaker.from_checkpoint(
+            checkpoint,
+            dictionary,
+            workers=args.cores,
+            checkpoint_path=args.checkpoint or args.resume,
+            checkpoint_interval=args.checkpoint_interval
+        )
+        print(f"从检查点 {args.resume} 继续破译，已迭代 {checkpoint['iterations']} 次")
+    else:
+        if not args.files:
+            print("请给出密文文件，或用 --resume 从检查点继续")
+            return
+        ciphertexts = []
+        for file_path in args.files:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                ciphertexts.append(file.read().strip())
+        
+        if args.mode == 'exact' and args.scorer != 'dictionary':
+            print("精确搜索只支持词典匹配评分")
+            return
+        
+        auto = args.model == AUTO_MODEL
+        model = ENGLISH_MODEL if auto else get_language_model(args.model)
+        
+        classification = classify_cipher("\n".join(ciphertexts), model)
+        print(f"密文类型检查: {describe_classification(classification)}")
+        if classification['type'] not in ('monoalphabetic', 'unknown') and not args.force:
+            print("已放弃破译；如需强行破译请使用 --force")
+            return
+        
+        try:
+            breaker = CipherBreaker(
+                ciphertexts if len(ciphertexts) > 1 else ciphertexts[0],
+                dictionary if auto else model.words or dictionary,
+                # 按时间预算破译时默认不限制迭代次数
+                max_iterations=args.iterations or (sys.maxsize if args.time else 1000000),
+                mode=args.mode,
+                workers=args.cores,
+                time_budget=args.time or None,
+                model=model,
+                candidate_models=list(available_models()) if auto else None,
+                probe_iterations=args.probe_iterations,
+                scorer=args.scorer,
+                checkpoint_path=args.checkpoint,
+                checkpoint_interval=args.checkpoint_interval
+            )
+        except ValueError as e:
+            print(str(e))
+            return
+    # Ctrl-C 只请求停止，破译循环在一次完整的迭代之后退出并保存检查点
+    previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: breaker.stop())
+    try:
+        result = breaker.run(resume=checkpoint)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    if breaker.cancelled:
+        if breaker.checkpoint_path:
+            print(f"破译已中断，检查点已保存到 {breaker.checkpoint_path}，可用 --resume 继续")
+    else:
+        breaker.remove_checkpoint()
+    
+    print(f"迭代次数: {result['iterations']}")
+    print(f"最佳匹配: {result['score']}")
+    print(f"置信度: {result['confidence']*100:.2f}%")
+    print(f"语言模型: {result['model']}")
+    if result['key'] is None:
+        return
+    print(json.dumps(result['key']))
+    if breaker.word_trie:
+        print(segment_text(breaker.best_key.decrypt(ciphertexts[0]), breaker.word_trie))
+    else:
+        print(breaker.best_key.decrypt(ciphertexts[0]))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result['key'], file)
+        print(f"密钥已保存到 {args.output}")
+    if args.store:
+        with KeyStore(args.store) as store:
+            store.append_result("\n".join(ciphertexts), result)
+        print(f"破译结果已追加到密钥库 {args.store}")
+
+
+def run_crib_command(args):
+    """命令行明文片段拖动：列出片段在密文中所有不矛盾的位置及推出的映射"""
+    with open(args.file, 'r', encoding='utf-8') as file:
+        ciphertext = file.read()
+    try:
+        fixed_pairs = parse_fixed_pairs(args.fixed)
+    except ValueError as e:
+        print(str(e))
+        return
+    
+    placements = PatternIndex(ciphertext).drag(args.crib, fixed_pairs)
+    for placement in placements[:args.limit]:
+        print(json.dumps(placement, ensure_ascii=False))
+    print(f"找到 {len(placements)} 个不矛盾的位置")
+
+
+def run_cluster_command(args):
+    """命令行分组：每行输出一组可能共用同一密钥的文件"""
+    ciphertexts = []
+    for file_path in args.files:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            ciphertexts.append(file.read())
+    
+    groups = [[args.files[i] for i in group] for group in cluster_by_key(ciphertexts, args.critical_z, args.max_effect)]
+    for group in groups:
+        print(json.dumps(group, ensure_ascii=False))
+    print(f"{len(args.files)} 个文件分为 {len(groups)} 组")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(groups, file, ensure_ascii=False, indent=2)
+        print(f"分组结果已保存到 {args.output}")
+
+
+def run_build_model_command(args):
+    """命令行编译语言模型"""
+    texts = []
+    for file_path in args.corpus:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            texts.append(file.read())
+    words = []
+    if args.words:
+        with open(args.words, 'r', encoding='utf-8') as file:
+            words = file.read().split()
+    
+    model = LanguageModel.build(args.name, texts, words, args.label)
+    output = args.output or os.path.join(MODEL_DIR, args.name + ".lm")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    model.save(output)
+    print(f"语言模型已保存到 {output}，词表包含 {len(model.words)} 个单词")
+    print(f"字母频率顺序: {model.frequency_order}")
+
+
+def run_encrypt_corpus_command(args):
+    """命令行批量加密：为每条明文记录生成独立的密钥，写出 (明文, 密钥, 密文) 测试语料"""
+    try:
+        fixed_pairs = parse_fixed_pairs(args.fixed)
+    except ValueError as e:
+        print(str(e))
+        return
+    
+    records = read_corpus_records(args.inputs, args.split)
+    triples = encrypt_corpus(records, args.seed, fixed_pairs, args.workers, args.batch_size)
+    store = KeyStore(args.store) if args.store else None
+    if store is not None:
+        triples = store_corpus_keys(triples, store)
+    started = time.time()
+    try:
+        if args.format == 'files':
+            count = write_corpus_files(triples, args.output, args.shard_size or 1000)
+        else:
+            count = write_corpus_jsonl(triples, args.output, args.shard_size)
+    finally:
+        if store is not None:
+            store.close()
+    print(f"已加密 {count} 条记录，用时 {time.time() - started:.1f} 秒，输出到 {args.output}")
+
+
+def run_keystore_command(args):
+    """命令行查询密钥库：按密文文件、密文哈希或记录编号查找，可把找到的密钥导出为 .key 文件"""
+    with KeyStore(args.store) as store:
+        if args.id is not None:
+            record = store.get(args.id)
+            records = [record] if record else []
+        elif args.lookup or args.hash:
+            ciphertext = None
+            if args.lookup:
+                with open(args.lookup, 'r', encoding='utf-8') as file:
+                    ciphertext = file.read().strip()
+            records = store.lookup(ciphertext, args.hash, args.limit)
+        else:
+            print(f"密钥库 {args.store} 共有 {store.count()} 条记录")
+            return
+        
+        for record in records:
+            print(json.dumps({
+                'id': record['id'],
+                'score': record['score'],
+                'confidence': record['confidence'],
+                'model': record['model'],
+                'source': record['source'],
+                'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['created'])),
+                'key': "".join(LETTERS[c] for c in record['key'].forward),
+            }, ensure_ascii=False))
+        print(f"找到 {len(records)} 条记录")
+        
+        if args.export and records:
+            os.makedirs(args.export, exist_ok=True)
+            for record in records:
+                store.export_key(record['id'], os.path.join(args.export, f"key{record['id']}.key"))
+            print(f"密钥已导出到 {args.export}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="单表代换工具（不带参数时启动图形界面）")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    serve_parser = subparsers.add_parser('serve', help="启动本机的破译任务服务（HTTP/JSON）")
+    serve_parser.add_argument('--port', type=int, default=8765, help="监听端口，0 表示由系统分配")
+    serve_parser.add_argument('--workers', type=int, default=None, help="同时运行的破译任务数，默认为CPU核数")
+    serve_parser.add_argument('--queue-size', type=int, default=16, help="排队任务数上限，超过时拒绝新任务")
+    serve_parser.add_argument('--dictionary', default="dictionary.txt", help="词典文件路径")
+    serve_parser.add_argument('--store', help="把完成的破译结果追加到该密钥库（SQLite）")
+    
+    break_parser = subparsers.add_parser('break', help="破译密文；给出多个文件时视为共用同一密钥并联合破译")
+    break_parser.add_argument('files', nargs='*', help="密文文件（使用 --resume 时可省略）")
+    break_parser.add_argument('--dictionary', default="dictionary.txt", help="词典文件路径")
+    break_parser.add_argument('--iterations', type=int, help="最大迭代次数（默认 1000000，给出 --time 时默认不限制）")
+    break_parser.add_argument('--time', type=float, help="时间预算（秒），到时返回目前的最佳密钥")
+    break_parser.add_argument('--cores', type=int, help="使用的进程数，默认使用全部 CPU 核心")
+    break_parser.add_argument('--mode', choices=sorted(BREAK_MODES.values()), default='anneal', help="破译算法")
+    break_parser.add_argument('--output', help="把破译出的密钥保存为 .key 文件")
+    break_parser.add_argument('--store', help="把破译结果追加到该密钥库（SQLite）")
+    break_parser.add_argument('--model', default='english', help="语言模型名称（models 目录中的 .lm 文件名），auto 表示自动选择")
+    break_parser.add_argument('--probe-iterations', type=int, default=20000, help="自动选择时每个语言模型试探破译的迭代次数")
+    break_parser.add_argument('--force', action='store_true', help="密文不像单表代换时仍然破译")
+    break_parser.add_argument('--checkpoint', help="定期把破译状态保存到该检查点文件，中断后可用 --resume 继续")
+    break_parser.add_argument('--checkpoint-interval', type=float, default=60.0, help="保存检查点的间隔（秒）")
+    break_parser.add_argument('--resume', help="从检查点文件继续破译（使用检查点中保存的密文和设置）")
+    break_parser.add_argument('--scorer', choices=sorted(SCORERS.values()), default='dictionary',
+                              help="评分方式，ngram 适用于没有空格的密文，输出时按词典分词")
+    
+    crib_parser = subparsers.add_parser('crib', help="拖动已知的明文片段，列出它在密文中所有可能的位置")
+    crib_parser.add_argument('file', help="密文文件")
+    crib_parser.add_argument('crib', help="明文片段，如 \"attack at dawn\"")
+    crib_parser.add_argument('--fixed', help="已知的固定密钥对（明文-密文），如 a-q,e-x")
+    crib_parser.add_argument('--limit', type=int, help="最多列出的位置数")
+    
+    cluster_parser = subparsers.add_parser('cluster', help="按可能共用的密钥对密文文件分组，每组可交给 break 联合破译")
+    cluster_parser.add_argument('files', nargs='+', help="密文文件")
+    cluster_parser.add_argument('--critical-z', type=float, default=3.09, help="判定分布不一致的临界 z 值，越大分组越少")
+    cluster_parser.add_argument('--max-effect', type=float, default=0.25, help="效应量低于该值时总认为分布一致")
+    cluster_parser.add_argument('--output', help="把分组结果保存为 JSON 文件")
+    
+    model_parser = subparsers.add_parser('build-model', help="从语料编译语言模型，保存到 models 目录后即可选择")
+    model_parser.add_argument('name', help="模型名称")
+    model_parser.add_argument('corpus', nargs='+', help="该语言的纯文本语料文件")
+    model_parser.add_argument('--words', help="额外的词表文件，每行一个单词")
+    model_parser.add_argument('--label', help="界面中显示的语言名称")
+    model_parser.add_argument('--output', help="模型文件路径，默认为 models/<名称>.lm")
+    
+    corpus_parser = subparsers.add_parser('encrypt-corpus', help="批量加密明文记录，生成 (明文, 密钥, 密文) 测试语料")
+    corpus_parser.add_argument('inputs', nargs='+', help="明文文件；.jsonl 文件每行一个含 text 字段的 JSON 对象")
+    corpus_parser.add_argument('--output', required=True, help="输出的 JSONL 文件，分片或 files 格式时为输出目录")
+    corpus_parser.add_argument('--format', choices=['jsonl', 'files'], default='jsonl',
+                               help="jsonl 每行一组；files 按 text_key 目录的格式写出明文、密文和 .key 文件")
+    corpus_parser.add_argument('--split', choices=['line', 'paragraph', 'file'], default='line',
+                               help="纯文本文件的记录划分：每行、每个段落或整个文件")
+    corpus_parser.add_argument('--seed', type=int, default=0, help="随机种子，相同种子生成相同的密钥")
+    corpus_parser.add_argument('--fixed', help="所有密钥都保持的固定密钥对，如 a-q,e-x")
+    corpus_parser.add_argument('--workers', type=int, help="加密进程数，默认为CPU核数")
+    corpus_parser.add_argument('--batch-size', type=int, default=1000, help="每次交给工作进程的记录数")
+    corpus_parser.add_argument('--shard-size', type=int, help="每个分片的记录数（files 格式默认 1000）")
+    corpus_parser.add_argument('--store', help="同时把每条记录的密钥追加到该密钥库（SQLite）")
+    
+    store_parser = subparsers.add_parser('keystore', help="查询密钥库，导出其中的密钥")
+    store_parser.add_argument('store', help="密钥库文件")
+    store_parser.add_argument('--lookup', help="查找该密文文件的所有记录")
+    store_parser.add_argument('--hash', help="按密文哈希查找")
+    store_parser.add_argument('--id', type=int, help="按记录编号查找")
+    store_parser.add_argument('--limit', type=int, help="最多列出的记录数（按得分从高到低）")
+    store_parser.add_argument('--export', help="把找到的密钥导出为 .key 文件的目录")
+    
+    coordinate_parser = subparsers.add_parser('coordinate', help="分布式破译的协调进程：把每个密文文件切分成分片交给工作进程")
+    coordinate_parser.add_argument('files', nargs='+', help="密文文件，每个文件是一个破译任务")
+    coordinate_parser.add_argument('--host', default='127.0.0.1',
+                                   help="监听地址，默认只接受本机的工作进程；接受其他机器的工作进程时使用 0.0.0.0 并设置 --token")
+    coordinate_parser.add_argument('--port', type=int, default=8766, help="监听端口，0 表示由系统分配")
+    coordinate_parser.add_argument('--shards', type=int, default=8, help="每个任务的分片数（独立种子的退火运行）")
+    coordinate_parser.add_argument('--time', type=float, help="每个分片的时间预算（秒），默认 30 秒")
+    coordinate_parser.add_argument('--iterations', type=int, help="每个分片的最大迭代次数；不给 --time 时结果可完全重现")
+    coordinate_parser.add_argument('--seed', type=int, default=0, help="全局随机种子，各分片的种子由它推出")
+    coordinate_parser.add_argument('--model', default='english', help="语言模型名称")
+    coordinate_parser.add_argument('--scorer', choices=sorted(SCORERS.values()), default='dictionary', help="评分方式")
+    coordinate_parser.add_argument('--fixed', help="所有任务的固定密钥对，如 a-q,e-x")
+    coordinate_parser.add_argument('--dictionary', default="dictionary.txt", help="词典文件路径，工作进程需使用相同的词典")
+    coordinate_parser.add_argument('--local-workers', type=int, default=0, help="在本机启动的工作进程数")
+    coordinate_parser.add_argument('--output', help="把每个任务的结果写入该 JSONL 文件")
+    coordinate_parser.add_argument('--store', help="把破译结果追加到该密钥库（SQLite）")
+    coordinate_parser.add_argument('--token', help="工作进程连接时需提供的共享令牌，监听非本机地址时必须给出（连接不加密）")
+    
+    worker_parser = subparsers.add_parser('worker', help="分布式破译的工作进程：从协调进程领取分片并报告结果")
+    worker_parser.add_argument('--host', default='127.0.0.1', help="协调进程的地址")
+    worker_parser.add_argument('--port', type=int, default=8766, help="协调进程的端口")
+    worker_parser.add_argument('--dictionary', default="dictionary.txt", help="词典文件路径，需与协调进程相同")
+    worker_parser.add_argument('--processes', type=int, default=1, help="本机启动的工作进程数，通常为CPU核数")
+    worker_parser.add_argument('--name', help="工作进程名称，默认为 主机名-进程号")
+    worker_parser.add_argument('--token', help="协调进程要求的共享令牌")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'serve':
+        server = CipherJobServer(args.dictionary, port=args.port, workers=args.workers, queue_size=args.queue_size,
+                                 key_store_path=args.store)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("破译任务服务已停止")
+    elif args.command == 'break':
+        run_break_command(args)
+    elif args.command == 'crib':
+        run_crib_command(args)
+    elif args.command == 'cluster':
+        run_cluster_command(args)
+    elif args.command == 'build-model':
+        run_build_model_command(args)
+    elif args.command == 'encrypt-corpus':
+        run_encrypt_corpus_command(args)
+    elif args.command == 'keystore':
+        run_keystore_command(args)
+    elif args.command == 'coordinate':
+        run_coordinate_command(args)
+    elif args.command == 'worker':
+        run_worker_command(args)
+    else:
+        root = tk.Tk()
+        app = CipherTool(root)
+        root.mainloop()
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = CipherTool(root)
-    root.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
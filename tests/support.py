@@ -0,0 +1,33 @@
+"""测试共用的辅助函数"""
+import importlib.util
+import os
+import socket
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "Monoalphabetic Substitution Tool.py")
+TEXT_DIR = os.path.join(ROOT, "text_key")
+DICTIONARY = os.path.join(ROOT, "dictionary.txt")
+
+
+def load_tool():
+    """按文件路径加载工具脚本（文件名含空格，不能直接 import），同一进程中只加载一次"""
+    module = sys.modules.get('substitution_tool')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('substitution_tool', SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['substitution_tool'] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def read_text(name):
+    with open(os.path.join(TEXT_DIR, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def free_port():
+    """向系统要一个当前空闲的本机端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
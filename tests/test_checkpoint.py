@@ -0,0 +1,66 @@
+"""检查点：固定种子时，中途停止再从检查点继续的结果与一次运行完的结果相同"""
+import os
+import tempfile
+import unittest
+
+from support import DICTIONARY, load_tool, read_text
+
+tool = load_tool()
+
+MAX_ITERATIONS = 30000
+STOP_AT = 10000
+SEED = 11
+
+
+class CheckpointResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'break.ckpt')
+        self.ciphertext = read_text('ciphertext2.txt')
+        self.dictionary = tool.read_dictionary(DICTIONARY)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_breaker(self, mode, stop_at=None, checkpoint_path=None):
+        def stop_early(breaker):
+            if stop_at is not None and breaker.iterations >= stop_at:
+                breaker.stop()
+
+        breaker = tool.CipherBreaker(
+            self.ciphertext, self.dictionary, max_iterations=MAX_ITERATIONS, mode=mode, workers=1, seed=SEED,
+            progress_callback=stop_early, checkpoint_path=checkpoint_path
+        )
+        return breaker.run()
+
+    def check_resume(self, mode):
+        uninterrupted = self.run_breaker(mode)
+
+        stopped = self.run_breaker(mode, STOP_AT, self.path)
+        self.assertTrue(stopped['cancelled'])
+        self.assertLess(stopped['iterations'], uninterrupted['iterations'])
+        checkpoint = tool.CipherBreaker.load_checkpoint(self.path)
+        breaker = tool.CipherBreaker.from_checkpoint(checkpoint, self.dictionary, workers=1)
+        resumed = breaker.run(resume=checkpoint)
+
+        for field in ('key', 'score', 'confidence', 'iterations'):
+            self.assertEqual(resumed[field], uninterrupted[field], field)
+
+    def test_annealing_resume(self):
+        self.check_resume('anneal')
+
+    def test_genetic_resume(self):
+        self.check_resume('genetic')
+
+    def test_expired_time_budget_is_not_unlimited(self):
+        breaker = tool.CipherBreaker(self.ciphertext, self.dictionary, workers=1, time_budget=0.0)
+        self.assertEqual(breaker.run()['iterations'], 0)
+        # 保存时预算已经用完的检查点按最短预算继续，而不是不限时间
+        checkpoint = {'settings': dict(breaker.checkpoint_settings(), time_budget=0.0)}
+        resumed = tool.CipherBreaker.from_checkpoint(checkpoint, self.dictionary, workers=1)
+        self.assertEqual(resumed.time_budget, tool.MIN_RESUME_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""密文类型检查：区分单表代换、多表代换和未加密（或换位）的文本"""
+import random
+import unittest
+
+from support import load_tool, read_text
+
+tool = load_tool()
+
+
+def vigenere(text, keyword):
+    """维吉尼亚加密，只移动字母，非字母原样保留"""
+    shifts = [ord(c) - 97 for c in keyword]
+    output = []
+    i = 0
+    for c in text.lower():
+        if 'a' <= c <= 'z':
+            output.append(chr((ord(c) - 97 + shifts[i % len(shifts)]) % 26 + 97))
+            i += 1
+        else:
+            output.append(c)
+    return "".join(output)
+
+
+class ClassifyCipherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plaintexts = [read_text('plaintext1.txt'), read_text('plaintext2.txt')]
+
+    def test_monoalphabetic(self):
+        samples = [read_text('ciphertext1.txt'), read_text('ciphertext2.txt')]
+        rng = random.Random(2)
+        samples += [tool.random_key(rng).encrypt(text) for text in self.plaintexts for _ in range(3)]
+        for text in samples:
+            self.assertEqual(tool.classify_cipher(text)['type'], 'monoalphabetic')
+
+    def test_polyalphabetic(self):
+        for keyword in ("lemon", "cipher", "key"):
+            for text in self.plaintexts:
+                result = tool.classify_cipher(vigenere(text, keyword))
+                self.assertEqual(result['type'], 'polyalphabetic')
+                self.assertEqual(result['period'], len(keyword))
+
+    def test_plaintext_and_short_text(self):
+        for text in self.plaintexts:
+            self.assertEqual(tool.classify_cipher(text)['type'], 'transposition')
+        self.assertEqual(tool.classify_cipher(read_text('ciphertext1.txt')[:50])['type'], 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""按密钥分组：同一密钥加密的密文分在同一组，不同密钥的密文分在不同组"""
+import random
+import unittest
+
+from support import load_tool, read_text
+
+tool = load_tool()
+
+KEYS = 4
+CHUNK = 400
+
+
+class ClusterByKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        text = (read_text('plaintext1.txt') + " " + read_text('plaintext2.txt')).replace("\n", " ")
+        self.chunks = [text[i:i + CHUNK] for i in range(0, len(text) - CHUNK, CHUNK)]
+
+    def encrypt_chunks(self, seed):
+        """每段轮流用 KEYS 个随机密钥之一加密，返回 (密文列表, 每段所用密钥的序号)"""
+        rng = random.Random(seed)
+        keys = [tool.random_key(rng) for _ in range(KEYS)]
+        labels = [i % KEYS for i in range(len(self.chunks))]
+        return [keys[label].encrypt(chunk) for label, chunk in zip(labels, self.chunks)], labels
+
+    def test_groups_follow_keys(self):
+        for seed in (8, 9, 10):
+            ciphertexts, labels = self.encrypt_chunks(seed)
+            expected = [[i for i, label in enumerate(labels) if label == key] for key in range(KEYS)]
+            self.assertEqual(sorted(tool.cluster_by_key(ciphertexts)), expected)
+
+    def test_single_key(self):
+        key = tool.random_key(random.Random(1))
+        ciphertexts = [key.encrypt(chunk) for chunk in self.chunks]
+        self.assertEqual(tool.cluster_by_key(ciphertexts), [list(range(len(ciphertexts)))])
+
+    def test_empty(self):
+        self.assertEqual(tool.cluster_by_key([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
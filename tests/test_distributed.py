@@ -0,0 +1,114 @@
+"""分布式破译：在本机启动一个协调进程和两个工作进程，检查合并后的结果"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from support import DICTIONARY, ROOT, SCRIPT, TEXT_DIR, free_port, load_tool, read_text
+
+tool = load_tool()
+
+SHARDS = 4
+ITERATIONS = 4000
+SEED = 7
+
+
+class DistributedBreakTest(unittest.TestCase):
+
+    def run_cluster(self, output_path):
+        """协调进程和两个工作进程各自是独立的命令行进程，通过 127.0.0.1 上的 TCP 连接通信"""
+        port = free_port()
+        coordinator = subprocess.Popen(
+            [sys.executable, SCRIPT, 'coordinate', os.path.join(TEXT_DIR, 'ciphertext1.txt'),
+             '--port', str(port), '--shards', str(SHARDS), '--iterations', str(ITERATIONS), '--seed', str(SEED),
+             '--dictionary', DICTIONARY, '--output', output_path],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        workers = [
+            subprocess.Popen(
+                [sys.executable, SCRIPT, 'worker', '--port', str(port), '--dictionary', DICTIONARY,
+                 '--name', f"test-{i}"],
+                cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+            )
+            for i in range(2)
+        ]
+        try:
+            output, _ = coordinator.communicate(timeout=600)
+            worker_output = [worker.communicate(timeout=60)[0] for worker in workers]
+        finally:
+            for process in [coordinator] + workers:
+                if process.poll() is None:
+                    process.kill()
+        self.assertEqual(coordinator.returncode, 0, output.decode('utf-8', 'replace'))
+        return worker_output
+
+    def test_two_local_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, 'results.jsonl')
+            worker_output = self.run_cluster(output_path)
+            with open(output_path, 'r', encoding='utf-8') as file:
+                results = [json.loads(line) for line in file]
+
+        # 两个工作进程都领取过分片
+        for output in worker_output:
+            self.assertIn("共完成", output.decode('utf-8', 'replace'))
+            self.assertNotIn("共完成 0 个分片", output.decode('utf-8', 'replace'))
+
+        self.assertEqual(len(results), 1)
+        merged = results[0]
+        self.assertEqual(merged['shards'], SHARDS)
+        self.assertEqual(merged['failed_shards'], 0)
+        self.assertEqual(merged['iterations'], SHARDS * ITERATIONS)
+
+        # 合并结果的得分与用合并出的密钥重新评分一致
+        ciphertext = read_text('ciphertext1.txt').strip()
+        dictionary = tool.read_dictionary(DICTIONARY)
+        key = tool.SubstitutionKey.from_dict(merged['key'])
+        self.assertEqual(merged['score'], tool.count_dictionary_matches(key, ciphertext, dictionary))
+
+        # 给定迭代次数时结果与分片在哪个进程上运行无关：在本进程中依次运行各分片再合并，结果相同
+        cipher_hash = tool.KeyStore.ciphertext_hash(ciphertext)
+        local_results = [
+            tool._run_timed_break([ciphertext], dictionary, {}, 'english', 'dictionary', None,
+                                  tool.shard_seed(SEED, cipher_hash, index), max_iterations=ITERATIONS)
+            for index in range(SHARDS)
+        ]
+        breaker = tool.CipherBreaker(ciphertext, dictionary, {}, workers=1)
+        breaker.merge_results(local_results)
+        self.assertEqual(merged['key'], breaker.best_key.to_dict())
+        self.assertEqual(merged['score'], breaker.best_match_count)
+
+    def test_token(self):
+        # 监听非本机地址而不设令牌时拒绝启动
+        output = subprocess.run(
+            [sys.executable, SCRIPT, 'coordinate', os.path.join(TEXT_DIR, 'ciphertext1.txt'), '--host', '0.0.0.0',
+             '--iterations', '100', '--dictionary', DICTIONARY],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=60
+        ).stdout.decode('utf-8', 'replace')
+        self.assertIn("--token", output)
+        self.assertNotIn("协调进程已启动", output)
+
+        # 令牌错误的工作进程领不到分片，令牌正确的工作进程完成全部分片
+        port = free_port()
+        coordinator = subprocess.Popen(
+            [sys.executable, SCRIPT, 'coordinate', os.path.join(TEXT_DIR, 'ciphertext1.txt'),
+             '--port', str(port), '--shards', '1', '--iterations', '500', '--dictionary', DICTIONARY,
+             '--token', 'secret'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        try:
+            self.assertEqual(tool.run_break_worker('127.0.0.1', port, DICTIONARY, 'intruder', token='wrong'), 0)
+            self.assertEqual(tool.run_break_worker('127.0.0.1', port, DICTIONARY, 'intruder'), 0)
+            self.assertEqual(tool.run_break_worker('127.0.0.1', port, DICTIONARY, 'worker', token='secret'), 1)
+            output, _ = coordinator.communicate(timeout=60)
+        finally:
+            if coordinator.poll() is None:
+                coordinator.kill()
+        self.assertEqual(coordinator.returncode, 0)
+        self.assertIn("令牌无效", output.decode('utf-8', 'replace'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""批量加密：每条记录的密钥只由种子和序号决定，与批大小和进程数无关"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from support import ROOT, SCRIPT, load_tool, read_text
+
+tool = load_tool()
+
+SEED = 42
+
+
+class EncryptCorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        # 按句子切分成记录
+        sentences = read_text('plaintext1.txt').replace("\n", " ").split(".")
+        self.records = [sentence.strip() for sentence in sentences if sentence.strip()][:40]
+
+    def test_record_key_is_deterministic(self):
+        keys = [tool.record_key(SEED, index) for index in range(20)]
+        self.assertEqual(keys, [tool.record_key(SEED, index) for index in range(20)])
+        # 不同序号、不同种子得到不同的密钥
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertNotEqual(tool.record_key(SEED, 0), tool.record_key(SEED + 1, 0))
+
+    def test_record_key_keeps_fixed_pairs(self):
+        fixed_pairs = {'a': 'q', 'e': 'x'}
+        for index in range(20):
+            key = tool.record_key(SEED, index, fixed_pairs)
+            self.assertEqual((key['a'], key['e']), ('q', 'x'))
+
+    def test_keys_do_not_depend_on_batching(self):
+        serial = list(tool.encrypt_corpus(self.records, SEED, workers=1, batch_size=1000))
+        for index, text, key, ciphertext in serial:
+            self.assertEqual(key, tool.record_key(SEED, index).to_dict())
+            self.assertEqual(text, self.records[index])
+            self.assertEqual(tool.SubstitutionKey.from_dict(key).decrypt(ciphertext), text)
+
+        # 命令行用两个进程、每批 7 条加密，得到的密钥和密文与单进程相同
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'records.txt')
+            output_path = os.path.join(directory, 'corpus.jsonl')
+            with open(input_path, 'w', encoding='utf-8') as file:
+                file.write("\n".join(self.records) + "\n")
+            subprocess.run(
+                [sys.executable, SCRIPT, 'encrypt-corpus', input_path, '--output', output_path, '--seed', str(SEED),
+                 '--workers', '2', '--batch-size', '7'],
+                cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=120, check=True
+            )
+            with open(output_path, 'r', encoding='utf-8') as file:
+                parallel = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(row['id'], row['plaintext'], row['key'], row['ciphertext']) for row in parallel],
+            [tuple(item) for item in serial]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
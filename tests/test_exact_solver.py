@@ -0,0 +1,77 @@
+"""精确破译（分支定界）：得分是最优的，并且能还原短密文的明文"""
+import itertools
+import random
+import unittest
+from collections import Counter
+
+from support import load_tool
+
+tool = load_tool()
+
+PLAINTEXT = ("the quick brown fox jumps over the lazy dog while the dog sleeps under the warm sun "
+             "and the fox runs back into the dark woods")
+DECOYS = {"fix", "cat", "hat", "sleep", "bore", "lady", "mug", "ward", "sat", "rung"}
+
+
+def brute_force_score(ciphertext, dictionary):
+    """枚举每个密文单词对应的词典单词（或不对应），求互不矛盾的选择中的最高得分"""
+    counts = Counter(ciphertext.split())
+    options = []
+    for word in counts:
+        candidates = [plain for plain in dictionary if tool.word_pattern(plain) == tool.word_pattern(word)]
+        options.append([None] + candidates)
+    best = 0
+    for choice in itertools.product(*options):
+        mapping, score = {}, 0
+        for word, plain in zip(counts, choice):
+            if plain is None:
+                continue
+            pairs = dict(zip(word, plain))
+            if any(mapping.get(c, p) != p for c, p in pairs.items()):
+                break
+            mapping.update(pairs)
+            if len(set(mapping.values())) != len(mapping):
+                break
+            score += counts[word]
+        else:
+            best = max(best, score)
+    return best
+
+
+class ExactSolverTest(unittest.TestCase):
+
+    def test_recovers_short_plaintext(self):
+        key = tool.random_key(random.Random(5))
+        ciphertext = key.encrypt(PLAINTEXT)
+        dictionary = set(PLAINTEXT.split()) | DECOYS
+        solver = tool.ExactSolver(ciphertext, dictionary)
+        best_score, ties, complete = solver.run()
+        # 每个单词都命中词典是得分的上界
+        self.assertTrue(complete)
+        self.assertEqual(best_score, len(PLAINTEXT.split()))
+        best_key = solver.rank(ties)[0][0]
+        self.assertEqual(best_key.decrypt(ciphertext), PLAINTEXT)
+
+    def test_breaker_returns_optimal_key(self):
+        key = tool.random_key(random.Random(6))
+        # 末尾的单词不可能命中词典，最优得分比单词数少 1
+        ciphertext = key.encrypt(PLAINTEXT) + " xqzv"
+        dictionary = set(PLAINTEXT.split()) | DECOYS
+        breaker = tool.CipherBreaker(ciphertext, dictionary, mode='exact', workers=1)
+        result = breaker.run()
+        self.assertEqual(result['score'], len(PLAINTEXT.split()))
+        self.assertEqual(breaker.best_key.decrypt(key.encrypt(PLAINTEXT)), PLAINTEXT)
+
+    def test_score_matches_brute_force(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            # 只用少数几个字母，使候选单词之间有大量冲突
+            dictionary = {"".join(rng.choice("abcdef") for _ in range(rng.randint(2, 4))) for _ in range(12)}
+            ciphertext = " ".join("".join(rng.choice("pqrstu") for _ in range(rng.randint(2, 4))) for _ in range(6))
+            best_score, _, complete = tool.ExactSolver(ciphertext, dictionary).run()
+            self.assertTrue(complete)
+            self.assertEqual(best_score, brute_force_score(ciphertext, dictionary), ciphertext)
+
+
+if __name__ == '__main__':
+    unittest.main()
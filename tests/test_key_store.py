@@ -0,0 +1,128 @@
+"""密钥库（SQLite）：表结构、批量追加、按密文哈希查找和 .key 文件导出"""
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+from support import TEXT_DIR, load_tool, read_text
+
+tool = load_tool()
+
+
+class KeyStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'keys.sqlite')
+        self.store = tool.KeyStore(self.path)
+        self.rng = random.Random(1)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def random_keys(self, count):
+        return [tool.random_key(self.rng) for _ in range(count)]
+
+    def test_schema(self):
+        columns = {row['name']: row['type'] for row in self.store.connection.execute("PRAGMA table_info(keys)")}
+        self.assertEqual(columns, {
+            'id': 'INTEGER', 'cipher_hash': 'TEXT', 'key': 'BLOB', 'score': 'REAL', 'confidence': 'REAL',
+            'iterations': 'INTEGER', 'model': 'TEXT', 'source': 'TEXT', 'created': 'REAL', 'metadata': 'TEXT',
+        })
+        indexes = [row['name'] for row in self.store.connection.execute("PRAGMA index_list(keys)")]
+        self.assertIn('keys_cipher_hash', indexes)
+        self.assertEqual(self.store.connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_key_is_stored_as_26_byte_permutation(self):
+        key = self.random_keys(1)[0]
+        self.store.append([{'ciphertext': "abc", 'key': key}])
+        blob = self.store.connection.execute("SELECT key FROM keys").fetchone()[0]
+        self.assertEqual(len(blob), 26)
+        self.assertEqual(bytes(blob), bytes(key.forward))
+
+    def test_bulk_append(self):
+        keys = self.random_keys(1000)
+        records = (
+            {'ciphertext': f"text {i % 10}", 'key': key if i % 2 else key.to_dict(), 'score': i, 'source': 'bulk',
+             'batch': i // 100}
+            for i, key in enumerate(keys)
+        )
+        self.assertEqual(self.store.append(records), 1000)
+        self.assertEqual(self.store.count(), 1000)
+        record = self.store.get(1)
+        self.assertEqual(record['key'], keys[0])
+        self.assertEqual(record['source'], 'bulk')
+        self.assertIsNone(record['confidence'])
+        self.assertEqual(record['metadata'], {'batch': 0})
+
+    def test_bulk_append_is_atomic(self):
+        self.store.append([{'ciphertext': "first", 'key': self.random_keys(1)[0]}])
+        bad = {'ciphertext': "bad", 'key': {'a': 'b'}}
+        with self.assertRaises(ValueError):
+            self.store.append([{'ciphertext': "ok", 'key': self.random_keys(1)[0]}, bad])
+        self.assertEqual(self.store.count(), 1)
+
+    def test_lookup_by_normalized_hash(self):
+        keys = self.random_keys(3)
+        self.store.append([
+            {'ciphertext': "Hello  World", 'key': keys[0], 'score': 5},
+            {'ciphertext': "hello world\n", 'key': keys[1], 'score': 9},
+            {'ciphertext': "other text", 'key': keys[2], 'score': 7},
+        ])
+        # 只有大小写和空白不同的密文得到同一哈希，结果按得分从高到低排列
+        records = self.store.lookup("HELLO\tworld")
+        self.assertEqual([record['key'] for record in records], [keys[1], keys[0]])
+        self.assertEqual(self.store.lookup("hello world", limit=1)[0]['score'], 9)
+        self.assertEqual(self.store.best("hello world")['key'], keys[1])
+        cipher_hash = tool.KeyStore.ciphertext_hash("other text")
+        self.assertEqual([record['key'] for record in self.store.lookup(cipher_hash=cipher_hash)], [keys[2]])
+        self.assertEqual(self.store.lookup("missing"), [])
+        self.assertIsNone(self.store.best("missing"))
+
+    def test_append_result(self):
+        ciphertext = read_text('ciphertext2.txt')
+        key = self.random_keys(1)[0]
+        result = {'key': key.to_dict(), 'score': 42, 'confidence': 0.5, 'iterations': 1000, 'model': 'english'}
+        self.assertEqual(self.store.append_result(ciphertext, result, source='test'), 1)
+        self.assertEqual(self.store.append_result(ciphertext, dict(result, key=None)), 0)
+        record = self.store.best(ciphertext)
+        self.assertEqual((record['key'], record['score'], record['confidence'], record['iterations']),
+                         (key, 42, 0.5, 1000))
+        self.assertEqual((record['model'], record['source']), ('english', 'test'))
+
+    def test_export_key_round_trip(self):
+        with open(os.path.join(TEXT_DIR, 'key1.key'), 'r', encoding='utf-8') as file:
+            original = json.load(file)
+        self.store.append([{'ciphertext': read_text('ciphertext1.txt'), 'key': original}])
+        path = os.path.join(self.directory.name, 'exported.key')
+        self.store.export_key(1, path)
+        with open(path, 'r', encoding='utf-8') as file:
+            exported = json.load(file)
+        # 导出的文件与界面保存的 .key 文件格式相同，可以原样读回
+        self.assertEqual(exported, original)
+        key = tool.SubstitutionKey.from_dict(exported)
+        self.assertEqual(key.decrypt(read_text('ciphertext1.txt')), read_text('plaintext1.txt'))
+        with self.assertRaises(KeyError):
+            self.store.export_key(99, path)
+
+    def test_records_persist_after_reopen(self):
+        keys = self.random_keys(5)
+        self.store.append({'ciphertext': "persist", 'key': key, 'score': i} for i, key in enumerate(keys))
+        self.store.close()
+        with tool.KeyStore(self.path) as store:
+            self.assertEqual(store.count(), 5)
+            self.assertEqual(store.best("persist")['key'], keys[4])
+        # 普通的 sqlite3 连接也能读取，文件格式不依赖本工具
+        connection = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM keys").fetchone()[0], 5)
+        finally:
+            connection.close()
+        self.store = tool.KeyStore(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""明文片段拖动：PatternIndex.drag 只返回与代换和固定密钥对都不矛盾的位置"""
+import json
+import os
+import unittest
+from collections import Counter
+
+from support import TEXT_DIR, load_tool, read_text
+
+tool = load_tool()
+
+CRIBS = ["the", "of the", "and the", "pounds of him", "sifting through", "metabolic"]
+
+
+def consistent_placements(cipher_words, crib_words, fixed_pairs):
+    """逐个位置直接检查的参照实现：返回 {对应的密文: 出现次数}"""
+    found = Counter()
+    for start in range(len(cipher_words) - len(crib_words) + 1):
+        mapping = dict(fixed_pairs)
+        ok = True
+        for plain_word, cipher_word in zip(crib_words, cipher_words[start:]):
+            if len(plain_word) != len(cipher_word):
+                ok = False
+                break
+            for plain, ciph in zip(plain_word, cipher_word):
+                if mapping.setdefault(plain, ciph) != ciph:
+                    ok = False
+        if ok and len(set(mapping.values())) == len(mapping):
+            found[" ".join(cipher_words[start:start + len(crib_words)])] += 1
+    return found
+
+
+class PatternIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ciphertext = read_text('ciphertext1.txt')
+        with open(os.path.join(TEXT_DIR, 'key1.key'), 'r', encoding='utf-8') as file:
+            self.key = tool.SubstitutionKey.from_dict(json.load(file))
+        self.index = tool.PatternIndex(self.ciphertext)
+
+    def check(self, crib, fixed_pairs):
+        placements = self.index.drag(crib, fixed_pairs)
+        crib_words = crib.split()
+        expected = consistent_placements(self.index.words, crib_words, fixed_pairs)
+        self.assertEqual({placement['cipher']: placement['count'] for placement in placements}, dict(expected), crib)
+        for placement in placements:
+            # 推出的映射正好把片段变成该位置的密文，并且包含所有相关的固定密钥对
+            mapping = placement['mapping']
+            self.assertEqual(" ".join("".join(mapping[c] for c in word) for word in crib_words), placement['cipher'])
+            self.assertEqual(len(set(mapping.values())), len(mapping))
+            for plain, ciph in fixed_pairs.items():
+                self.assertEqual(mapping.get(plain, ciph), ciph)
+            self.assertEqual(placement['new_pairs'], sum(1 for plain in mapping if plain not in fixed_pairs))
+            self.assertEqual(self.index.words[placement['position']:placement['position'] + len(crib_words)],
+                             placement['cipher'].split())
+        return placements
+
+    def test_matches_reference(self):
+        for crib in CRIBS:
+            self.check(crib, {})
+
+    def test_true_placement_is_found(self):
+        for crib in CRIBS:
+            placements = self.check(crib, {})
+            self.assertIn(self.key.encrypt(crib), [placement['cipher'] for placement in placements])
+
+    def test_fixed_pairs(self):
+        # 与真实密钥一致的固定密钥对保留真实位置
+        fixed_pairs = {plain: self.key[plain] for plain in "etao"}
+        for crib in CRIBS:
+            placements = self.check(crib, fixed_pairs)
+            self.assertIn(self.key.encrypt(crib), [placement['cipher'] for placement in placements])
+        # 与真实密钥矛盾的固定密钥对排除真实位置
+        wrong = {'t': self.key['h']}
+        placements = self.check("the", wrong)
+        self.assertNotIn(self.key.encrypt("the"), [placement['cipher'] for placement in placements])
+
+    def test_parse_fixed_pairs(self):
+        self.assertEqual(tool.parse_fixed_pairs(" a-q, E-x ,"), {'a': 'q', 'e': 'x'})
+        self.assertEqual(tool.parse_fixed_pairs(None), {})
+        for text in ("a-q,b-q", "a-q,a-x", "ab-q", "a-", "a-1", "aq"):
+            with self.assertRaises(ValueError):
+                tool.parse_fixed_pairs(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
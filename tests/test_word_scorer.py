@@ -0,0 +1,50 @@
+"""增量词典评分：WordScorer 的得分在任意交换序列上都与 count_pooled_matches 相同"""
+import json
+import os
+import random
+import unittest
+
+from support import DICTIONARY, TEXT_DIR, load_tool, read_text
+
+tool = load_tool()
+
+
+class WordScorerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ciphertexts = [read_text('ciphertext1.txt'), read_text('ciphertext2.txt')]
+        self.pooled_words = tool.pool_cipher_words(self.ciphertexts)
+        # 词表中加入明文单词，使交换前后命中的单词数变化较多
+        plain_words = tool.WORD_PATTERN.findall((read_text('plaintext1.txt') + read_text('plaintext2.txt')).lower())
+        self.dictionary = tool.read_dictionary(DICTIONARY) | set(plain_words[::3])
+
+    def test_matches_full_rescore_across_swaps(self):
+        rng = random.Random(3)
+        scorer = tool.WordScorer(self.pooled_words, self.dictionary)
+        key = tool.random_key(rng)
+        for step in range(2000):
+            if step % 500 == 0:
+                key = tool.random_key(rng)  # 偶尔换成完全不同的密钥
+            elif rng.random() < 0.8:
+                key = key.swapped(*rng.sample(tool.LETTERS, 2))
+            # 否则用同一密钥再评分一次
+            self.assertEqual(scorer.score(key), tool.count_pooled_matches(key, self.pooled_words, self.dictionary))
+
+    def test_pooled_score_matches_plain_count(self):
+        # 合并后按出现次数加权的得分等于逐段统计的命中单词数之和
+        rng = random.Random(4)
+        for _ in range(20):
+            key = tool.random_key(rng)
+            expected = sum(tool.count_dictionary_matches(key, text, self.dictionary) for text in self.ciphertexts)
+            self.assertEqual(tool.count_pooled_matches(key, self.pooled_words, self.dictionary), expected)
+
+    def test_true_key_score(self):
+        with open(os.path.join(TEXT_DIR, 'key1.key'), 'r', encoding='utf-8') as file:
+            key = tool.SubstitutionKey.from_dict(json.load(file))
+        scorer = tool.WordScorer(tool.pool_cipher_words([read_text('ciphertext1.txt')]), self.dictionary)
+        plain_words = tool.WORD_PATTERN.findall(read_text('plaintext1.txt').lower())
+        self.assertEqual(scorer.score(key), sum(1 for word in plain_words if word in self.dictionary))
+
+
+if __name__ == '__main__':
+    unittest.main()